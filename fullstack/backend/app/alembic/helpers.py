@@ -40,6 +40,35 @@ def apply_and_grant_rls(connection)->None:
 
         print(f"✔ Granted permissions on sequence {schema}.{sequence}")
 
+def apply_and_grant_table_rls(connection, table_name, privileges="INSERT, SELECT, UPDATE")->None:
+    """
+    apply_and_grant_rls for one table, for migrations that create it: that one
+    walks the head models, whose newer tables don't exist yet at this revision.
+    """
+    policy_exists = connection.execute(sa.text("""
+        SELECT 1 FROM pg_policies
+        WHERE tablename = :table_name
+        AND policyname = 'user_isolation_policy'
+    """), {'table_name': table_name}).scalar()
+    if not policy_exists:
+        connection.execute(sa.text(f'ALTER TABLE "{table_name}" ENABLE ROW LEVEL SECURITY;'))
+        connection.execute(sa.text(f"""
+            CREATE POLICY user_isolation_policy ON "{table_name}"
+            USING (user_id = current_setting('app.current_user_id')::int);
+        """))
+    connection.execute(sa.text(f'GRANT {privileges} ON "{table_name}" TO app_user;'))
+
+    sequences = connection.execute(sa.text("""
+        SELECT s.relname FROM pg_class s
+        JOIN pg_depend d ON d.objid = s.oid AND d.deptype = 'a'
+        JOIN pg_class t ON t.oid = d.refobjid
+        WHERE s.relkind = 'S' AND t.relname = :table_name
+    """), {'table_name': table_name}).scalars()
+    for sequence in sequences:
+        connection.execute(sa.text(f'GRANT USAGE, UPDATE ON SEQUENCE "{sequence}" TO app_user;'))
+
+    print(f"✔ RLS applied to {table_name}")
+
 def add_to_enum(connection, enum_name, value):
     connection.execute(sa.text(f"""
         ALTER TYPE {enum_name} ADD VALUE '{value}';
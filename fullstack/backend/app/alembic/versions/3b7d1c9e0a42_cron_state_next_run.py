@@ -0,0 +1,33 @@
+"""cron state with next run
+
+Revision ID: 3b7d1c9e0a42
+Revises: fe00d439cb07
+Create Date: 2026-10-19 09:12:41.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7d1c9e0a42'
+down_revision = 'fe00d439cb07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # cron_state was dropped in fe00d439cb07 because the model was never
+    # registered with the metadata; the scheduler needs it back, now with next_run
+    op.create_table('cron_state',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('job_name', sa.String(), nullable=False),
+        sa.Column('last_run', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('next_run', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('job_name')
+    )
+
+
+def downgrade():
+    op.drop_table('cron_state')
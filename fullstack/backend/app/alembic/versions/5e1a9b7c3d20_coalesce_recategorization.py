@@ -0,0 +1,48 @@
+"""coalesce recategorization
+
+Revision ID: 5e1a9b7c3d20
+Revises: 8c2f4a61d5e3
+Create Date: 2026-10-19 13:40:02.118734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1a9b7c3d20'
+down_revision = '8c2f4a61d5e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TYPE jobkind ADD VALUE IF NOT EXISTS 'source_recategorize'")
+
+    # older source level jobs may have piled up, keep the newest pending one
+    op.execute(
+        """
+        UPDATE process_file_job SET status = 'completed'
+        WHERE status = 'pending' AND pdf_id IS NULL AND id NOT IN (
+            SELECT max(id) FROM process_file_job
+            WHERE status = 'pending' AND pdf_id IS NULL
+            GROUP BY config_id
+        )
+        """
+    )
+    op.create_index(
+        'uq_process_file_job_pending_source',
+        'process_file_job',
+        ['config_id'],
+        unique=True,
+        postgresql_where=sa.text("status = 'pending' AND pdf_id IS NULL"),
+    )
+
+
+def downgrade():
+    op.drop_index(
+        'uq_process_file_job_pending_source',
+        table_name='process_file_job',
+        postgresql_where=sa.text("status = 'pending' AND pdf_id IS NULL"),
+    )
+    # Cannot easily remove enum values in PostgreSQL, so we'll leave it for downgrade
@@ -0,0 +1,32 @@
+"""timed event fan out
+
+Revision ID: 8c2f4a61d5e3
+Revises: 3b7d1c9e0a42
+Create Date: 2026-10-19 11:02:17.540921
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c2f4a61d5e3'
+down_revision = '3b7d1c9e0a42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('cron_state', sa.Column('checkpoint', sa.Integer(), nullable=True))
+    op.create_index(
+        'ix_effect_active_event_type_user',
+        'effect',
+        ['event_type', 'user_id'],
+        unique=False,
+        postgresql_where=sa.text('active'),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_effect_active_event_type_user', table_name='effect')
+    op.drop_column('cron_state', 'checkpoint')
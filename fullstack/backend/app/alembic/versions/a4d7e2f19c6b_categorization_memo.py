@@ -0,0 +1,140 @@
+"""categorization memo
+
+Revision ID: a4d7e2f19c6b
+Revises: 5e1a9b7c3d20
+Create Date: 2026-10-19 15:21:36.402188
+
+"""
+import json
+import re
+from collections import Counter, defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.alembic.helpers import apply_and_grant_table_rls
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d7e2f19c6b'
+down_revision = '5e1a9b7c3d20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('categorization_memo',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('transaction_source_id', sa.Integer(), nullable=False),
+    sa.Column('fingerprint', sa.String(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('source', sa.Enum('history', 'llm', 'override', name='memosource'), nullable=False),
+    sa.Column('hits', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['category_id'], ['category.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['transaction_source_id'], ['transaction_source.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('transaction_source_id', 'fingerprint', name='uq_categorization_memo')
+    )
+
+    connection = op.get_bind()
+    backfill(connection)
+
+    # invalidation deletes rows from the api
+    apply_and_grant_table_rls(connection, 'categorization_memo', 'INSERT, SELECT, UPDATE, DELETE')
+
+
+# a copy of app.categorization.memo as of this revision, so later changes to
+# how fingerprints are made don't change what this migration writes
+_DIGITS = re.compile(r'\d+')
+_STORE_NUMBER = re.compile(r'(#|\bno\.?|\bstore)\s*\d+')
+_PUNCTUATION = re.compile(r"[^\w\s&']")
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_description(description):
+    value = description.lower()
+    value = _STORE_NUMBER.sub(' ', value)
+    value = _DIGITS.sub(' ', value)
+    value = _PUNCTUATION.sub(' ', value)
+    return _WHITESPACE.sub(' ', value).strip()
+
+
+def most_common_categories(rows):
+    counts = defaultdict(Counter)
+    for description, category_id in rows:
+        fingerprint = normalize_description(description)
+        if fingerprint:
+            counts[fingerprint][category_id] += 1
+    return {
+        fingerprint: counter.most_common(1)[0][0]
+        for fingerprint, counter in counts.items()
+    }
+
+
+def backfill(connection) -> None:
+    """Seed the memo from categorized history, then let user overrides win."""
+    history = connection.execute(sa.text("""
+        SELECT t.user_id, t.transaction_source_id, t.description, t.category_id
+        FROM transaction t
+        JOIN category c ON c.id = t.category_id
+        WHERE NOT t.archived AND NOT c.archived
+    """))
+    by_source = defaultdict(list)
+    for user_id, source_id, description, category_id in history:
+        by_source[(user_id, source_id)].append((description, category_id))
+
+    entries = {}
+    for (user_id, source_id), rows in by_source.items():
+        for fingerprint, category_id in most_common_categories(rows).items():
+            entries[(source_id, fingerprint)] = (user_id, category_id, 'history')
+
+    active_categories = {
+        row.id for row in connection.execute(
+            sa.text("SELECT id FROM category WHERE NOT archived")
+        )
+    }
+    overrides = connection.execute(sa.text("""
+        SELECT t.user_id, t.transaction_source_id, t.description, a.change
+        FROM audit_log a
+        JOIN transaction t ON t.id = a.transaction_id
+        WHERE a.action = 'reclassify_transaction_category' AND a.apply_to_future
+        ORDER BY a.created_at
+    """))
+    for user_id, source_id, description, change in overrides:
+        # JSONType writes the model as a json string
+        while isinstance(change, str):
+            change = json.loads(change)
+        category_id = change.get('new_category')
+        fingerprint = normalize_description(description)
+        if fingerprint and category_id in active_categories:
+            entries[(source_id, fingerprint)] = (user_id, category_id, 'override')
+
+    if not entries:
+        return
+
+    connection.execute(
+        sa.text("""
+            INSERT INTO categorization_memo
+                (user_id, transaction_source_id, fingerprint, category_id, source, hits, updated_at)
+            VALUES
+                (:user_id, :source_id, :fingerprint, :category_id, CAST(:source AS memosource), 0, now())
+        """),
+        [
+            {
+                'user_id': user_id,
+                'source_id': source_id,
+                'fingerprint': fingerprint,
+                'category_id': category_id,
+                'source': source,
+            }
+            for (source_id, fingerprint), (user_id, category_id, source) in entries.items()
+        ],
+    )
+
+
+def downgrade():
+    op.drop_table('categorization_memo')
+    op.execute("DROP TYPE IF EXISTS memosource")
@@ -1,5 +1,13 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import Integer, case, cast, func
+from sqlalchemy.sql.elements import ColumnElement
+
 from app.db import Session, get_current_active_superuser, get_db, get_db_for_user
+from app.local_types import LLMUsageRow, LLMUsageSummary
+from app.models.llm_call_log import LLMCallLog
 from app.models.user import User, UserId
 from app.seed.accounts_page import delete_account_page, seed_account_page
 from app.seed.effects import (
@@ -77,3 +85,85 @@ def reseed_all_notifications(
             user_specific_session.close()
 
     return {"status": "success"}
+
+
+def summarize_llm_calls(
+    session: Session, group_by: ColumnElement[Any], since: datetime
+) -> list[LLMUsageRow]:
+    # percentile_cont skips nulls, so cache hits drop out of the percentiles
+    latency = case((~LLMCallLog.cache_hit, LLMCallLog.latency_ms))
+    tokens = case(
+        (
+            ~LLMCallLog.cache_hit,
+            LLMCallLog.prompt_tokens + LLMCallLog.completion_tokens,
+        )
+    )
+    rows = (
+        session.query(
+            group_by,
+            func.count(LLMCallLog.id),
+            func.sum(cast(LLMCallLog.cache_hit, Integer)),
+            func.sum(cast(~LLMCallLog.success, Integer)),
+            func.sum(LLMCallLog.retries),
+            func.percentile_cont(0.5).within_group(latency),
+            func.percentile_cont(0.95).within_group(latency),
+            func.percentile_cont(0.5).within_group(tokens),
+            func.percentile_cont(0.95).within_group(tokens),
+            func.sum(LLMCallLog.prompt_tokens),
+            func.sum(LLMCallLog.completion_tokens),
+            func.sum(LLMCallLog.cached_tokens),
+        )
+        .filter(LLMCallLog.created_at >= since)
+        .group_by(group_by)
+        .order_by(func.sum(LLMCallLog.prompt_tokens).desc())
+        .all()
+    )
+    return [
+        LLMUsageRow(
+            key=str(getattr(key, "value", key)) if key is not None else "none",
+            calls=calls,
+            cache_hits=cache_hits,
+            failures=failures,
+            retries=retries,
+            p50_latency_ms=p50_latency,
+            p95_latency_ms=p95_latency,
+            p50_tokens=p50_tokens,
+            p95_tokens=p95_tokens,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cached_tokens=cached_tokens,
+        )
+        for (
+            key,
+            calls,
+            cache_hits,
+            failures,
+            retries,
+            p50_latency,
+            p95_latency,
+            p50_tokens,
+            p95_tokens,
+            prompt_tokens,
+            completion_tokens,
+            cached_tokens,
+        ) in rows
+    ]
+
+
+@router.get("/admin/llm-usage", response_model=LLMUsageSummary)
+def llm_usage(
+    days: int = 7,
+    current_user: User = Depends(get_current_active_superuser),
+    session: Session = Depends(get_db),
+) -> LLMUsageSummary:
+    """Where LLM time and tokens go, by job kind, pipeline stage and user."""
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    return LLMUsageSummary(
+        since=since,
+        by_job_kind=summarize_llm_calls(session, LLMCallLog.job_kind, since),
+        by_stage=summarize_llm_calls(session, LLMCallLog.stage, since),
+        by_user=summarize_llm_calls(session, LLMCallLog.user_id, since),
+    )
@@ -14,8 +14,10 @@ from app.models.report import CategoryBase, TransactionSourceBase
 from app.models.transaction import Transaction
 from app.models.transaction_source import TransactionSource, TransactionSourceId
 from app.models.user import User
+from app.models.worker_job import RecategorizeScope
 
 
+from app.categorization.memo import invalidate_category, invalidate_learned
 from app.worker.enqueue_job import enqueue_recategorization
 
 router = APIRouter(prefix="/accounts", tags=["accounts"])
@@ -191,11 +193,15 @@ def create_category(
 
     new_category = Category(**category.model_dump(), user_id=user.id)
     session.add(new_category)
+    invalidate_learned(session, new_category.source_id)
     session.commit()
     session.refresh(new_category)
 
     enqueue_recategorization(
-        session=session, user_id=user.id, transaction_source_id=new_category.source_id
+        session=session,
+        user_id=user.id,
+        transaction_source_id=new_category.source_id,
+        scope=RecategorizeScope(new_category_ids=[new_category.id]),
     )
 
     stylized_name_lookup = get_stylized_name_lookup(session, user)
@@ -225,11 +231,26 @@ def update_category(
     if not db_category:
         raise HTTPException(status_code=404, detail="Category not found.")
 
+    changed = (
+        category.name != db_category.name or category.archived != db_category.archived
+    )
+    if changed:
+        invalidate_category(session, db_category.id)
+
     for key, value in category.model_dump().items():
         setattr(db_category, key, value)
 
     session.commit()
     session.refresh(db_category)
+
+    if changed:
+        enqueue_recategorization(
+            session=session,
+            user_id=user.id,
+            transaction_source_id=db_category.source_id,
+            scope=RecategorizeScope(category_ids=[db_category.id]),
+        )
+
     stylized_name_lookup = get_stylized_name_lookup(session, user)
     return CategoryOut(
         name=db_category.name,
@@ -255,11 +276,15 @@ def delete_category(
     if not db_category:
         raise HTTPException(status_code=404, detail="Category not found.")
 
+    source_id = db_category.source_id
     session.delete(db_category)
     session.commit()
 
     enqueue_recategorization(
-        session=session, user_id=user.id, transaction_source_id=db_category.source_id
+        session=session,
+        user_id=user.id,
+        transaction_source_id=source_id,
+        scope=RecategorizeScope(category_ids=[category_id]),
     )
 
 
@@ -1,21 +1,24 @@
-from fastapi import APIRouter, Depends
+import asyncio
+from collections.abc import AsyncGenerator
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.db import get_current_user, get_db
+from app.db import get_current_user, get_db, get_db_for_user
 from app.local_types import WorkerStatusOut
-from app.models.user import User
+from app.models.user import User, UserId
+from app.models.worker_status import WorkerStatus
 from app.worker.status import get_latest_batch
+from app.worker.status_stream import status_hub
 
 router = APIRouter(prefix="/worker-status", tags=["worker-status"])
 
+# comment lines keep proxies from closing an idle stream
+KEEPALIVE_SECONDS = 15
 
-@router.post("/status", response_model=list[WorkerStatusOut])
-def get_status(
-    *,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-) -> list[WorkerStatusOut]:
-    outputs = get_latest_batch(session=db, user=current_user)
+
+def to_status_out(rows: list[WorkerStatus]) -> list[WorkerStatusOut]:
     return [
         WorkerStatusOut(
             id=row.id,
@@ -25,5 +28,64 @@ def get_status(
             updated_at=row.updated_at,
             additional_info=row.additional_info or "",
         )
-        for row in outputs
+        for row in rows
     ]
+
+
+@router.post("/status", response_model=list[WorkerStatusOut])
+def get_status(
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> list[WorkerStatusOut]:
+    return to_status_out(get_latest_batch(session=db, user=current_user))
+
+
+def load_latest_status(user: User) -> list[WorkerStatusOut]:
+    session = next(get_db_for_user(user.id))
+    try:
+        return to_status_out(get_latest_batch(session=session, user=user))
+    finally:
+        session.close()
+
+
+def format_event(statuses: list[WorkerStatusOut]) -> str:
+    payload = "[" + ",".join(status.model_dump_json() for status in statuses) + "]"
+    return f"data: {payload}\n\n"
+
+
+@router.get("/stream")
+async def stream_status(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    """Pushes the latest batch's statuses every time the worker writes one."""
+    user_id = UserId(current_user.id)
+
+    async def events() -> AsyncGenerator[str, None]:
+        queue = status_hub.subscribe(user_id)
+        try:
+            yield format_event(
+                await asyncio.to_thread(load_latest_status, current_user)
+            )
+            while not await request.is_disconnected():
+                try:
+                    await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+                except TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                # a burst of notifications only needs one read
+                while not queue.empty():
+                    queue.get_nowait()
+                yield format_event(
+                    await asyncio.to_thread(load_latest_status, current_user)
+                )
+        finally:
+            status_hub.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -14,6 +14,7 @@ from app.db import (
     get_current_user,
     get_db,
 )
+from app.categorization.memo import record_override
 from app.func_utils import pipe
 from app.local_types import (
     AggregatedGroup,
@@ -26,7 +27,7 @@ from app.models.audit_log import AuditChange, AuditLog, AuditLogAction
 from app.models.budget import BudgetCategoryLink, BudgetEntry, BudgetEntryId
 from app.models.category import Category, CategoryId
 from app.models.filter import FilterData, FilterEntries, GroupByOption
-from app.models.transaction import Transaction
+from app.models.transaction import Transaction, transaction_fingerprint
 from app.models.transaction_source import TransactionSource, TransactionSourceId
 from app.models.user import User
 from app.models.worker_status import WorkerStatus
@@ -757,14 +758,23 @@ def update_transaction(
     )
 
     audit_logs = make_audit_entry(old=transaction_db, new=transaction)
+    category_changed = transaction_db.category_id != transaction.category_id
 
     transaction_db.amount = transaction.amount
     transaction_db.description = transaction.description
     transaction_db.date_of_transaction = transaction.date_of_transaction
     transaction_db.kind = transaction.kind
     transaction_db.category_id = cast(CategoryId, transaction.category_id)
+    transaction_db.fingerprint = transaction_fingerprint(
+        transaction.date_of_transaction,
+        transaction.amount,
+        transaction.description,
+        transaction.kind,
+    )
 
     session.add_all(audit_logs)
+    if category_changed:
+        record_override(session, transaction_db)
     session.commit()
     return transaction_db
 
@@ -1,15 +1,23 @@
-import csv
 import hashlib
-import io
-import os
-import subprocess
-import tempfile
 import uuid
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from typing import Any
 
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from sqlalchemy import insert
 
-from app.async_pipelines.uploaded_file_pipeline.local_types import PdfParseException
+from app.async_pipelines.uploaded_file_pipeline.text_extraction import (
+    is_supported_file,
+)
+from app.api.upload_limits import (
+    MAX_FILE_BYTES,
+    UPLOAD_CHUNK_BYTES,
+    UPLOAD_HASH_WORKERS,
+    UPLOAD_INSERT_BYTES,
+    too_large,
+)
 from app.db import (
     Session,
     get_current_user,
@@ -19,102 +27,64 @@ from app.local_types import ProcessFileJobOut, UploadedPdfOut
 from app.models.transaction import Transaction
 from app.models.transaction_source import TransactionSourceId
 from app.models.upload_configuration import UploadConfiguration, UploadConfigurationId
-from app.models.uploaded_pdf import UploadedPdf, UploadedPdfId
+from app.models.uploaded_pdf import UploadedFileBytes, UploadedPdf, UploadedPdfId
 from app.models.user import User
 from app.models.worker_job import JobKind, JobStatus, WorkerJob
 from app.models.worker_status import ProcessingState
 
-from app.worker.enqueue_job import enqueue_or_reset_job
-from app.worker.status import update_worker_status
+from app.worker.enqueue_job import enqueue_or_reset_job, enqueue_or_reset_jobs
+from app.worker.status import add_worker_status
 
 router = APIRouter(prefix="/uploads", tags=["uploads"])
 
 
-def extract_text_from_csv(content_bytes: bytes) -> str:
-    text_stream = io.StringIO(content_bytes.decode("utf-8", errors="replace"))
-    reader = csv.reader(text_stream)
-    lines = [", ".join(row) for row in reader]
-    return "\n".join(lines)
-
-
-def extract_text_from_pdf(content_bytes: bytes) -> str:
-    """Extract text from a PDF file using `pdftotext`."""
-    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
-        tmp.write(content_bytes)
-        tmp_path = tmp.name
-
-        command = "pdftotext"
-        args = ["-layout", tmp_path, "-"]
-
-    try:
-        result = subprocess.run(
-            [command] + args,
-            capture_output=True,
-            check=True,
-            text=True,
-        )
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        raise PdfParseException(f"Failed to extract text from PDF: {e.stderr}") from e
-
-    finally:
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
-
-
-def get_raw_text(content_bytes: bytes, filename: str) -> str:
-    _, extension = os.path.splitext(filename.lower())
-    if extension == ".pdf":
-        return extract_text_from_pdf(content_bytes)
-    elif extension == ".csv":
-        return extract_text_from_csv(content_bytes)
-    else:
-        raise ValueError("Unsupported file type")
+def upload_chunks(file: UploadFile) -> Iterator[bytes]:
+    """The upload from its spooled copy, a chunk at a time."""
+    file.file.seek(0)
+    read = 0
+    while chunk := file.file.read(UPLOAD_CHUNK_BYTES):
+        read += len(chunk)
+        if read > MAX_FILE_BYTES:
+            raise too_large(MAX_FILE_BYTES)
+        yield chunk
 
 
-def uploaded_pdf_from_raw_content(
-    session: Session, user: User, file: UploadFile
-) -> UploadedPdfOut:
-    content_bytes = file.file.read()
-    raw_hash = hashlib.md5(content_bytes).hexdigest()
+def hash_upload(file: UploadFile) -> str:
+    if file.size is not None and file.size > MAX_FILE_BYTES:
+        raise too_large(MAX_FILE_BYTES)
 
-    existing_file = (
-        session.query(UploadedPdf)
-        .filter(
-            UploadedPdf.user_id == user.id, UploadedPdf.raw_content_hash == raw_hash
-        )
-        .one_or_none()
-    )
-    uploaded_file: UploadedPdf
-    if existing_file:
-        uploaded_file = existing_file
-    else:
-        extracted_text = get_raw_text(content_bytes, file.filename or "")
-
-        new_file = UploadedPdf(
-            filename=file.filename,
-            raw_content=extracted_text,
-            raw_content_hash=raw_hash,
-            upload_time=datetime.now(timezone.utc),
-            user_id=user.id,
-            archived=False,
-        )
-        session.add(new_file)
-        session.commit()
-        session.refresh(new_file)
-        uploaded_file = new_file
+    digest = hashlib.md5()
+    for chunk in upload_chunks(file):
+        digest.update(chunk)
+    return digest.hexdigest()
 
-    print("enqueue the job")
-    job = enqueue_or_reset_job(
-        session=session,
-        user_id=user.id,
-        pdf_id=uploaded_file.id,
-        job_kind=JobKind.full_upload,
-    )
 
-    return UploadedPdfOut.model_validate(uploaded_file).model_copy(
-        update={"job": ProcessFileJobOut.model_validate(job)}
-    )
+def store_upload_bytes(
+    session: Session, user: User, uploads: list[tuple[UploadedPdfId, UploadFile]]
+) -> None:
+    """
+    Every file's chunks, written in multi-row inserts of up to
+    UPLOAD_INSERT_BYTES. Core inserts, so the session keeps no chunk around
+    until commit.
+    """
+    rows: list[dict[str, Any]] = []
+    buffered = 0
+    for pdf_id, file in uploads:
+        for index, chunk in enumerate(upload_chunks(file)):
+            rows.append(
+                {
+                    "uploaded_pdf_id": pdf_id,
+                    "chunk_index": index,
+                    "user_id": user.id,
+                    "content": chunk,
+                }
+            )
+            buffered += len(chunk)
+            if buffered >= UPLOAD_INSERT_BYTES:
+                session.execute(insert(UploadedFileBytes), rows)
+                rows, buffered = [], 0
+    if rows:
+        session.execute(insert(UploadedFileBytes), rows)
 
 
 @router.post("/reprocess/{job_id}", response_model=ProcessFileJobOut)
@@ -194,18 +164,71 @@ def upload_files(
     session: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ) -> list[UploadedPdfOut]:
-    out: list[UploadedPdfOut] = []
+    """
+    Files are hashed in parallel and matched to earlier uploads with one
+    query; the new ones are stored and every file queued in one transaction.
+    The worker extracts the text, the request only stores the files.
+    """
     for file in files:
-        batch_id = str(uuid.uuid4())
-        update_worker_status(
-            session,
-            user,
-            ProcessingState.waiting,
-            "waiting for the file to be picked up by a processor",
-            batch_id,
+        if not is_supported_file(file.filename or ""):
+            raise HTTPException(status_code=400, detail="Unsupported file type")
+
+    with ThreadPoolExecutor(max_workers=UPLOAD_HASH_WORKERS) as pool:
+        hashes = list(pool.map(hash_upload, files))
+    # the same statement picked twice is stored and queued once
+    by_hash: dict[str, UploadFile] = {}
+    for raw_hash, file in zip(hashes, files, strict=True):
+        by_hash.setdefault(raw_hash, file)
+
+    uploaded = {
+        pdf.raw_content_hash: pdf
+        for pdf in session.query(UploadedPdf).filter(
+            UploadedPdf.user_id == user.id,
+            UploadedPdf.raw_content_hash.in_(by_hash),
+        )
+    }
+    new_files = [(h, file) for h, file in by_hash.items() if h not in uploaded]
+    if new_files:
+        created = session.scalars(
+            insert(UploadedPdf).returning(UploadedPdf),
+            [
+                {
+                    "filename": file.filename,
+                    "raw_content_hash": raw_hash,
+                    "upload_time": datetime.now(timezone.utc),
+                    "user_id": user.id,
+                    "archived": False,
+                }
+                for raw_hash, file in new_files
+            ],
         )
-        pdf = uploaded_pdf_from_raw_content(session, user, file)
-        out.append(pdf)
+        uploaded.update({pdf.raw_content_hash: pdf for pdf in created})
+        store_upload_bytes(
+            session, user, [(uploaded[h].id, file) for h, file in new_files]
+        )
+
+    jobs = enqueue_or_reset_jobs(
+        session,
+        user.id,
+        [uploaded[h].id for h in by_hash],
+        job_kind=JobKind.full_upload,
+    )
+    add_worker_status(
+        session,
+        user,
+        ProcessingState.waiting,
+        "waiting for the file to be picked up by a processor",
+        str(uuid.uuid4()),
+    )
+
+    # read before the commit expires them
+    out = [
+        UploadedPdfOut.model_validate(uploaded[h]).model_copy(
+            update={"job": ProcessFileJobOut.model_validate(job)}
+        )
+        for h, job in zip(by_hash, jobs, strict=True)
+    ]
+    session.commit()
     return out
 
 
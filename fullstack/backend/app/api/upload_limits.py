@@ -0,0 +1,59 @@
+from fastapi import HTTPException, status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+MAX_FILE_BYTES = 25 * 1024 * 1024
+MAX_REQUEST_BYTES = 100 * 1024 * 1024
+# the unit uploads are read, hashed and stored in
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# chunks of a request are written to the database this many bytes at a time
+UPLOAD_INSERT_BYTES = 8 * 1024 * 1024
+# md5 releases the GIL, so a request's files hash side by side
+UPLOAD_HASH_WORKERS = 8
+
+
+def too_large(limit: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Uploads are limited to {limit // (1024 * 1024)}MB",
+    )
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Turns away upload requests over MAX_REQUEST_BYTES before their body is
+    read: by Content-Length when it's sent, otherwise once that much arrives.
+    """
+
+    def __init__(self, app: ASGIApp, path_prefix: str) -> None:
+        self.app = app
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not scope["path"].startswith(self.path_prefix)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length and int(content_length) > MAX_REQUEST_BYTES:
+            error = too_large(MAX_REQUEST_BYTES)
+            response = JSONResponse({"detail": error.detail}, error.status_code)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            received += len(message.get("body", b""))
+            if received > MAX_REQUEST_BYTES:
+                raise too_large(MAX_REQUEST_BYTES)
+            return message
+
+        await self.app(scope, limited_receive, send)
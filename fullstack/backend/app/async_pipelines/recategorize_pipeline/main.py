@@ -1,4 +1,5 @@
 import asyncio
+import logging
 from dataclasses import replace
 
 from app.async_pipelines.uploaded_file_pipeline.categorizer import (
@@ -12,15 +13,25 @@ from app.async_pipelines.uploaded_file_pipeline.local_types import (
     Recategorization,
     TransactionsWrapper,
 )
+from app.async_pipelines.uploaded_file_pipeline.text_extraction import (
+    extract_pending_text,
+    load_raw_content,
+)
+from app.categorization.affected import affected_transactions
+from app.categorization.classifier import NgramClassifier, load_training_samples
+from app.categorization.corrections import dedupe_recategorizations
 from app.func_utils import pipe
 from app.models.audit_log import AuditLog
 from app.models.category import Category, CategoryId
 from app.models.transaction import PlaidTransactionId, Transaction, TransactionId
 from app.models.transaction_source import TransactionSource
 from app.models.upload_configuration import UploadConfiguration
+from app.models.worker_job import RecategorizeScope
 from app.models.worker_status import ProcessingState
 
-from app.worker.status import log_completed, status_update_monad
+from app.worker.status import log_completed, queue_worker_status, status_update_monad
+
+logger = logging.getLogger(__name__)
 
 
 def apply_existing_transactions(in_process: InProcessJob) -> InProcessJob:
@@ -34,6 +45,12 @@ def apply_existing_transactions(in_process: InProcessJob) -> InProcessJob:
         query = query.filter(
             Transaction.uploaded_pdf_id == in_process.file.id,
         )
+    rows = query.all()
+
+    scope = in_process.job.scope if in_process.job else None
+    if scope is not None and in_process.categories:
+        rows = limit_to_affected(in_process, rows, scope)
+
     return replace(
         in_process,
         transactions=TransactionsWrapper(
@@ -48,12 +65,46 @@ def apply_existing_transactions(in_process: InProcessJob) -> InProcessJob:
                     ),
                     partialTransactionKind=row.kind.value,
                 )
-                for row in query
+                for row in rows
             ]
         ),
     )
 
 
+def limit_to_affected(
+    in_process: InProcessJob, rows: list[Transaction], scope: RecategorizeScope
+) -> list[Transaction]:
+    assert in_process.config, "must have config"
+    assert in_process.categories, "must have categories"
+    classifier = NgramClassifier().fit(
+        load_training_samples(
+            in_process.session,
+            in_process.user.id,
+            in_process.config.transaction_source_id,
+        )
+    )
+    affected = affected_transactions(
+        rows,
+        scope,
+        in_process.categories,
+        in_process.previous_recategorizations or [],
+        classifier,
+    )
+
+    skipped = len(rows) - len(affected)
+    logger.info(
+        f"Recategorizing {len(affected)} of {len(rows)} transactions, "
+        f"skipped {skipped} the change can't affect"
+    )
+    queue_worker_status(
+        in_process.user,
+        status=ProcessingState.preparing_for_parse,
+        additional_info=f"Skipped {skipped} of {len(rows)} unaffected transactions",
+        batch_id=in_process.batch_id,
+    )
+    return affected
+
+
 def apply_previous_recategorizations(in_process: InProcessJob) -> InProcessJob:
     assert in_process.transaction_source, "must have transaction source"
     assert in_process.categories, "must have categories"
@@ -66,6 +117,7 @@ def apply_previous_recategorizations(in_process: InProcessJob) -> InProcessJob:
             ~Transaction.archived,
             AuditLog.apply_to_future,
         )
+        .order_by(AuditLog.created_at)
         .all()
     )
 
@@ -94,7 +146,7 @@ def apply_previous_recategorizations(in_process: InProcessJob) -> InProcessJob:
 
     return replace(
         in_process,
-        previous_recategorizations=recats or None,
+        previous_recategorizations=dedupe_recategorizations(recats) or None,
     )
 
 
@@ -119,7 +171,8 @@ def apply_upload_config_no_create(process: InProcessJob) -> InProcessJob:
         reg_lookup = {u.id: u.filename_regex.lower() for u in query}
         lookup = {u.id: u for u in query}
 
-        raw_content = f"{process.file.filename} {process.file.raw_content}".lower()
+        text = load_raw_content(process.session, process.file.id)
+        raw_content = f"{process.file.filename} {text or ''}".lower()
         for id, filename_regex in reg_lookup.items():
             if filename_regex in raw_content:
                 config = lookup[id]
@@ -147,7 +200,10 @@ def apply_upload_config_no_create(process: InProcessJob) -> InProcessJob:
 
 def insert_recategorized_transactions(in_process: InProcessJob) -> InProcessJob:
     assert in_process.transaction_source, "must have transaction source"
-    assert in_process.categorized_transactions, "must have categorized transactions"
+    # a scoped recategorization can come up empty
+    assert in_process.categorized_transactions is not None, (
+        "must have categorized transactions"
+    )
     assert all(
         t.partialTransactionId is not None for t in in_process.categorized_transactions
     ), "must have"
@@ -186,6 +242,7 @@ def insert_recategorized_transactions(in_process: InProcessJob) -> InProcessJob:
 
 
 async def recategorize_file_pipeline(in_process_files: list[InProcessJob]) -> None:
+    in_process_files = await extract_pending_text(in_process_files)
     in_process_with_config = [
         apply_upload_config_no_create(in_process) for in_process in in_process_files
     ]
@@ -1,10 +1,10 @@
 import logging
+from collections import Counter
+from collections.abc import Callable, Sequence
 from dataclasses import replace
 from datetime import datetime
 from typing import cast
 
-from dateutil import parser
-
 from app.async_pipelines.uploaded_file_pipeline.local_types import (
     CategorizedTransaction,
     InProcessJob,
@@ -12,11 +12,34 @@ from app.async_pipelines.uploaded_file_pipeline.local_types import (
     Recategorization,
     create_categorized_transactions_wrapper,
 )
-from app.func_utils import make_batches
-from app.models.transaction import Transaction
+from app.async_pipelines.uploaded_file_pipeline.statement_text import count_tokens
+from app.categorization.classifier import (
+    CONFIDENCE_THRESHOLD,
+    NgramClassifier,
+    load_training_samples,
+)
+from app.categorization.corrections import CorrectionSelector
+from app.categorization.memo import (
+    load_memo,
+    normalize_description,
+    record_hits,
+    remember,
+)
+from app.date_utils import parse_date, parse_dates
+from app.func_utils import make_budgeted_batches
+from app.models.categorization_memo import CategorizationMemo, MemoSource
+from app.models.llm_call_log import LLMStage
+from app.models.transaction import Transaction, transaction_fingerprint
+from app.models.worker_job import JobKind
 from app.models.worker_status import ProcessingState
-from app.open_ai_utils import ChatMessage, Prompt, make_chat_request
-from app.worker.status import update_worker_status
+from app.open_ai_utils import (
+    MAX_OUTPUT_TOKENS,
+    ChatMessage,
+    Prompt,
+    make_chat_results,
+)
+from app.worker.llm_calls import llm_stage
+from app.worker.status import queue_worker_status
 
 from app.func_utils import not_none
 
@@ -24,42 +47,96 @@ logging.basicConfig(level=logging.INFO)
 
 logger = logging.getLogger(__name__)
 
+# the model echoes every transaction back with its category, so the response
+# runs out long before the prompt does; leave room for it wandering off the
+# estimate (whitespace, reworded descriptions)
+CATEGORIZE_OUTPUT_TOKEN_BUDGET = MAX_OUTPUT_TOKENS * 2 // 3
+CATEGORIZE_INPUT_TOKEN_BUDGET = 8000
+# past this the model starts skipping lines regardless of tokens
+MAX_CATEGORIZE_BATCH_SIZE = 150
+# a cut off batch is halved and a partial response's missing transactions sent
+# again, this often
+MAX_SPLIT_ROUNDS = 3
+# key, quotes and punctuation around the category the response adds
+CATEGORY_FIELD_TOKENS = 8
+# these categorize transactions again, which the classifier is trained on with
+# the categories being replaced, so it would only hand those back
+RECATEGORIZE_JOB_KINDS = {
+    JobKind.recategorize,
+    JobKind.plaid_recategorize,
+    JobKind.source_recategorize,
+}
+
+
+def transaction_dates(transactions: Sequence[PartialTransaction]) -> list[datetime]:
+    """
+    The transactions' dates, read as one column. Parsers write %m/%d/%Y, but
+    a batch the LLM wrote another way is read in that format, and a stray
+    date the column's format can't read is tried against the others.
+    """
+    values = [t.partialTransactionDateOfTransaction for t in transactions]
+    parsed = parse_dates(values)
+    if parsed.ambiguous:
+        logger.warning(
+            f"{len(parsed.ambiguous)} of {len(values)} transaction dates read as "
+            f"{parsed.date_format} would be different days in another format"
+        )
 
-def safe_parse_date(date_str: str) -> datetime:
-    try:
-        return datetime.strptime(date_str, "%m/%d/%Y")
-    except ValueError:
-        try:
-            if "/" in date_str:
-                return parser.parse(date_str, dayfirst=True)
-        except Exception:
-            raise ValueError(f"Unrecognized date format: {date_str}")
-    raise ValueError(f"Unrecognized date format: {date_str}")
+    dates = []
+    for value, date in zip(values, parsed.dates, strict=True):
+        date = date or parse_date(value)
+        if date is None:
+            raise ValueError(f"Unrecognized date format: {value}")
+        dates.append(date)
+    return dates
 
 
-def generate_categorization_prompt(
+def _overwrites(recategorizations: list[Recategorization]) -> str:
+    return "\n".join(
+        f"{r.description}: {r.previous_category} changed to {r.overrided_category}"
+        for r in recategorizations
+    )
+
+
+def generate_categorization_prefix(
     categories: list[str],
-    transactions: list[PartialTransaction],
     previous_recategorizations: list[Recategorization] | None = None,
-) -> Prompt:
-    return [
-        ChatMessage(
-            role="user",
-            content=f"""
-    Here is a list of categories:
+) -> ChatMessage:
+    """
+    Everything every batch of a source shares. It leads the prompt unchanged,
+    right after the response schema, so the provider's prompt cache can serve
+    the whole run up to the batch's own transactions.
+    """
+    return ChatMessage(
+        role="system",
+        content=f"""Here is a list of categories:
 
-    {", ".join(categories)}
+{", ".join(categories)}
 
-    Here is a list of previous overwrites the user has responded with:
+Here is a list of previous overwrites the user has responded with:
 
-    {"\n".join([f"{r.description}: {r.previous_category} changed to {r.overrided_category}" for r in previous_recategorizations]) if previous_recategorizations else "None"}
+{_overwrites(previous_recategorizations) if previous_recategorizations else "None"}""",
+    )
 
-    Assign the most appropriate category to the following transactions:
 
-    {"\n".join([t.model_dump_json() for t in transactions])}
+def generate_categorization_prompt(
+    prefix: ChatMessage,
+    transactions: list[PartialTransaction],
+    batch_recategorizations: list[Recategorization] | None = None,
+) -> Prompt:
+    overwrites = (
+        f"Previous overwrites relevant to these transactions:\n{_overwrites(batch_recategorizations)}\n\n"
+        if batch_recategorizations
+        else ""
+    )
+    return [
+        prefix,
+        ChatMessage(
+            role="user",
+            content=f"""{overwrites}Assign the most appropriate category to the following transactions:
 
-    """.strip(),
-        )
+{"\n".join([t.model_dump_json() for t in transactions])}""",
+        ),
     ]
 
 
@@ -72,6 +149,81 @@ class TransactionsCoerceType:
     transactions: list[CategorizedTransaction]
 
 
+def categorization_token_cost(
+    categories: list[str],
+) -> Callable[[PartialTransaction], tuple[int, int]]:
+    """Estimated (prompt, response) tokens one transaction adds to a batch."""
+    category_tokens = max((count_tokens(c) for c in categories), default=0)
+
+    def cost(transaction: PartialTransaction) -> tuple[int, int]:
+        line = count_tokens(transaction.model_dump_json()) + 1
+        return line, line + category_tokens + CATEGORY_FIELD_TOKENS
+
+    return cost
+
+
+def make_categorization_batches(
+    transactions: list[PartialTransaction], categories: list[str]
+) -> list[list[PartialTransaction]]:
+    return make_budgeted_batches(
+        transactions,
+        categorization_token_cost(categories),
+        (CATEGORIZE_INPUT_TOKEN_BUDGET, CATEGORIZE_OUTPUT_TOKEN_BUDGET),
+        MAX_CATEGORIZE_BATCH_SIZE,
+    )
+
+
+def _transaction_key(
+    t: PartialTransaction,
+) -> tuple[int | None, str | None, str, str, float]:
+    return (
+        t.partialTransactionId,
+        t.partialPlaidTransactionId,
+        t.partialTransactionDescription,
+        t.partialTransactionDateOfTransaction,
+        t.partialTransactionAmount,
+    )
+
+
+def missing_from_response(
+    batch: list[PartialTransaction], categorized: list[CategorizedTransaction]
+) -> list[PartialTransaction]:
+    """The transactions of a batch that didn't come back categorized."""
+    shortfall = len(batch) - len(categorized)
+    if shortfall <= 0:
+        return []
+
+    returned = Counter(_transaction_key(t) for t in categorized)
+    missing = []
+    for transaction in batch:
+        key = _transaction_key(transaction)
+        if returned[key]:
+            returned[key] -= 1
+        else:
+            missing.append(transaction)
+    if len(missing) != shortfall:
+        # the model reworded some of what it did return; a cut off response
+        # loses the tail, and sending those again can't duplicate the rest
+        return batch[len(categorized) :]
+    return missing
+
+
+def _halves(batch: list[PartialTransaction]) -> list[list[PartialTransaction]]:
+    middle = (len(batch) + 1) // 2
+    return [half for half in (batch[:middle], batch[middle:]) if half]
+
+
+def retry_batches(
+    batch: list[PartialTransaction], returned: list[CategorizedTransaction]
+) -> list[list[PartialTransaction]]:
+    """What of a batch to send again after a partial or cut off response."""
+    missing = missing_from_response(batch, returned)
+    if not missing:
+        return []
+    # a smaller batch leaves the response room to finish
+    return _halves(missing) if len(missing) == len(batch) else [missing]
+
+
 def update_filejob_with_nickname(in_process: InProcessJob) -> InProcessJob:
     assert in_process.transaction_source, "must have"
     assert in_process.transactions, "must have"
@@ -90,6 +242,104 @@ def update_filejob_with_nickname(in_process: InProcessJob) -> InProcessJob:
     return in_process
 
 
+def resolve_from_memo(
+    process: InProcessJob,
+) -> tuple[list[CategorizedTransaction], list[PartialTransaction]]:
+    """Split transactions into ones a known merchant answers and ones for the LLM."""
+    assert process.transactions, "must have"
+    assert process.categories, "must have"
+    transactions = process.transactions.transactions
+    if not process.transaction_source:
+        return [], transactions
+
+    memo = load_memo(process.session, process.user.id, process.transaction_source.id)
+    category_names = {
+        cat.id: cat.name for cat in process.categories if not cat.archived
+    }
+
+    hits: list[CategorizedTransaction] = []
+    used: list[CategorizationMemo] = []
+    misses: list[PartialTransaction] = []
+    for transaction in transactions:
+        entry = memo.get(
+            normalize_description(transaction.partialTransactionDescription)
+        )
+        if entry and entry.category_id in category_names:
+            hits.append(
+                CategorizedTransaction(
+                    **transaction.model_dump(),
+                    category=category_names[entry.category_id],
+                )
+            )
+            used.append(entry)
+        else:
+            misses.append(transaction)
+
+    record_hits(process.session, used)
+    return hits, misses
+
+
+def resolve_with_classifier(
+    process: InProcessJob, transactions: list[PartialTransaction]
+) -> tuple[list[CategorizedTransaction], list[PartialTransaction]]:
+    """Categorize what the local classifier is confident about, the rest goes on."""
+    assert process.categories, "must have"
+    if not process.transaction_source or not transactions:
+        return [], transactions
+    if process.job and process.job.kind in RECATEGORIZE_JOB_KINDS:
+        return [], transactions
+
+    classifier = NgramClassifier().fit(
+        load_training_samples(
+            process.session, process.user.id, process.transaction_source.id
+        )
+    )
+    category_names = {
+        cat.id: cat.name for cat in process.categories if not cat.archived
+    }
+
+    hits: list[CategorizedTransaction] = []
+    misses: list[PartialTransaction] = []
+    for transaction in transactions:
+        prediction = classifier.predict(transaction.partialTransactionDescription)
+        if (
+            prediction
+            and prediction.confidence >= CONFIDENCE_THRESHOLD
+            and prediction.category_id in category_names
+        ):
+            hits.append(
+                CategorizedTransaction(
+                    **transaction.model_dump(),
+                    category=category_names[prediction.category_id],
+                )
+            )
+        else:
+            misses.append(transaction)
+    return hits, misses
+
+
+def remember_llm_categories(
+    process: InProcessJob, categorized: list[CategorizedTransaction]
+) -> None:
+    assert process.categories, "must have"
+    if not process.transaction_source:
+        return
+
+    category_ids = {cat.name: cat.id for cat in process.categories}
+    remember(
+        process.session,
+        process.user.id,
+        process.transaction_source.id,
+        {
+            normalize_description(t.partialTransactionDescription): category_ids[
+                t.category
+            ]
+            for t in categorized
+        },
+        MemoSource.llm,
+    )
+
+
 def categorize_extracted_transactions(process: InProcessJob) -> InProcessJob:
     assert process.transactions, "didnt find transactions"
     assert process.categories, "must have categories"
@@ -97,7 +347,26 @@ def categorize_extracted_transactions(process: InProcessJob) -> InProcessJob:
     logger.info(
         f"Categorizing {len(process.transactions.transactions)} transactions..."
     )
-    account_categories = [cat.name for cat in process.categories]
+    memo_hits, after_memo = resolve_from_memo(process)
+    local_hits, to_categorize = resolve_with_classifier(process, after_memo)
+    total = len(process.transactions.transactions)
+    logger.info(
+        f"Categorization memo hit rate: {len(memo_hits)}/{total} "
+        f"({len(memo_hits) / max(total, 1):.0%}), "
+        f"local classifier: {len(local_hits)}, llm: {len(to_categorize)}"
+    )
+    queue_worker_status(
+        process.user,
+        status=ProcessingState.categorizing_transactions,
+        additional_info=(
+            f"Matched {len(memo_hits) + len(local_hits)} of {total} transactions "
+            "to known merchants"
+        ),
+        batch_id=process.batch_id,
+    )
+
+    # sorted, so the prompt prefix and schema are the same job after job
+    account_categories = sorted(cat.name for cat in process.categories)
     plaid_transaction_ids = [
         t.partialPlaidTransactionId
         for t in process.transactions.transactions
@@ -115,36 +384,76 @@ def categorize_extracted_transactions(process: InProcessJob) -> InProcessJob:
         transaction_ids,
     )
 
-    out: list[CategorizedTransaction] = []
-    batch: list[PartialTransaction]
-    batches = make_batches(process.transactions.transactions)
-    for index, batch in enumerate(batches):
-        try:
-            update_worker_status(
-                process.session,
-                process.user,
-                status=ProcessingState.categorizing_transactions,
-                additional_info=f"Categorizing batch {index + 1} of {len(batches)}",
-                batch_id=process.batch_id,
-            )
-            categorized = cast(
-                TransactionsCoerceType,
-                make_chat_request(
-                    CategorizedTransactionsWrapper,
+    batches = make_categorization_batches(to_categorize, account_categories)
+    selector = CorrectionSelector(process.previous_recategorizations or [])
+    shared = selector.shared()
+    prefix = generate_categorization_prefix(account_categories, shared)
+    if batches:
+        logger.info(
+            f"Categorization prefix of {count_tokens(prefix.content)} tokens "
+            f"shared by {len(batches)} batches of up to "
+            f"{max(map(len, batches))} transactions, {len(shared)} of "
+            f"{len(selector.recategorizations)} corrections in the prefix"
+        )
+
+    def report_progress(done: int) -> None:
+        queue_worker_status(
+            process.user,
+            status=ProcessingState.categorizing_transactions,
+            additional_info=f"Categorized batch {done} of {len(batches)}",
+            batch_id=process.batch_id,
+        )
+
+    from_llm: list[CategorizedTransaction] = []
+    pending = batches
+    on_done: Callable[[int], None] | None = report_progress
+    for attempt in range(MAX_SPLIT_ROUNDS + 1):
+        # when the corrections don't all fit, each batch picks its own after the prefix
+        corrections = [[] if shared else selector.select(batch) for batch in pending]
+        with llm_stage(process, LLMStage.categorize):
+            results = make_chat_results(
+                CategorizedTransactionsWrapper,
+                [
                     generate_categorization_prompt(
-                        categories=account_categories,
+                        prefix,
                         transactions=batch,
-                        previous_recategorizations=process.previous_recategorizations,
-                    ),
-                ),
+                        batch_recategorizations=relevant or None,
+                    )
+                    for batch, relevant in zip(pending, corrections, strict=True)
+                ],
+                on_done=on_done,
             )
-            if categorized:
-                out.extend(categorized.transactions)
-        except Exception as e:
-            logger.error(f"Failed to categorize batch: {e}")
+
+        retry: list[list[PartialTransaction]] = []
+        for batch, result in zip(pending, results, strict=True):
+            if result.parsed is None and not result.cut_off:
+                # a rate limit, outage or bad key, smaller batches won't fix it
+                logger.error(
+                    f"Giving up on a batch of {len(batch)} transactions "
+                    "the model failed to categorize"
+                )
+                continue
+            categorized = cast(TransactionsCoerceType | None, result.parsed)
+            returned = categorized.transactions if categorized else []
+            from_llm.extend(returned)
+            retry.extend(retry_batches(batch, returned))
+
+        if not retry:
+            break
+        dropped = sum(map(len, retry))
+        if attempt == MAX_SPLIT_ROUNDS:
+            logger.error(
+                f"Giving up on {dropped} transactions the model never categorized"
+            )
+            break
+        logger.warning(
+            f"Resending {dropped} uncategorized transactions in {len(retry)} batches"
+        )
+        pending = retry
+        on_done = None
 
     # this is a weird protection against AI messing up the ids in the response
-    for transaction in out:
+    for transaction in from_llm:
         assert transaction.partialTransactionId in [
             t.partialTransactionId for t in process.transactions.transactions
         ], (
@@ -156,30 +465,46 @@ def categorize_extracted_transactions(process: InProcessJob) -> InProcessJob:
             f"Transaction {transaction.partialPlaidTransactionId} not found in original transactions"
         )
 
-    return replace(process, categorized_transactions=out)
+    remember_llm_categories(process, from_llm)
+
+    return replace(process, categorized_transactions=memo_hits + local_hits + from_llm)
 
 
 def insert_categorized_transactions(in_process: InProcessJob) -> InProcessJob:
     assert in_process.transaction_source, "must have transaction source"
-    assert in_process.categorized_transactions, "must have categorized transactions"
+    # empty when every line of the file was already known
+    assert in_process.categorized_transactions is not None, (
+        "must have categorized transactions"
+    )
     assert in_process.categories, "must have categories"
 
     category_lookup = {cat.name: cat.id for cat in in_process.categories}
 
-    transactions_to_insert = [
-        Transaction(
-            description=t.partialTransactionDescription,
-            category_id=category_lookup[t.category],
-            date_of_transaction=safe_parse_date(t.partialTransactionDateOfTransaction),
-            amount=t.partialTransactionAmount,
-            transaction_source_id=in_process.transaction_source.id,
-            kind=t.partialTransactionKind,
-            uploaded_pdf_id=in_process.file.id if in_process.file else None,
-            user_id=in_process.user.id,
-            archived=False,
+    transactions_to_insert = []
+    for t, date_of_transaction in zip(
+        in_process.categorized_transactions,
+        transaction_dates(in_process.categorized_transactions),
+        strict=True,
+    ):
+        transactions_to_insert.append(
+            Transaction(
+                description=t.partialTransactionDescription,
+                category_id=category_lookup[t.category],
+                date_of_transaction=date_of_transaction,
+                amount=t.partialTransactionAmount,
+                transaction_source_id=in_process.transaction_source.id,
+                kind=t.partialTransactionKind,
+                uploaded_pdf_id=in_process.file.id if in_process.file else None,
+                user_id=in_process.user.id,
+                archived=False,
+                fingerprint=transaction_fingerprint(
+                    date_of_transaction,
+                    t.partialTransactionAmount,
+                    t.partialTransactionDescription,
+                    t.partialTransactionKind,
+                ),
+            )
         )
-        for t in in_process.categorized_transactions
-    ]
 
     in_process.session.bulk_save_objects(transactions_to_insert)
     in_process.session.commit()
@@ -7,6 +7,9 @@ from app.async_pipelines.uploaded_file_pipeline.local_types import (
     PartialAccountCategoryConfig,
     PartialUploadConfig,
 )
+from app.async_pipelines.uploaded_file_pipeline.text_extraction import (
+    load_raw_content,
+)
 from app.models.category import Category
 from app.models.transaction_source import SourceKind, TransactionSource
 from app.models.upload_configuration import UploadConfiguration
@@ -177,7 +180,8 @@ def create_configurations(process: InProcessJob) -> UploadConfiguration:
 
     session = process.session
     user = process.user
-    pdf_content = process.file.raw_content
+    pdf_content = process.raw_content or load_raw_content(session, process.file.id)
+    assert pdf_content is not None, "extracted before config creation"
 
     account_config = extract_account_and_categories(pdf_content)
     if not account_config:
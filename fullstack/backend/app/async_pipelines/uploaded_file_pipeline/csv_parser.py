@@ -0,0 +1,331 @@
+import csv
+import io
+import logging
+import re
+from dataclasses import replace
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+from app.async_pipelines.uploaded_file_pipeline.local_types import (
+    InProcessJob,
+    PartialTransaction,
+    TransactionsWrapper,
+)
+from app.date_utils import infer_date_format, parse_date, parse_dates
+from app.models.llm_call_log import LLMStage
+from app.models.upload_configuration import CsvColumnMapping, CsvColumnMappings
+from app.open_ai_utils import ChatMessage, make_chat_request
+from app.worker.llm_calls import llm_stage
+
+logger = logging.getLogger(__name__)
+
+# below this a mapping is considered wrong and the file goes to the LLM parser
+MIN_PARSED_RATIO = 0.9
+SAMPLE_ROWS = 8
+
+HEADER_HINTS: dict[str, list[str]] = {
+    "date": ["transaction date", "trans date", "trans. date", "date"],
+    "description": [
+        "description",
+        "payee",
+        "merchant",
+        "name",
+        "details",
+        "memo",
+        "narrative",
+    ],
+    "amount": ["amount"],
+    "debit": ["debit", "withdrawal", "money out", "paid out"],
+    "credit": ["credit", "deposit", "money in", "paid in"],
+    "kind": ["transaction type", "type", "credit/debit", "debit/credit"],
+}
+
+WITHDRAWAL_WORDS = {"debit", "withdrawal", "sale", "purchase", "dr", "fee"}
+DEPOSIT_WORDS = {"credit", "deposit", "payment", "return", "refund", "cr"}
+
+
+def is_csv(filename: str) -> bool:
+    return filename.lower().endswith(".csv")
+
+
+def read_rows(raw_content: str) -> list[list[str]]:
+    # older uploads were stored joined with ", ", hence skipinitialspace
+    reader = csv.reader(io.StringIO(raw_content), skipinitialspace=True)
+    return [
+        [cell.strip() for cell in row] for row in reader if any(c.strip() for c in row)
+    ]
+
+
+def header_signature(rows: list[list[str]]) -> str:
+    header = rows[0]
+    if any(parse_date(cell) for cell in header):
+        return f"columns:{len(header)}"
+    return "|".join(re.sub(r"\s+", " ", cell.strip().lower()) for cell in header)
+
+
+def parse_amount(value: str) -> float | None:
+    cleaned = value.replace("$", "").replace(",", "").replace(" ", "")
+    negative = cleaned.startswith("(") and cleaned.endswith(")")
+    cleaned = cleaned.strip("()")
+    if cleaned.endswith("-"):
+        negative, cleaned = True, cleaned[:-1]
+    if not cleaned:
+        return None
+    try:
+        amount = float(cleaned)
+    except ValueError:
+        return None
+    return -amount if negative else amount
+
+
+def _find_column(header: list[str], hints: list[str], taken: set[int]) -> int | None:
+    lowered = [cell.lower() for cell in header]
+    for hint in hints:
+        for index, cell in enumerate(lowered):
+            if index not in taken and cell == hint:
+                return index
+    for hint in hints:
+        for index, cell in enumerate(lowered):
+            if index not in taken and hint in cell:
+                return index
+    return None
+
+
+def complete_mapping(
+    rows: list[list[str]],
+    *,
+    date: int,
+    description: int,
+    amount: int | None,
+    debit: int | None,
+    credit: int | None,
+    kind: int | None,
+    has_header: bool,
+) -> CsvColumnMapping | None:
+    """Fill in what the data itself decides: the date format and the sign convention."""
+    data = rows[1:] if has_header else rows
+    if amount is None and (debit is None or credit is None):
+        return None
+
+    date_format = infer_date_format([row[date] for row in data[:50] if len(row) > date])
+    if not date_format:
+        return None
+
+    negative_is_withdrawal = True
+    if amount is not None:
+        amounts = [parse_amount(row[amount]) for row in data[:200] if len(row) > amount]
+        negatives = sum(1 for value in amounts if value is not None and value < 0)
+        positives = sum(1 for value in amounts if value is not None and value > 0)
+        negative_is_withdrawal = negatives >= positives
+
+    return CsvColumnMapping(
+        date=date,
+        description=description,
+        amount=amount,
+        debit=debit,
+        credit=credit,
+        kind=kind,
+        date_format=date_format,
+        negative_is_withdrawal=negative_is_withdrawal,
+        has_header=has_header,
+    )
+
+
+def infer_mapping_from_header(rows: list[list[str]]) -> CsvColumnMapping | None:
+    header = rows[0]
+    if any(parse_date(cell) for cell in header):
+        return None
+
+    taken: set[int] = set()
+    found: dict[str, int | None] = {}
+    # kind before debit/credit, so "Credit/Debit" isn't taken as an amount column
+    for field in ["date", "description", "amount", "kind", "debit", "credit"]:
+        found[field] = _find_column(header, HEADER_HINTS[field], taken)
+        if found[field] is not None:
+            taken.add(found[field])  # type: ignore[arg-type]
+
+    date, description = found["date"], found["description"]
+    if date is None or description is None:
+        return None
+
+    return complete_mapping(
+        rows,
+        date=date,
+        description=description,
+        amount=found["amount"],
+        debit=found["debit"],
+        credit=found["credit"],
+        kind=found["kind"],
+        has_header=True,
+    )
+
+
+class PartialCsvColumnMapping(BaseModel):
+    hasHeader: bool = Field(..., description="Whether the first row is a header.")
+    dateColumn: int = Field(..., description="Zero based index of the date.")
+    descriptionColumn: int = Field(
+        ..., description="Zero based index of the merchant or description."
+    )
+    amountColumn: int | None = Field(
+        ..., description="Index of a single signed amount column, if there is one."
+    )
+    debitColumn: int | None = Field(
+        ..., description="Index of the money out column, if split."
+    )
+    creditColumn: int | None = Field(
+        ..., description="Index of the money in column, if split."
+    )
+    kindColumn: int | None = Field(
+        ..., description="Index of a column labelling rows as debit or credit."
+    )
+
+
+def infer_mapping_with_llm(rows: list[list[str]]) -> CsvColumnMapping | None:
+    sample = "\n".join(
+        " | ".join(f"[{index}] {cell}" for index, cell in enumerate(row))
+        for row in rows[:SAMPLE_ROWS]
+    )
+    prompt = f"""
+    These are the first rows of a bank or card CSV export, each cell prefixed
+    with its zero based column index.
+
+    Identify which columns hold the transaction date, description, and amount
+    (either one signed amount column or separate debit and credit columns).
+
+    {sample}
+    """.strip()
+
+    response = make_chat_request(
+        PartialCsvColumnMapping, [ChatMessage(role="user", content=prompt)]
+    )
+    if not response:
+        return None
+
+    return complete_mapping(
+        rows,
+        date=response.dateColumn,
+        description=response.descriptionColumn,
+        amount=response.amountColumn,
+        debit=response.debitColumn,
+        credit=response.creditColumn,
+        kind=response.kindColumn,
+        has_header=response.hasHeader,
+    )
+
+
+def _kind_from_label(label: str) -> str | None:
+    words = set(re.findall(r"[a-z]+", label.lower()))
+    if words & WITHDRAWAL_WORDS:
+        return "withdrawal"
+    if words & DEPOSIT_WORDS:
+        return "deposit"
+    return None
+
+
+def _cell(row: list[str], index: int | None) -> str:
+    return row[index] if index is not None and index < len(row) else ""
+
+
+def parse_row(
+    row: list[str], mapping: CsvColumnMapping, date: datetime | None
+) -> PartialTransaction | None:
+    """`date` is the row's, read with the rest of the column."""
+
+    def cell(index: int | None) -> str:
+        return _cell(row, index)
+
+    description = cell(mapping.description)
+    if not date or not description:
+        return None
+
+    kind: str | None = None
+    if mapping.amount is not None:
+        amount = parse_amount(cell(mapping.amount))
+        if amount is None:
+            return None
+        withdrawal = (amount < 0) == mapping.negative_is_withdrawal
+        kind = "withdrawal" if withdrawal else "deposit"
+    else:
+        debit = parse_amount(cell(mapping.debit))
+        credit = parse_amount(cell(mapping.credit))
+        if debit:
+            amount, kind = debit, "withdrawal"
+        elif credit:
+            amount, kind = credit, "deposit"
+        else:
+            return None
+
+    if mapping.kind is not None:
+        kind = _kind_from_label(cell(mapping.kind)) or kind
+
+    return PartialTransaction(
+        partialTransactionId=None,
+        partialPlaidTransactionId=None,
+        partialTransactionDateOfTransaction=date.strftime("%m/%d/%Y"),
+        partialTransactionDescription=description,
+        partialTransactionKind=kind,  # type: ignore[arg-type]
+        partialTransactionAmount=abs(amount),
+    )
+
+
+def parse_rows(
+    rows: list[list[str]], mapping: CsvColumnMapping
+) -> list[PartialTransaction] | None:
+    """None when too many rows don't fit the mapping to trust it."""
+    data = rows[1:] if mapping.has_header else rows
+    dates = parse_dates([_cell(row, mapping.date) for row in data], mapping.date_format)
+    if dates.ambiguous:
+        logger.warning(
+            f"{len(dates.ambiguous)} CSV dates read as {mapping.date_format} "
+            "would be different days in another format"
+        )
+    parsed = [
+        parse_row(row, mapping, date)
+        for row, date in zip(data, dates.dates, strict=True)
+    ]
+    transactions = [t for t in parsed if t is not None]
+    if not data or len(transactions) / len(data) < MIN_PARSED_RATIO:
+        return None
+    return transactions
+
+
+def parse_csv_transactions(process: InProcessJob) -> InProcessJob | None:
+    """
+    Parse a CSV upload without the LLM, learning the column mapping the
+    first time a layout is seen. Returns None when the file should go to the
+    LLM parser instead.
+    """
+    assert process.file, "must have"
+    assert process.config, "must have"
+    assert process.raw_content is not None, "loaded before parsing"
+
+    rows = read_rows(process.raw_content)
+    if len(rows) < 2:
+        return None
+
+    signature = header_signature(rows)
+    known = process.config.csv_column_mappings or CsvColumnMappings()
+    mapping = known.mappings.get(signature)
+
+    transactions = parse_rows(rows, mapping) if mapping else None
+    if transactions is None:
+        logger.info(f"Learning the CSV layout for {process.file.filename}")
+        mapping = infer_mapping_from_header(rows)
+        transactions = parse_rows(rows, mapping) if mapping else None
+    if transactions is None:
+        with llm_stage(process, LLMStage.csv_mapping):
+            mapping = infer_mapping_with_llm(rows)
+        transactions = parse_rows(rows, mapping) if mapping else None
+    if transactions is None or mapping is None:
+        return None
+
+    if known.mappings.get(signature) != mapping:
+        # reassign so the JSON column is seen as dirty
+        process.config.csv_column_mappings = CsvColumnMappings(
+            mappings={**known.mappings, signature: mapping}
+        )
+        process.session.add(process.config)
+
+    logger.info(f"Parsed {len(transactions)} CSV rows without the LLM")
+    return replace(process, transactions=TransactionsWrapper(transactions=transactions))
@@ -0,0 +1,96 @@
+import logging
+from collections import Counter
+from dataclasses import replace
+
+from sqlalchemy import func
+
+from app.async_pipelines.uploaded_file_pipeline.categorizer import transaction_dates
+from app.async_pipelines.uploaded_file_pipeline.local_types import (
+    InProcessJob,
+    PartialTransaction,
+    TransactionsWrapper,
+)
+from app.models.transaction import Transaction, transaction_fingerprint
+from app.models.worker_status import ProcessingState
+from app.worker.status import queue_worker_status
+
+logger = logging.getLogger(__name__)
+
+
+def partial_fingerprints(transactions: list[PartialTransaction]) -> list[str]:
+    return [
+        transaction_fingerprint(
+            date,
+            t.partialTransactionAmount,
+            t.partialTransactionDescription,
+            t.partialTransactionKind,
+        )
+        for t, date in zip(transactions, transaction_dates(transactions), strict=True)
+    ]
+
+
+def unseen_transactions(
+    transactions: list[PartialTransaction], fingerprints: list[str], known: Counter[str]
+) -> list[PartialTransaction]:
+    """
+    Each known copy of a fingerprint accounts for one parsed transaction, so
+    two identical coffees on a day both survive an upload that only overlaps
+    one of them.
+    """
+    remaining = Counter(known)
+    unseen = []
+    for transaction, fingerprint in zip(transactions, fingerprints, strict=True):
+        if remaining[fingerprint] > 0:
+            remaining[fingerprint] -= 1
+        else:
+            unseen.append(transaction)
+    return unseen
+
+
+def known_fingerprints(process: InProcessJob, fingerprints: set[str]) -> Counter[str]:
+    assert process.transaction_source, "must have"
+    if not fingerprints:
+        return Counter()
+
+    rows = (
+        process.session.query(Transaction.fingerprint, func.count())
+        .filter(
+            Transaction.user_id == process.user.id,
+            Transaction.transaction_source_id == process.transaction_source.id,
+            Transaction.archived.is_(False),
+            Transaction.fingerprint.in_(fingerprints),
+        )
+        .group_by(Transaction.fingerprint)
+        .all()
+    )
+    return Counter(dict(rows))
+
+
+def skip_known_transactions(process: InProcessJob) -> InProcessJob:
+    """
+    Drops lines the source already has, from an overlapping statement or the
+    account's Plaid sync, before they're categorized and inserted again. The
+    file's own earlier transactions were removed before parsing, so a
+    reupload doesn't skip itself.
+    """
+    assert process.transactions, "must have"
+
+    transactions = process.transactions.transactions
+    fingerprints = partial_fingerprints(transactions)
+    known = known_fingerprints(process, set(fingerprints))
+    unseen = unseen_transactions(transactions, fingerprints, known)
+
+    skipped = len(transactions) - len(unseen)
+    logger.info(f"Skipping {skipped} of {len(transactions)} already known transactions")
+    if skipped:
+        queue_worker_status(
+            process.user,
+            status=ProcessingState.categorizing_transactions,
+            additional_info=(
+                f"Skipped {skipped} of {len(transactions)} transactions "
+                "already in this account"
+            ),
+            batch_id=process.batch_id,
+        )
+
+    return replace(process, transactions=TransactionsWrapper(transactions=unseen))
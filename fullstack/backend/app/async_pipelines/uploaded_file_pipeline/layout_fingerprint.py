@@ -0,0 +1,194 @@
+import logging
+import re
+from dataclasses import dataclass
+
+from sqlalchemy.orm import Session
+
+from app.async_pipelines.uploaded_file_pipeline.csv_parser import is_csv
+from app.async_pipelines.uploaded_file_pipeline.statement_text import PAGE_BREAK
+from app.models.upload_configuration import (
+    LayoutFingerprint,
+    UploadConfiguration,
+    UploadConfigurationId,
+)
+from app.models.user import UserId
+
+logger = logging.getLogger(__name__)
+
+# the letterhead, account summary and column headings are all near the top
+HEADER_LINES = 40
+_AMOUNT = re.compile(r"\d\.\d{2}\b")
+_WORD = re.compile(r"[a-z][a-z&']{2,}")
+# "ending in 1234", "XXXX-1234", "****1234", "Account Number: 000123451234"
+_ACCOUNT_MASK = re.compile(
+    r"(?:ending(?:\s+in)?|[x*•]{2,}|acct|account(?:\s+(?:number|no\.?|#))?)"
+    r"[\s:#-]*\d*?(\d{4})\b",
+    re.IGNORECASE,
+)
+_MONTHS = {
+    "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december", "jan", "feb", "mar", "apr",
+    "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+}  # fmt: skip
+
+# a layout needs this many stable words before it's trusted on its own
+MIN_LAYOUT_TOKENS = 5
+# share of a config's words a statement has to contain
+MIN_LAYOUT_SCORE = 0.8
+# and by how much it has to beat the next config, accounts at one bank look alike
+MIN_LAYOUT_MARGIN = 0.1
+
+
+def header_lines(raw_content: str, filename: str) -> list[str]:
+    lines = raw_content.split(PAGE_BREAK, 1)[0].splitlines()
+    if is_csv(filename):
+        # the rest of an export is rows
+        return lines[:1]
+    return [line for line in lines[:HEADER_LINES] if not _AMOUNT.search(line)]
+
+
+def layout_fingerprint(raw_content: str, filename: str) -> LayoutFingerprint:
+    """
+    The words of a statement's header that don't change month to month, and
+    the account numbers it shows, which tell apart accounts at one bank.
+    """
+    lines = header_lines(raw_content, filename)
+    tokens = {
+        word
+        for line in lines
+        for word in _WORD.findall(line.lower())
+        if word not in _MONTHS
+    }
+    masks = {mask for line in lines for mask in _ACCOUNT_MASK.findall(line)}
+    return LayoutFingerprint(tokens=sorted(tokens), account_masks=sorted(masks))
+
+
+def merge_fingerprints(
+    known: LayoutFingerprint | None, seen: LayoutFingerprint
+) -> LayoutFingerprint:
+    """
+    Words narrow to the ones every statement of the layout had, unless that
+    would leave too few to match on; account numbers add up, cards get
+    reissued.
+    """
+    if known is None:
+        return seen
+    stable = set(known.tokens) & set(seen.tokens)
+    tokens = stable if len(stable) >= MIN_LAYOUT_TOKENS else set(known.tokens)
+    return LayoutFingerprint(
+        tokens=sorted(tokens),
+        account_masks=sorted(set(known.account_masks) | set(seen.account_masks)),
+    )
+
+
+def layout_score(known: LayoutFingerprint, seen: LayoutFingerprint) -> float:
+    if len(known.tokens) < MIN_LAYOUT_TOKENS:
+        return 0.0
+    return len(set(known.tokens) & set(seen.tokens)) / len(known.tokens)
+
+
+@dataclass(frozen=True)
+class _CompiledConfig:
+    id: UploadConfigurationId
+    filename_regex: re.Pattern[str] | None
+    fingerprint: LayoutFingerprint | None
+
+
+def _compile(config: UploadConfiguration) -> _CompiledConfig:
+    try:
+        filename_regex = re.compile(config.filename_regex, re.IGNORECASE)
+    except re.error as e:
+        logger.warning(f"Ignoring bad filename regex of config {config.id}: {e}")
+        filename_regex = None
+    if filename_regex and filename_regex.search(""):
+        # matches any file, like the ".*" placeholders of Plaid accounts
+        filename_regex = None
+    return _CompiledConfig(config.id, filename_regex, config.layout_fingerprint)
+
+
+class ConfigMatcher:
+    """
+    A user's upload configurations, compiled once for a batch of files.
+    Configs learned while the batch runs are added, so the second statement
+    of a new bank doesn't go back to the LLM.
+    """
+
+    def __init__(self, configs: list[UploadConfiguration]) -> None:
+        self.configs = {config.id: _compile(config) for config in configs}
+
+    @classmethod
+    def load(cls, session: Session, user_id: UserId) -> "ConfigMatcher":
+        return cls(
+            session.query(UploadConfiguration)
+            .filter(UploadConfiguration.user_id == user_id)
+            .all()
+        )
+
+    def add(self, config: UploadConfiguration) -> None:
+        self.configs[config.id] = _compile(config)
+
+    def by_layout(self, seen: LayoutFingerprint) -> UploadConfigurationId | None:
+        """
+        A shared account number settles it; a different one rules the config
+        out however alike the layouts are.
+        """
+        masks = set(seen.account_masks)
+        candidates: list[tuple[UploadConfigurationId, LayoutFingerprint]] = []
+        for config in self.configs.values():
+            if config.fingerprint is None:
+                continue
+            known_masks = set(config.fingerprint.account_masks)
+            if masks and known_masks and not masks & known_masks:
+                continue
+            candidates.append((config.id, config.fingerprint))
+
+        by_mask = [
+            (id, known) for id, known in candidates if masks & set(known.account_masks)
+        ]
+        if len(by_mask) == 1:
+            return by_mask[0][0]
+
+        scored = sorted(
+            ((layout_score(known, seen), id) for id, known in by_mask or candidates),
+            reverse=True,
+        )
+        if not scored or scored[0][0] < MIN_LAYOUT_SCORE:
+            return None
+        if len(scored) > 1 and scored[0][0] - scored[1][0] < MIN_LAYOUT_MARGIN:
+            return None
+        return scored[0][1]
+
+    def by_account(self, seen: LayoutFingerprint) -> UploadConfigurationId | None:
+        masks = set(seen.account_masks)
+        matches = [
+            config.id
+            for config in self.configs.values()
+            if config.fingerprint and masks & set(config.fingerprint.account_masks)
+        ]
+        return matches[0] if len(matches) == 1 else None
+
+    def _named(self, filename: str) -> list[_CompiledConfig]:
+        return [
+            config
+            for config in self.configs.values()
+            if config.filename_regex and config.filename_regex.search(filename)
+        ]
+
+    def by_filename(self, filename: str) -> UploadConfigurationId | None:
+        return next((config.id for config in self._named(filename)), None)
+
+    def match(
+        self, filename: str, seen: LayoutFingerprint
+    ) -> UploadConfigurationId | None:
+        """
+        Layout first, so a renamed download still finds its config. A config
+        the filename names that hasn't seen a statement yet has no layout to
+        compare, so then only an account number can give the file to a
+        lookalike sibling that has.
+        """
+        unlearned = next(
+            (c.id for c in self._named(filename) if c.fingerprint is None), None
+        )
+        if unlearned is not None:
+            return self.by_account(seen) or unlearned
+        return self.by_layout(seen) or self.by_filename(filename)
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from datetime import date
 from typing import Annotated, Any, Callable, Generic, Literal, Optional, TypeVar
 from pydantic import BaseModel, Field, create_model
 
@@ -137,11 +138,15 @@ class InProcessJob:
     user: User
     batch_id: str
     file: UploadedPdf | None = None
+    # the file's text, loaded only by the stages that parse it
+    raw_content: str | None = None
     job: WorkerJob | None = None
     config: UploadConfiguration | None = None
     transaction_source: TransactionSource | None = None
     categories: list[Category] | None = None
     transactions: TransactionsWrapper | None = None
+    # dates Plaid gave as dates, so they aren't read back from the prompt's strings
+    transaction_dates: dict[PlaidTransactionId, date] | None = None
     transactions_to_delete: list[PlaidTransactionId] | None = None
     existing_transactions: list[Transaction] | None = None
     categorized_transactions: list[CategorizedTransaction] | None = None
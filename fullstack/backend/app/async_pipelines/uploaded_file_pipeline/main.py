@@ -8,13 +8,23 @@ from app.async_pipelines.uploaded_file_pipeline.categorizer import (
     insert_categorized_transactions,
     update_filejob_with_nickname,
 )
+from app.async_pipelines.uploaded_file_pipeline.known_transactions import (
+    skip_known_transactions,
+)
+from app.async_pipelines.uploaded_file_pipeline.layout_fingerprint import (
+    ConfigMatcher,
+)
 from app.async_pipelines.uploaded_file_pipeline.local_types import InProcessJob
+from app.async_pipelines.uploaded_file_pipeline.text_extraction import (
+    extract_pending_text,
+)
 from app.async_pipelines.uploaded_file_pipeline.transaction_parser import (
     apply_upload_config,
     archive_transactions_if_necessary,
-    request_llm_parse_of_transactions,
+    parse_transactions,
 )
 from app.func_utils import pipe
+from app.models.user import UserId
 from app.models.worker_status import ProcessingState
 
 
@@ -35,9 +45,17 @@ def persist_config_to_job_record(in_process: InProcessJob) -> InProcessJob:
 
 
 async def uploaded_file_pipeline(in_process_files: list[InProcessJob]) -> None:
-    in_process_with_config = [
-        apply_upload_config(in_process) for in_process in in_process_files
-    ]
+    in_process_files = await extract_pending_text(in_process_files)
+    # one per user, so a batch's statements share what the first ones taught
+    matchers: dict[UserId, ConfigMatcher] = {}
+    in_process_with_config = []
+    for in_process in in_process_files:
+        user_id = in_process.user.id
+        if user_id not in matchers:
+            matchers[user_id] = ConfigMatcher.load(in_process.session, user_id)
+        in_process_with_config.append(
+            apply_upload_config(in_process, matchers[user_id])
+        )
     print(f"batch processing {len(in_process_with_config)}")
     await async_batch_process_files_with_config(in_process_with_config)
 
@@ -69,19 +87,26 @@ async def process_file_async(in_process: InProcessJob) -> None:
                 status=ProcessingState.parsing_transactions,
                 additional_info="Parsing transactions from file",
             ),
-            request_llm_parse_of_transactions,
+            parse_transactions,
             lambda x: status_update_monad(
                 x,
                 status=ProcessingState.categorizing_transactions,
-                additional_info="Categorizing batches of transactions",
+                additional_info="Updating file nickname",
             ),
-            categorize_extracted_transactions,
+            # named for the whole statement, before known lines are dropped
+            update_filejob_with_nickname,
             lambda x: status_update_monad(
                 x,
                 status=ProcessingState.categorizing_transactions,
-                additional_info="Updating file nickname",
+                additional_info="Skipping transactions already in the account",
             ),
-            update_filejob_with_nickname,
+            skip_known_transactions,
+            lambda x: status_update_monad(
+                x,
+                status=ProcessingState.categorizing_transactions,
+                additional_info="Categorizing batches of transactions",
+            ),
+            categorize_extracted_transactions,
             lambda x: status_update_monad(
                 x,
                 status=ProcessingState.categorizing_transactions,
@@ -0,0 +1,519 @@
+import logging
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, replace
+from datetime import datetime
+
+from app.async_pipelines.uploaded_file_pipeline.categorizer import transaction_dates
+from app.async_pipelines.uploaded_file_pipeline.csv_parser import parse_amount
+from app.async_pipelines.uploaded_file_pipeline.local_types import (
+    InProcessJob,
+    PartialTransaction,
+    TransactionsWrapper,
+)
+from app.async_pipelines.uploaded_file_pipeline.statement_text import (
+    transaction_region,
+)
+from app.categorization.memo import normalize_description
+from app.date_utils import date_parser, parse_date
+from app.models.upload_configuration import ParseTemplate, TemplateLine
+
+logger = logging.getLogger(__name__)
+
+# order matters, longer formats first so "Apr 02, 2025" isn't read as "Apr 02"
+DATE_PATTERNS: dict[str, str] = {
+    "%m/%d/%Y": r"\d{1,2}/\d{1,2}/\d{4}",
+    "%m/%d/%y": r"\d{1,2}/\d{1,2}/\d{2}",
+    "%m/%d": r"\d{1,2}/\d{1,2}",
+    "%m-%d-%Y": r"\d{1,2}-\d{1,2}-\d{4}",
+    "%Y-%m-%d": r"\d{4}-\d{2}-\d{2}",
+    "%b %d, %Y": r"[A-Z][a-z]{2} \d{1,2}, \d{4}",
+    "%b %d": r"[A-Z][a-z]{2} \d{1,2}",
+    "%d %b": r"\d{1,2} [A-Z][a-z]{2}",
+}
+AMOUNT_PATTERN = r"\(?-?\$?-?[\d,]*\d\.\d{2}\)?-?"
+
+# a template is only kept if it reproduces the LLM parse this closely
+MIN_AGREEMENT = 0.95
+# and only applied if it explains this many of the transaction looking lines
+MIN_MATCH_RATE = 0.9
+MIN_BALANCE_RATIO = 0.9
+# a row shape must cover this share of the examples to get its own regex
+MIN_SHAPE_SHARE = 0.1
+
+_LEADING_DATE = re.compile(
+    "^(" + "|".join(DATE_PATTERNS.values()) + r")\s+(\S.*)$", re.IGNORECASE
+)
+_TRAILING_AMOUNT = re.compile(r"^(.*\S)\s+(" + AMOUNT_PATTERN + ")$")
+_FULL_DATE = re.compile(
+    r"\d{1,2}/\d{1,2}/\d{4}|\d{4}-\d{2}-\d{2}|[A-Z][a-z]{2}[a-z]*\.? \d{1,2}, \d{4}"
+)
+# "Statement Period 11/16/2025 - 12/15/2025", "November 16, 2025 through ..."
+_PERIOD = re.compile(
+    rf"(?P<start>{_FULL_DATE.pattern})\s*(?:-|–|to|through|thru)\s*"
+    rf"(?P<end>{_FULL_DATE.pattern})",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class Cell:
+    text: str
+    kind: str  # "date:<format>", "amount" or "text"
+
+
+@dataclass(frozen=True)
+class TemplateRow:
+    month: int
+    day: int
+    year: int | None
+    description: str
+    amount: float
+    kind: str
+    balance: float | None
+
+
+def classify(text: str) -> str:
+    for date_format, pattern in DATE_PATTERNS.items():
+        if re.fullmatch(pattern, text) and _parse_date(text, date_format):
+            return f"date:{date_format}"
+    if re.fullmatch(AMOUNT_PATTERN, text):
+        return "amount"
+    return "text"
+
+
+def _parse_date(text: str, date_format: str) -> datetime | None:
+    # a leap year, so "02/29" parses without knowing the real one
+    if "%Y" not in date_format and "%y" not in date_format:
+        return date_parser(f"{date_format} %Y")(f"{text} 2000")
+    return date_parser(date_format)(text)
+
+
+def split_cells(line: str) -> list[Cell]:
+    """Columns of a layout line; a date or amount only one space away is split off."""
+    parts = [part for part in re.split(r"\s{2,}", line.strip()) if part]
+    if not parts:
+        return []
+
+    leading = _LEADING_DATE.match(parts[0])
+    if leading and classify(leading.group(1)) != "text":
+        parts[:1] = [leading.group(1), leading.group(2)]
+    trailing = _TRAILING_AMOUNT.match(parts[-1])
+    if trailing and classify(parts[-1]) == "text":
+        parts[-1:] = [trailing.group(1), trailing.group(2)]
+
+    return [Cell(text=part, kind=classify(part)) for part in parts]
+
+
+def _line_description(cells: list[Cell]) -> str:
+    return " ".join(cell.text for cell in cells if cell.kind == "text")
+
+
+def _looks_like_transaction(cells: list[Cell]) -> bool:
+    return (
+        bool(cells)
+        and cells[0].kind.startswith("date:")
+        and any(cell.kind == "amount" for cell in cells)
+    )
+
+
+def _shape(cells: list[Cell]) -> tuple[str, ...]:
+    """Cell kinds, with runs of text collapsed since they form one description."""
+    shape: list[str] = []
+    for cell in cells:
+        if cell.kind == "text" and shape and shape[-1] == "text":
+            continue
+        shape.append(cell.kind)
+    return tuple(shape)
+
+
+def _collapsed(cells: list[Cell]) -> list[Cell]:
+    """Cells lined up with _shape, so positions match the shape's."""
+    out: list[Cell] = []
+    for cell in cells:
+        if cell.kind == "text" and out and out[-1].kind == "text":
+            out[-1] = Cell(text=f"{out[-1].text} {cell.text}", kind="text")
+        else:
+            out.append(cell)
+    return out
+
+
+def _build_pattern(shape: tuple[str, ...], amount_index: int) -> str:
+    amount_positions = [i for i, kind in enumerate(shape) if kind == "amount"]
+    later_amounts = [i for i in amount_positions if i > amount_index]
+    balance_index = later_amounts[-1] if later_amounts else None
+    seen_date = seen_text = False
+
+    parts: list[str] = []
+    for index, kind in enumerate(shape):
+        if kind.startswith("date:"):
+            pattern = DATE_PATTERNS[kind.removeprefix("date:")]
+            parts.append(pattern if seen_date else f"(?P<date>{pattern})")
+            seen_date = True
+        elif kind == "amount":
+            name = (
+                "amount"
+                if index == amount_index
+                else "balance"
+                if index == balance_index
+                else None
+            )
+            parts.append(f"(?P<{name}>{AMOUNT_PATTERN})" if name else AMOUNT_PATTERN)
+        else:
+            parts.append(".+?" if seen_text else "(?P<description>.+?)")
+            seen_text = True
+    return r"^\s*" + r"\s+".join(parts) + r"\s*$"
+
+
+def _kind_rule(
+    examples: list[tuple[float, int, str]],
+) -> dict[str, object] | None:
+    """
+    Learn how withdrawals and deposits differ on a row shape, from
+    (signed amount, end column of the amount, kind) examples.
+    """
+    by_sign = defaultdict(set)
+    for amount, _, kind in examples:
+        by_sign[amount < 0].add(kind)
+    if all(len(kinds) == 1 for kinds in by_sign.values()):
+        if True in by_sign:
+            negative_is_withdrawal = by_sign[True] == {"withdrawal"}
+        else:
+            negative_is_withdrawal = by_sign[False] != {"withdrawal"}
+        return {"kind_rule": "sign", "negative_is_withdrawal": negative_is_withdrawal}
+
+    withdrawal_ends = [end for _, end, kind in examples if kind == "withdrawal"]
+    deposit_ends = [end for _, end, kind in examples if kind == "deposit"]
+    if withdrawal_ends and deposit_ends and max(withdrawal_ends) < min(deposit_ends):
+        # separate withdrawal and deposit columns
+        return {"kind_rule": "position", "deposit_after": max(withdrawal_ends)}
+
+    return None
+
+
+def _period_end(content: str) -> datetime | None:
+    """
+    The last day the statement covers: the end of its printed period, else
+    the latest full date on it, which is at most a due date a few weeks on.
+    """
+    periods = [parse_date(match.group("end")) for match in _PERIOD.finditer(content)]
+    ends = [end for end in periods if end]
+    if ends:
+        return ends[0]
+    dates = [parse_date(match.group(0)) for match in _FULL_DATE.finditer(content)]
+    return max((date for date in dates if date), default=None)
+
+
+def _nearest_year(month: int, day: int, anchor: datetime) -> int | None:
+    """The year that puts month/day closest to the statement's end."""
+    candidates = []
+    for year in (anchor.year - 1, anchor.year, anchor.year + 1):
+        try:
+            candidates.append(datetime(year, month, day))
+        except ValueError:
+            # 02/29 outside a leap year
+            continue
+    if not candidates:
+        return None
+    return min(candidates, key=lambda date: abs(date - anchor)).year
+
+
+def _resolve_year(rows: list[TemplateRow], content: str) -> list[int] | None:
+    """
+    Years for rows whose date doesn't carry one, each the year nearest the
+    statement's end, so a December statement with a January due date keeps
+    its rows in December's year and one spanning new year splits them.
+    """
+    anchor = _period_end(content)
+    if anchor is None:
+        return None
+    years = []
+    for row in rows:
+        year = (
+            row.year
+            if row.year is not None
+            else _nearest_year(row.month, row.day, anchor)
+        )
+        if year is None:
+            return None
+        years.append(year)
+    return years
+
+
+def _row_from_match(match: re.Match[str], line: TemplateLine) -> TemplateRow | None:
+    date = _parse_date(match.group("date"), line.date_format)
+    amount = parse_amount(match.group("amount"))
+    if date is None or amount is None:
+        return None
+    balance = (
+        parse_amount(match.group("balance"))
+        if "balance" in match.re.groupindex and match.group("balance")
+        else None
+    )
+
+    if line.kind_rule == "sign":
+        kind = (
+            "withdrawal" if (amount < 0) == line.negative_is_withdrawal else "deposit"
+        )
+    else:
+        assert line.deposit_after is not None, "must have"
+        kind = "deposit" if match.end("amount") > line.deposit_after else "withdrawal"
+
+    has_year = "%Y" in line.date_format or "%y" in line.date_format
+    return TemplateRow(
+        month=date.month,
+        day=date.day,
+        year=date.year if has_year else None,
+        description=match.group("description").strip(),
+        amount=abs(amount),
+        kind=kind,
+        balance=balance,
+    )
+
+
+def match_template(
+    content: str, template: ParseTemplate
+) -> tuple[list[TemplateRow], int]:
+    """Rows the template matches, and how many lines looked like transactions."""
+    compiled = [(re.compile(line.pattern), line) for line in template.lines]
+    skip = set(template.skip_descriptions)
+
+    rows: list[TemplateRow] = []
+    candidates = 0
+    for text in content.splitlines():
+        cells = split_cells(text)
+        if not _looks_like_transaction(cells):
+            continue
+        if normalize_description(_line_description(cells)) in skip:
+            continue
+        candidates += 1
+        for regex, line in compiled:
+            match = regex.match(text)
+            row = _row_from_match(match, line) if match else None
+            if row:
+                rows.append(row)
+                break
+    return rows, candidates
+
+
+def balances_add_up(rows: list[TemplateRow]) -> bool:
+    pairs = [
+        (previous, current)
+        for previous, current in zip(rows, rows[1:], strict=False)
+        if previous.balance is not None and current.balance is not None
+    ]
+    if len(pairs) < 3:
+        return True
+
+    def consistent(withdrawal_sign: int) -> int:
+        return sum(
+            1
+            for previous, current in pairs
+            if abs(
+                previous.balance  # type: ignore[operator]
+                + (
+                    withdrawal_sign
+                    if current.kind == "withdrawal"
+                    else -withdrawal_sign
+                )
+                * current.amount
+                - current.balance  # type: ignore[operator]
+            )
+            < 0.011
+        )
+
+    # bank balances go down on a withdrawal, card balances go up
+    return max(consistent(-1), consistent(1)) / len(pairs) >= MIN_BALANCE_RATIO
+
+
+def _key(month: int, day: int, amount: float, kind: str) -> tuple[int, int, float, str]:
+    return (month, day, round(abs(amount), 2), kind)
+
+
+def derive_template(
+    content: str, transactions: list[PartialTransaction]
+) -> ParseTemplate | None:
+    """
+    Learn row regexes from an LLM parse of the same statement, and keep them
+    only if they reproduce that parse.
+    """
+    lines_by_index: dict[int, list[Cell]] = {}
+    lines_by_day: dict[tuple[int, int], list[tuple[int, list[Cell]]]] = defaultdict(
+        list
+    )
+    for index, text in enumerate(content.splitlines()):
+        cells = split_cells(text)
+        if not _looks_like_transaction(cells):
+            continue
+        lines_by_index[index] = cells
+        date = _parse_date(cells[0].text, cells[0].kind.removeprefix("date:"))
+        if date:
+            lines_by_day[(date.month, date.day)].append((index, cells))
+
+    raw_lines = content.splitlines()
+    used: set[int] = set()
+    examples: dict[tuple[tuple[str, ...], int], list[tuple[float, int, str]]] = (
+        defaultdict(list)
+    )
+    expected: Counter[tuple[int, int, float, str]] = Counter()
+    for transaction, date in zip(
+        transactions, transaction_dates(transactions), strict=True
+    ):
+        expected[
+            _key(
+                date.month,
+                date.day,
+                transaction.partialTransactionAmount,
+                transaction.partialTransactionKind,
+            )
+        ] += 1
+        for index, cells in lines_by_day.get((date.month, date.day), []):
+            if index in used:
+                continue
+            shape = _shape(cells)
+            amount_cells = [
+                (position, cell)
+                for position, cell in enumerate(_collapsed(cells))
+                if cell.kind == "amount"
+            ]
+            found = next(
+                (
+                    (position, cell)
+                    for position, cell in amount_cells
+                    if abs(parse_amount(cell.text) or 0)
+                    == round(abs(transaction.partialTransactionAmount), 2)
+                ),
+                None,
+            )
+            if not found:
+                continue
+            position, cell = found
+            used.add(index)
+            end = raw_lines[index].rfind(cell.text) + len(cell.text)
+            examples[(shape, position)].append(
+                (
+                    parse_amount(cell.text) or 0,
+                    end,
+                    transaction.partialTransactionKind,
+                )
+            )
+            break
+
+    total = sum(len(group) for group in examples.values())
+    lines: list[TemplateLine] = []
+    for (shape, amount_index), group in sorted(
+        examples.items(), key=lambda item: len(item[1]), reverse=True
+    ):
+        if len(group) < 2 or len(group) / total < MIN_SHAPE_SHARE:
+            continue
+        rule = _kind_rule(group)
+        if rule is None:
+            continue
+        lines.append(
+            TemplateLine(
+                pattern=_build_pattern(shape, amount_index),
+                date_format=shape[0].removeprefix("date:"),
+                **rule,  # type: ignore[arg-type]
+            )
+        )
+    if not lines:
+        return None
+
+    # transaction looking lines the LLM left out, e.g. the opening balance
+    kept = {normalize_description(_line_description(lines_by_index[i])) for i in used}
+    skip = {
+        normalize_description(_line_description(cells))
+        for index, cells in lines_by_index.items()
+        if index not in used
+    }
+    template = ParseTemplate(lines=lines, skip_descriptions=sorted(skip - kept - {""}))
+    rows, _ = match_template(content, template)
+    produced = Counter(_key(r.month, r.day, r.amount, r.kind) for r in rows)
+
+    agreed = sum((produced & expected).values())
+    precision = agreed / max(sum(produced.values()), 1)
+    recall = agreed / max(sum(expected.values()), 1)
+    if precision < MIN_AGREEMENT or recall < MIN_AGREEMENT:
+        logger.info(
+            f"Discarding parse template, precision {precision:.2f} recall {recall:.2f}"
+        )
+        return None
+    return template
+
+
+def parse_with_template(
+    region: str, template: ParseTemplate, statement: str
+) -> list[PartialTransaction] | None:
+    """
+    Rows of the transaction region, dated by the period the statement
+    covers. None when the template no longer fits.
+    """
+    rows, candidates = match_template(region, template)
+    if not rows or len(rows) / max(candidates, 1) < MIN_MATCH_RATE:
+        logger.info(f"Parse template matched {len(rows)} of {candidates} rows")
+        return None
+    if not balances_add_up(rows):
+        logger.info("Parse template rows don't add up to the running balance")
+        return None
+
+    years = _resolve_year(rows, statement)
+    if years is None:
+        return None
+
+    return [
+        PartialTransaction(
+            partialTransactionId=None,
+            partialPlaidTransactionId=None,
+            partialTransactionDateOfTransaction=f"{row.month:02d}/{row.day:02d}/{year}",
+            partialTransactionDescription=row.description,
+            partialTransactionKind=row.kind,  # type: ignore[arg-type]
+            partialTransactionAmount=row.amount,
+        )
+        for row, year in zip(rows, years, strict=True)
+    ]
+
+
+def statement_region(process: InProcessJob) -> str:
+    assert process.file, "must have"
+    assert process.config, "must have"
+    assert process.raw_content is not None, "loaded before parsing"
+    return transaction_region(
+        process.raw_content,
+        process.config.start_keyword,
+        process.config.end_keyword,
+    )
+
+
+def parse_pdf_with_template(process: InProcessJob) -> InProcessJob | None:
+    assert process.config, "must have"
+    if not process.config.parse_template:
+        return None
+
+    assert process.file, "must have"
+    assert process.raw_content is not None, "loaded before parsing"
+    transactions = parse_with_template(
+        statement_region(process),
+        process.config.parse_template,
+        process.raw_content,
+    )
+    if transactions is None:
+        return None
+
+    logger.info(f"Parsed {len(transactions)} statement rows with the template")
+    return replace(process, transactions=TransactionsWrapper(transactions=transactions))
+
+
+def learn_parse_template(process: InProcessJob) -> InProcessJob:
+    """After an LLM parse, keep a template for the next statement if one fits."""
+    assert process.config, "must have"
+    if not process.transactions or not process.transactions.transactions:
+        return process
+
+    template = derive_template(
+        statement_region(process), process.transactions.transactions
+    )
+    if template:
+        logger.info(f"Learned a parse template with {len(template.lines)} row shapes")
+        process.config.parse_template = template
+        process.session.add(process.config)
+    return process
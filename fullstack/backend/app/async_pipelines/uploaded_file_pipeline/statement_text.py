@@ -0,0 +1,121 @@
+import logging
+import re
+from collections import Counter
+from collections.abc import Callable
+from functools import cache
+
+from app.open_ai_utils import MODEL
+
+logger = logging.getLogger(__name__)
+
+# a line with a money amount on it is never treated as a page header or footer
+_AMOUNT = re.compile(r"\d\.\d{2}\b")
+_DIGITS = re.compile(r"\d+")
+_LAYOUT_GAP = re.compile(r"[ \t]{2,}")
+PAGE_BREAK = "\f"
+
+
+@cache
+def _tokenizer() -> Callable[[str], int] | None:
+    try:
+        import tiktoken
+
+        encoding = tiktoken.encoding_for_model(MODEL)
+    except Exception as e:
+        # not installed, or the encoding files can't be fetched
+        logger.warning(f"No tokenizer for {MODEL}, estimating tokens: {e}")
+        return None
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def count_tokens(text: str) -> int:
+    count = _tokenizer()
+    if count is None:
+        return len(text) // 4 + 1
+    return count(text)
+
+
+def transaction_region(
+    content: str, start_keyword: str | None, end_keyword: str | None
+) -> str:
+    """
+    The part of the statement between the config's keywords. A keyword that
+    isn't found leaves that end of the text alone, and the widest span is
+    taken so a keyword repeated in a page header can't cut transactions off.
+    """
+    lowered = content.lower()
+    start = lowered.find(start_keyword.lower()) if start_keyword else -1
+    start = max(start, 0)
+    end = lowered.rfind(end_keyword.lower()) if end_keyword else -1
+    if end <= start:
+        end = len(content)
+    return content[start:end]
+
+
+def _page_key(line: str) -> str:
+    # "Page 2 of 5" and "Page 3 of 5" are the same footer
+    return _DIGITS.sub("#", line)
+
+
+def drop_repeated_page_lines(content: str) -> list[str]:
+    """
+    Lines of the text, minus page headers and footers after their first
+    appearance: lines without an amount that show up on most pages.
+    """
+    pages = [page.splitlines() for page in content.split(PAGE_BREAK)]
+    if len(pages) < 2:
+        return pages[0] if pages else []
+
+    on_pages = Counter(
+        key
+        for page in pages
+        for key in {
+            _page_key(line) for line in page if line and not _AMOUNT.search(line)
+        }
+    )
+    repeated = {
+        key for key, count in on_pages.items() if count >= 2 and count * 2 >= len(pages)
+    }
+
+    seen: set[str] = set()
+    lines: list[str] = []
+    for page in pages:
+        for line in page:
+            key = _page_key(line)
+            if key in repeated:
+                if key in seen:
+                    continue
+                seen.add(key)
+            lines.append(line)
+    return lines
+
+
+def compact_line(line: str) -> str:
+    """Column padding down to a two space gap, which still reads as a column."""
+    return _LAYOUT_GAP.sub("  ", line.strip())
+
+
+def prepare_statement_text(
+    content: str, start_keyword: str | None, end_keyword: str | None
+) -> list[str]:
+    region = transaction_region(content, start_keyword, end_keyword)
+    lines = (compact_line(line) for line in drop_repeated_page_lines(region))
+    return [line for line in lines if line]
+
+
+def chunk_lines(lines: list[str], max_tokens: int) -> list[str]:
+    """Greedy chunks of whole lines, each within `max_tokens`."""
+    chunks: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+    for line in lines:
+        # the newline joining it to the chunk costs a token too
+        tokens = count_tokens(line) + 1
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
@@ -0,0 +1,223 @@
+import asyncio
+import csv
+import io
+import logging
+import multiprocessing
+import os
+import re
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from functools import cache
+
+from app.async_pipelines.uploaded_file_pipeline.local_types import (
+    InProcessJob,
+    PdfParseException,
+)
+from app.db import Session
+from app.models.uploaded_pdf import (
+    UploadedFileBytes,
+    UploadedFileContent,
+    UploadedPdfId,
+)
+from app.models.worker_job import JobStatus
+from app.models.worker_status import ProcessingState
+from app.worker.status import log_completed, queue_worker_status
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".pdf", ".csv")
+
+# shared by every file the worker has in flight, pdftotext is CPU bound
+EXTRACTION_PROCESSES = 4
+# a statement longer than this is converted in page ranges side by side
+PAGES_PER_CHUNK = 10
+
+_PAGES = re.compile(r"^Pages:\s+(\d+)", re.MULTILINE)
+
+
+def is_supported_file(filename: str) -> bool:
+    _, extension = os.path.splitext(filename.lower())
+    return extension in SUPPORTED_EXTENSIONS
+
+
+def extract_text_from_csv(content_bytes: bytes) -> str:
+    """Normalized CSV, quoted properly so the worker can read the rows back."""
+    text_stream = io.StringIO(content_bytes.decode("utf-8-sig", errors="replace"))
+    out = io.StringIO()
+    csv.writer(out, lineterminator="\n").writerows(csv.reader(text_stream))
+    return out.getvalue().strip()
+
+
+def _run(args: list[str]) -> str:
+    try:
+        result = subprocess.run(args, capture_output=True, check=True, text=True)
+    except subprocess.CalledProcessError as e:
+        raise PdfParseException(f"Failed to extract text from PDF: {e.stderr}") from e
+    return result.stdout
+
+
+def pdf_page_count(path: str) -> int:
+    match = _PAGES.search(_run(["pdfinfo", path]))
+    if not match:
+        raise PdfParseException("Failed to read the page count of the PDF")
+    return int(match.group(1))
+
+
+def extract_pdf_pages(path: str, first: int, last: int) -> str:
+    """
+    Text of pages `first` to `last` using `pdftotext`. Every page ends in a
+    form feed, so the ranges join back into the whole document's output.
+    """
+    return _run(["pdftotext", "-layout", "-f", str(first), "-l", str(last), path, "-"])
+
+
+def page_ranges(pages: int, per_chunk: int = PAGES_PER_CHUNK) -> list[tuple[int, int]]:
+    return [
+        (first, min(first + per_chunk - 1, pages))
+        for first in range(1, pages + 1, per_chunk)
+    ]
+
+
+@cache
+def extraction_pool() -> ProcessPoolExecutor:
+    # spawned, the worker process has threads and open connections to fork
+    return ProcessPoolExecutor(
+        max_workers=EXTRACTION_PROCESSES,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def extract_text_from_csv_file(path: str) -> str:
+    with open(path, "rb") as f:
+        return extract_text_from_csv(f.read())
+
+
+async def extract_text_from_pdf(path: str) -> str:
+    loop = asyncio.get_running_loop()
+    pool = extraction_pool()
+    pages = await loop.run_in_executor(pool, pdf_page_count, path)
+    chunks = await asyncio.gather(
+        *[
+            loop.run_in_executor(pool, extract_pdf_pages, path, first, last)
+            for first, last in page_ranges(pages)
+        ]
+    )
+    return "".join(chunks).strip()
+
+
+async def extract_raw_text(path: str, filename: str) -> str:
+    _, extension = os.path.splitext(filename.lower())
+    if extension == ".pdf":
+        return await extract_text_from_pdf(path)
+    elif extension == ".csv":
+        return await asyncio.get_running_loop().run_in_executor(
+            extraction_pool(), extract_text_from_csv_file, path
+        )
+    else:
+        raise ValueError("Unsupported file type")
+
+
+def load_raw_content(session: Session, pdf_id: UploadedPdfId) -> str | None:
+    return (
+        session.query(UploadedFileContent.content)
+        .filter(UploadedFileContent.uploaded_pdf_id == pdf_id)
+        .scalar()
+    )
+
+
+def with_raw_content(process: InProcessJob) -> InProcessJob:
+    """The job with its file's text, for the stages that parse it."""
+    assert process.file, "must have"
+    if process.raw_content is not None:
+        return process
+    raw_content = load_raw_content(process.session, process.file.id)
+    assert raw_content is not None, "extracted before parsing"
+    return replace(process, raw_content=raw_content)
+
+
+def has_raw_content(session: Session, pdf_id: UploadedPdfId) -> bool:
+    return (
+        session.query(UploadedFileContent.uploaded_pdf_id)
+        .filter(UploadedFileContent.uploaded_pdf_id == pdf_id)
+        .scalar()
+        is not None
+    )
+
+
+async def extract_file_text(process: InProcessJob) -> None:
+    """Store the text of a file the upload only stored the bytes of."""
+    if process.file is None or has_raw_content(process.session, process.file.id):
+        return
+
+    queue_worker_status(
+        process.user,
+        status=ProcessingState.preparing_for_parse,
+        additional_info="Extracting text from file",
+        batch_id=process.batch_id,
+    )
+    of_file = UploadedFileBytes.uploaded_pdf_id == process.file.id
+    chunks = (
+        process.session.query(UploadedFileBytes.content)
+        .filter(of_file)
+        .order_by(UploadedFileBytes.chunk_index)
+    )
+    started = time.perf_counter()
+    _, extension = os.path.splitext(process.file.filename.lower())
+    with tempfile.NamedTemporaryFile(suffix=extension) as tmp:
+        for (chunk,) in chunks.yield_per(1):
+            tmp.write(chunk)
+        tmp.flush()
+        raw_content = await extract_raw_text(tmp.name, process.file.filename)
+    process.session.add(
+        UploadedFileContent(
+            uploaded_pdf_id=process.file.id,
+            user_id=process.user.id,
+            content=raw_content,
+        )
+    )
+    logger.info(
+        f"Extracted {len(raw_content)} characters from "
+        f"{process.file.filename} in {time.perf_counter() - started:.2f}s"
+    )
+    process.session.query(UploadedFileBytes).filter(of_file).delete()
+    process.session.commit()
+
+
+def fail_extraction(process: InProcessJob, error: Exception) -> None:
+    assert process.file, "must have"
+    logger.error(f"Failed to extract text from {process.file.filename}: {error}")
+    process.session.rollback()
+    if process.job:
+        process.job.status = JobStatus.failed
+        process.job.error_messages = str(error)
+        process.session.add(process.job)
+        process.session.commit()
+    log_completed(
+        process,
+        additional_info=f"Could not read {process.file.filename}",
+        status=ProcessingState.failed,
+    )
+
+
+async def extract_pending_text(
+    in_process_files: list[InProcessJob],
+) -> list[InProcessJob]:
+    """
+    The jobs whose file text is ready. A file that can't be read fails its
+    own job and is left out, the rest of the batch carries on.
+    """
+    results = await asyncio.gather(
+        *[extract_file_text(p) for p in in_process_files], return_exceptions=True
+    )
+    extracted = []
+    for process, result in zip(in_process_files, results, strict=True):
+        if isinstance(result, Exception):
+            fail_extraction(process, result)
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            extracted.append(process)
+    return extracted
@@ -1,33 +1,60 @@
 import logging
-import re
 from dataclasses import replace
 
 from app.async_pipelines.uploaded_file_pipeline.configuration_creator import (
     create_configurations,
 )
+from app.async_pipelines.uploaded_file_pipeline.csv_parser import (
+    is_csv,
+    parse_csv_transactions,
+)
+from app.async_pipelines.uploaded_file_pipeline.layout_fingerprint import (
+    ConfigMatcher,
+    layout_fingerprint,
+    merge_fingerprints,
+)
 from app.async_pipelines.uploaded_file_pipeline.local_types import (
     InProcessJob,
     TransactionsWrapper,
 )
+from app.async_pipelines.uploaded_file_pipeline.pdf_template import (
+    learn_parse_template,
+    parse_pdf_with_template,
+)
+from app.async_pipelines.uploaded_file_pipeline.text_extraction import (
+    with_raw_content,
+)
+from app.async_pipelines.uploaded_file_pipeline.statement_text import (
+    chunk_lines,
+    count_tokens,
+    prepare_statement_text,
+)
 from app.models.category import Category
+from app.models.llm_call_log import LLMStage
 from app.models.transaction import Transaction
 from app.models.transaction_source import TransactionSource
 from app.models.upload_configuration import UploadConfiguration
 from app.models.worker_job import JobStatus, WorkerJob
 from app.models.worker_status import ProcessingState
 
-from app.open_ai_utils import ChatMessage, make_chat_request
-from app.worker.status import update_worker_status
+from app.open_ai_utils import ChatMessage, make_chat_requests
+from app.worker.llm_calls import llm_stage
+from app.worker.status import queue_worker_status
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# same budget the chunks were always sized to, now counted in real tokens
+MAX_PROMPT_TOKENS = 6000
+
 
 def generate_transactions_prompt(process: InProcessJob) -> list[str]:
     """Generate the AI prompt(s) for parsing transactions."""
 
     assert process.transaction_source, "must have"
     assert process.file, "must have"
+    assert process.config, "must have"
+    assert process.raw_content is not None, "loaded before parsing"
 
     base_prompt = f"""
         Parse the following PDF content into a JSON array of transactions.
@@ -42,35 +69,22 @@ def generate_transactions_prompt(process: InProcessJob) -> list[str]:
         {process.file.filename}
     """
 
-    max_tokens = 9000
-    reserved_for_prompt = 3000  # assume this base_prompt takes up ~3000 tokens
-    max_chunk_tokens = max_tokens - reserved_for_prompt
-    max_chunk_chars = max_chunk_tokens * 4  # rough estimate of char limit
-
-    content = process.file.raw_content
-
-    # Split into lines and batch based on char length
-    lines = content.splitlines()
-    prompts: list[str] = []
-    current_chunk: list[str] = []
-
-    current_len = 0
-    for line in lines:
-        if current_len + len(line) > max_chunk_chars:
-            chunk_text = "\n".join(current_chunk)
-            prompts.append(base_prompt + chunk_text)
-            current_chunk = [line]
-            current_len = len(line)
-        else:
-            current_chunk.append(line)
-            current_len += len(line)
-
-    # Append last chunk
-    if current_chunk:
-        chunk_text = "\n".join(current_chunk)
-        prompts.append(base_prompt + chunk_text)
+    content = process.raw_content
+    lines = prepare_statement_text(
+        content, process.config.start_keyword, process.config.end_keyword
+    )
+    chunks = chunk_lines(lines, MAX_PROMPT_TOKENS - count_tokens(base_prompt))
+
+    # tokens sent drive both the latency and the cost of a parse
+    raw_tokens = count_tokens(content)
+    sent_tokens = sum(count_tokens(chunk) for chunk in chunks)
+    logger.info(
+        f"Statement text for {process.file.filename}: {raw_tokens} tokens raw, "
+        f"{sent_tokens} sent in {len(chunks)} chunks "
+        f"({1 - sent_tokens / max(raw_tokens, 1):.0%} saved)"
+    )
 
-    return prompts
+    return [base_prompt + chunk for chunk in chunks]
 
 
 def already_processed(process: InProcessJob) -> bool:
@@ -89,11 +103,21 @@ def already_processed(process: InProcessJob) -> bool:
     return bool(val)
 
 
-def apply_upload_config(process: InProcessJob) -> InProcessJob:
+def apply_upload_config(
+    process: InProcessJob, matcher: ConfigMatcher | None = None
+) -> InProcessJob:
+    """
+    The file's config: the one it was processed with before, else one whose
+    statements look like it or whose filename regex matches, and only then
+    a new one from the LLM. The layout is remembered on the config either way.
+    """
     assert process.job, "must have"
     assert process.file, "must have"
 
     logger.info(f"Applying upload configuration for file: {process.file.filename}")
+    process = with_raw_content(process)
+    assert process.raw_content is not None, "must have"
+    seen = layout_fingerprint(process.raw_content, process.file.filename)
 
     config: None | UploadConfiguration = None
     if process.job.config_id:
@@ -104,25 +128,23 @@ def apply_upload_config(process: InProcessJob) -> InProcessJob:
         )
 
     if not config:
-        query = (
-            process.session.query(UploadConfiguration)
-            .filter(UploadConfiguration.user_id == process.user.id)
-            .all()
-        )
-        reg_lookup = {u.id: u.filename_regex for u in query}
-        lookup = {u.id: u for u in query}
-
-        raw_content = f"{process.file.filename}"
-        for id, filename_regex in reg_lookup.items():
-            if re.search(filename_regex, raw_content, re.IGNORECASE):
-                config = lookup[id]
-                break
+        matcher = matcher or ConfigMatcher.load(process.session, process.user.id)
+        config_id = matcher.match(process.file.filename, seen)
+        if config_id:
+            config = process.session.get(UploadConfiguration, config_id)
 
     if not config:
-        config = create_configurations(process)
+        with llm_stage(process, LLMStage.config_creation):
+            config = create_configurations(process)
 
     assert config, "Should have generated a config by now"
 
+    config.layout_fingerprint = merge_fingerprints(config.layout_fingerprint, seen)
+    process.session.add(config)
+    process.session.commit()
+    if matcher:
+        matcher.add(config)
+
     transaction_source = (
         process.session.query(TransactionSource)
         .filter(TransactionSource.id == config.transaction_source_id)
@@ -160,6 +182,28 @@ def archive_transactions_if_necessary(process: InProcessJob) -> InProcessJob:
     return process
 
 
+def parse_transactions(process: InProcessJob) -> InProcessJob:
+    """
+    CSV files are read directly when their layout is known or inferable, and
+    statements with a learned template are parsed by it; the LLM handles the
+    rest, and teaches the template for the next statement of that layout.
+    """
+    assert process.file, "must have"
+    process = with_raw_content(process)
+
+    if is_csv(process.file.filename):
+        parsed = parse_csv_transactions(process)
+        if parsed:
+            return parsed
+        logger.info(f"Falling back to the LLM parser for {process.file.filename}")
+        return request_llm_parse_of_transactions(process)
+
+    parsed = parse_pdf_with_template(process)
+    if parsed:
+        return parsed
+    return learn_parse_template(request_llm_parse_of_transactions(process))
+
+
 def request_llm_parse_of_transactions(process: InProcessJob) -> InProcessJob:
     """Request AI to parse transactions from the extracted text."""
     if process.config is None:
@@ -168,19 +212,24 @@ def request_llm_parse_of_transactions(process: InProcessJob) -> InProcessJob:
         )
 
     prompts = generate_transactions_prompt(process)
-    all_parsed_transactions = []
 
-    for batch, prompt in enumerate(prompts, start=1):
-        update_worker_status(
-            process.session,
+    def report_progress(done: int) -> None:
+        queue_worker_status(
             process.user,
             status=ProcessingState.parsing_transactions,
-            additional_info=f"Handling batch {batch} of {len(prompts)}",
+            additional_info=f"Handled batch {done} of {len(prompts)}",
             batch_id=process.batch_id,
         )
-        parsed_transactions = make_chat_request(
-            TransactionsWrapper, [ChatMessage(role="user", content=prompt)]
+
+    with llm_stage(process, LLMStage.parse):
+        responses = make_chat_requests(
+            TransactionsWrapper,
+            [[ChatMessage(role="user", content=prompt)] for prompt in prompts],
+            on_done=report_progress,
         )
+
+    all_parsed_transactions = []
+    for parsed_transactions in responses:
         if parsed_transactions:
             all_parsed_transactions.extend(parsed_transactions.transactions)
 
@@ -0,0 +1,74 @@
+from app.async_pipelines.uploaded_file_pipeline.local_types import Recategorization
+from app.categorization.classifier import CONFIDENCE_THRESHOLD, NgramClassifier
+from app.categorization.memo import normalize_description
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.models.worker_job import RecategorizeScope
+
+# shorter words of a category name ("Car", "Gas") match too many merchants
+MIN_NAME_WORD_LENGTH = 4
+
+
+def _name_words(name: str) -> set[str]:
+    return {
+        word
+        for word in normalize_description(name).split()
+        if len(word) >= MIN_NAME_WORD_LENGTH
+    }
+
+
+def affected_transactions(
+    transactions: list[Transaction],
+    scope: RecategorizeScope,
+    categories: list[Category],
+    recategorizations: list[Recategorization],
+    classifier: NgramClassifier,
+) -> list[Transaction]:
+    """
+    The transactions a category change could move:
+
+    - ones in a category that was renamed, archived or deleted
+    - ones a correction rule says belong somewhere else
+    - ones whose merchant is named like a new category
+    - ones the classifier isn't confident belong where they are
+    """
+    active = {cat.id: cat.name for cat in categories if not cat.archived}
+    touched = set(scope.category_ids)
+    # oldest first, so the latest rule for a merchant wins
+    rules = {
+        normalize_description(r.description): r.overrided_category
+        for r in recategorizations
+    }
+    new_words: set[str] = set()
+    for category in categories:
+        if category.id in scope.new_category_ids:
+            new_words |= _name_words(category.name)
+
+    affected = []
+    for transaction in transactions:
+        category_id = transaction.category_id
+        fingerprint = normalize_description(transaction.description)
+        if category_id in touched or category_id not in active:
+            affected.append(transaction)
+            continue
+
+        rule = rules.get(fingerprint)
+        if rule is not None and rule not in (
+            active[category_id],
+            transaction.kind.value,
+        ):
+            affected.append(transaction)
+            continue
+
+        if new_words & set(fingerprint.split()):
+            affected.append(transaction)
+            continue
+
+        prediction = classifier.predict(transaction.description)
+        if (
+            prediction is None
+            or prediction.category_id != category_id
+            or prediction.confidence < CONFIDENCE_THRESHOLD
+        ):
+            affected.append(transaction)
+    return affected
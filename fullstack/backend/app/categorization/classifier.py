@@ -0,0 +1,169 @@
+import math
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+from sqlalchemy.orm import Session
+
+from app.categorization.memo import normalize_description
+from app.models.audit_log import AuditLog, AuditLogAction
+from app.models.category import Category, CategoryId
+from app.models.transaction import Transaction
+from app.models.transaction_source import TransactionSourceId
+from app.models.user import UserId
+
+NGRAM_SIZES = (2, 3, 4)
+NEIGHBOURS = 5
+CONFIDENCE_THRESHOLD = 0.6
+
+# most recent history is plenty to learn a source's merchants
+MAX_TRAINING_ROWS = 5000
+# a user correction says more than a label the LLM picked
+CORRECTION_WEIGHT = 3.0
+
+
+@dataclass(frozen=True)
+class LabeledDescription:
+    description: str
+    category_id: CategoryId
+    weight: float = 1.0
+
+
+@dataclass(frozen=True)
+class Prediction:
+    category_id: CategoryId
+    confidence: float
+
+
+def char_ngrams(text: str) -> Counter[str]:
+    padded = f" {text} "
+    return Counter(
+        padded[i : i + n] for n in NGRAM_SIZES for i in range(len(padded) - n + 1)
+    )
+
+
+class NgramIndex:
+    """
+    Character n-gram TF-IDF vectors of normalized descriptions, searched
+    through an inverted index so a query only touches documents it shares
+    n-grams with.
+    """
+
+    def __init__(self, fingerprints: list[str]) -> None:
+        grams = [char_ngrams(fingerprint) for fingerprint in fingerprints]
+        document_frequency: Counter[str] = Counter()
+        for counts in grams:
+            document_frequency.update(counts.keys())
+
+        total = len(fingerprints)
+        self._idf = {
+            gram: math.log((1 + total) / (1 + frequency)) + 1
+            for gram, frequency in document_frequency.items()
+        }
+        self._postings: dict[str, list[tuple[int, float]]] = defaultdict(list)
+        for index, counts in enumerate(grams):
+            for gram, value in self._vectorize(counts).items():
+                self._postings[gram].append((index, value))
+
+    def _vectorize(self, counts: Counter[str]) -> dict[str, float]:
+        vector = {
+            gram: (1 + math.log(count)) * self._idf[gram]
+            for gram, count in counts.items()
+            if gram in self._idf
+        }
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        if not norm:
+            return {}
+        return {gram: value / norm for gram, value in vector.items()}
+
+    def search(self, fingerprint: str, limit: int) -> list[tuple[int, float]]:
+        """The `limit` most similar documents, as (position, cosine similarity)."""
+        scores: dict[int, float] = defaultdict(float)
+        for gram, value in self._vectorize(char_ngrams(fingerprint)).items():
+            for index, weight in self._postings.get(gram, ()):
+                scores[index] += value * weight
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+class NgramClassifier:
+    """
+    Weighted k nearest neighbour vote over an NgramIndex.
+
+    Descriptions with the same fingerprint and category collapse into one
+    document, so the index grows with distinct merchants, not transactions.
+    """
+
+    def __init__(self, neighbours: int = NEIGHBOURS) -> None:
+        self.neighbours = neighbours
+        self._index = NgramIndex([])
+        self._labels: list[CategoryId] = []
+        self._weights: list[float] = []
+
+    def fit(self, samples: list[LabeledDescription]) -> "NgramClassifier":
+        documents: dict[tuple[str, CategoryId], float] = defaultdict(float)
+        for sample in samples:
+            fingerprint = normalize_description(sample.description)
+            if fingerprint:
+                documents[(fingerprint, sample.category_id)] += sample.weight
+
+        self._index = NgramIndex([fingerprint for fingerprint, _ in documents])
+        self._labels = [category_id for _, category_id in documents]
+        # repeated merchants vote louder, but sublinearly
+        self._weights = [1 + math.log(weight) for weight in documents.values()]
+        return self
+
+    def predict(self, description: str) -> Prediction | None:
+        fingerprint = normalize_description(description)
+        if not fingerprint or not self._labels:
+            return None
+
+        nearest = self._index.search(fingerprint, self.neighbours)
+        if not nearest:
+            return None
+
+        votes: dict[CategoryId, float] = defaultdict(float)
+        for index, similarity in nearest:
+            votes[self._labels[index]] += similarity * self._weights[index]
+
+        winner, winner_votes = max(votes.items(), key=lambda item: item[1])
+        best_similarity = max(
+            similarity for index, similarity in nearest if self._labels[index] == winner
+        )
+        # agreement among neighbours, scaled by how close the closest one is
+        confidence = winner_votes / sum(votes.values()) * best_similarity
+        return Prediction(category_id=winner, confidence=confidence)
+
+
+def load_training_samples(
+    session: Session, user_id: UserId, transaction_source_id: TransactionSourceId
+) -> list[LabeledDescription]:
+    rows = (
+        session.query(Transaction.id, Transaction.description, Transaction.category_id)
+        .join(Category, Category.id == Transaction.category_id)
+        .filter(
+            Transaction.user_id == user_id,
+            Transaction.transaction_source_id == transaction_source_id,
+            ~Transaction.archived,
+            ~Category.archived,
+        )
+        .order_by(Transaction.date_of_transaction.desc())
+        .limit(MAX_TRAINING_ROWS)
+        .all()
+    )
+    corrected = {
+        transaction_id
+        for (transaction_id,) in session.query(AuditLog.transaction_id).filter(
+            AuditLog.user_id == user_id,
+            AuditLog.action == AuditLogAction.reclassify_transaction_category,
+            AuditLog.transaction_id.in_([row.id for row in rows]),
+        )
+    }
+
+    return [
+        LabeledDescription(
+            description=row.description,
+            category_id=row.category_id,
+            weight=CORRECTION_WEIGHT if row.id in corrected else 1.0,
+        )
+        for row in rows
+    ]
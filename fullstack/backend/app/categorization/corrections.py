@@ -0,0 +1,73 @@
+from app.async_pipelines.uploaded_file_pipeline.local_types import (
+    PartialTransaction,
+    Recategorization,
+)
+from app.categorization.classifier import NgramIndex
+from app.categorization.memo import normalize_description
+
+# enough to cover a batch's merchants without the whole history riding along
+MAX_CORRECTIONS_PER_PROMPT = 15
+CORRECTIONS_PER_TRANSACTION = 3
+# below this a correction shares little more than common letter runs
+MIN_CORRECTION_SIMILARITY = 0.2
+
+
+def dedupe_recategorizations(
+    recategorizations: list[Recategorization],
+) -> list[Recategorization]:
+    """
+    One correction per merchant and override, the latest winning; expects
+    oldest first. 'UBER *TRIP 1234' and 'UBER *TRIP 5678' both moved to
+    Transport say the same thing twice.
+    """
+    latest: dict[tuple[str, str], Recategorization] = {}
+    for recategorization in recategorizations:
+        key = (
+            normalize_description(recategorization.description),
+            recategorization.overrided_category,
+        )
+        latest.pop(key, None)
+        latest[key] = recategorization
+    return list(latest.values())
+
+
+class CorrectionSelector:
+    """Picks the user's corrections that are relevant to a batch of transactions."""
+
+    def __init__(
+        self,
+        recategorizations: list[Recategorization],
+        limit: int = MAX_CORRECTIONS_PER_PROMPT,
+    ) -> None:
+        self.recategorizations = recategorizations
+        self.limit = limit
+        self._index = NgramIndex(
+            [normalize_description(r.description) for r in recategorizations]
+        )
+
+    def shared(self) -> list[Recategorization]:
+        """All of the corrections when they fit in every prompt, otherwise none."""
+        if len(self.recategorizations) <= self.limit:
+            return self.recategorizations
+        return []
+
+    def select(self, transactions: list[PartialTransaction]) -> list[Recategorization]:
+        if len(self.recategorizations) <= self.limit:
+            return self.recategorizations
+
+        best: dict[int, float] = {}
+        for transaction in transactions:
+            fingerprint = normalize_description(
+                transaction.partialTransactionDescription
+            )
+            if not fingerprint:
+                continue
+            for index, similarity in self._index.search(
+                fingerprint, CORRECTIONS_PER_TRANSACTION
+            ):
+                if similarity >= MIN_CORRECTION_SIMILARITY:
+                    best[index] = max(best.get(index, 0.0), similarity)
+
+        chosen = sorted(best, key=lambda index: best[index], reverse=True)
+        # keep the user's order, it's oldest to newest
+        return [self.recategorizations[i] for i in sorted(chosen[: self.limit])]
@@ -0,0 +1,103 @@
+"""
+Offline check of the local classifier against a user's categorized history.
+
+Trains on the older part of each transaction source and predicts the newest
+transactions. Stored categories mostly came from the LLM, so agreement with
+them is "LLM agreement"; transactions the user corrected by hand are scored
+separately as ground truth.
+
+    python -m app.categorization.evaluate <user_id> [--threshold 0.6]
+"""
+
+import argparse
+from dataclasses import dataclass
+
+from sqlalchemy.orm import Session
+
+from app.categorization.classifier import (
+    CONFIDENCE_THRESHOLD,
+    CORRECTION_WEIGHT,
+    NgramClassifier,
+    load_training_samples,
+)
+from app.db import get_db_for_user
+from app.models.transaction_source import TransactionSource
+from app.models.user import UserId
+
+TEST_FRACTION = 0.2
+
+
+@dataclass
+class Report:
+    evaluated: int = 0
+    confident: int = 0
+    agreed: int = 0
+    corrections: int = 0
+    corrections_confident: int = 0
+    corrections_correct: int = 0
+
+    def add(self, other: "Report") -> None:
+        for field in self.__dataclass_fields__:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+
+    def render(self, name: str) -> str:
+        def ratio(part: int, whole: int) -> str:
+            return f"{part}/{whole} ({part / whole:.0%})" if whole else "n/a"
+
+        return (
+            f"{name}: coverage {ratio(self.confident, self.evaluated)}, "
+            f"llm agreement {ratio(self.agreed, self.confident)}, "
+            f"corrections covered {ratio(self.corrections_confident, self.corrections)}, "
+            f"corrections correct {ratio(self.corrections_correct, self.corrections_confident)}"
+        )
+
+
+def evaluate_source(
+    session: Session, user_id: UserId, source: TransactionSource, threshold: float
+) -> Report:
+    # newest first, so the head is the held out set
+    samples = load_training_samples(session, user_id, source.id)
+    split = int(len(samples) * TEST_FRACTION)
+    test, train = samples[:split], samples[split:]
+
+    classifier = NgramClassifier().fit(train)
+    report = Report()
+    for sample in test:
+        prediction = classifier.predict(sample.description)
+        confident = prediction is not None and prediction.confidence >= threshold
+        correct = confident and prediction.category_id == sample.category_id
+        is_correction = sample.weight == CORRECTION_WEIGHT
+
+        report.evaluated += 1
+        report.confident += confident
+        report.agreed += correct
+        report.corrections += is_correction
+        report.corrections_confident += is_correction and confident
+        report.corrections_correct += is_correction and correct
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("user_id", type=int)
+    parser.add_argument("--threshold", type=float, default=CONFIDENCE_THRESHOLD)
+    args = parser.parse_args()
+
+    user_id = UserId(args.user_id)
+    session = next(get_db_for_user(user_id))
+    try:
+        total = Report()
+        sources = session.query(TransactionSource).filter(
+            TransactionSource.user_id == user_id, ~TransactionSource.archived
+        )
+        for source in sources:
+            report = evaluate_source(session, user_id, source, args.threshold)
+            total.add(report)
+            print(report.render(source.name))
+        print(total.render("total"))
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import re
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.categorization_memo import CategorizationMemo, MemoSource
+from app.models.category import CategoryId
+from app.models.transaction import Transaction
+from app.models.transaction_source import TransactionSourceId
+from app.models.user import UserId
+
+_DIGITS = re.compile(r"\d+")
+# store numbers are usually written "#1234" or "no. 1234"
+_STORE_NUMBER = re.compile(r"(#|\bno\.?|\bstore)\s*\d+")
+_PUNCTUATION = re.compile(r"[^\w\s&']")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_description(description: str) -> str:
+    """
+    'STARBUCKS #1234 SEATTLE WA 04/12' and 'Starbucks 5678 Seattle WA'
+    both become 'starbucks seattle wa'.
+    """
+    value = description.lower()
+    value = _STORE_NUMBER.sub(" ", value)
+    value = _DIGITS.sub(" ", value)
+    value = _PUNCTUATION.sub(" ", value)
+    return _WHITESPACE.sub(" ", value).strip()
+
+
+def load_memo(
+    session: Session, user_id: UserId, transaction_source_id: TransactionSourceId
+) -> dict[str, CategorizationMemo]:
+    return {
+        memo.fingerprint: memo
+        for memo in session.query(CategorizationMemo).filter(
+            CategorizationMemo.user_id == user_id,
+            CategorizationMemo.transaction_source_id == transaction_source_id,
+        )
+    }
+
+
+def remember(
+    session: Session,
+    user_id: UserId,
+    transaction_source_id: TransactionSourceId,
+    categories: dict[str, CategoryId],
+    source: MemoSource,
+) -> None:
+    """
+    Upsert fingerprint -> category entries.
+
+    Learned entries never replace a user override; an override replaces
+    anything.
+    """
+    categories = {
+        fingerprint: category_id
+        for fingerprint, category_id in categories.items()
+        if fingerprint
+    }
+    if not categories:
+        return
+
+    now = datetime.now(timezone.utc)
+    statement = insert(CategorizationMemo).values(
+        [
+            {
+                "user_id": user_id,
+                "transaction_source_id": transaction_source_id,
+                "fingerprint": fingerprint,
+                "category_id": category_id,
+                "source": source,
+                "hits": 0,
+                "updated_at": now,
+            }
+            for fingerprint, category_id in categories.items()
+        ]
+    )
+    set_ = {
+        "category_id": statement.excluded.category_id,
+        "source": statement.excluded.source,
+        "updated_at": statement.excluded.updated_at,
+    }
+    if source == MemoSource.override:
+        statement = statement.on_conflict_do_update(
+            constraint="uq_categorization_memo", set_=set_
+        )
+    else:
+        statement = statement.on_conflict_do_update(
+            constraint="uq_categorization_memo",
+            set_=set_,
+            where=CategorizationMemo.source != MemoSource.override,
+        )
+    session.execute(statement)
+
+
+def record_override(session: Session, transaction: Transaction) -> None:
+    remember(
+        session,
+        transaction.user_id,
+        transaction.transaction_source_id,
+        {normalize_description(transaction.description): transaction.category_id},
+        MemoSource.override,
+    )
+
+
+def record_hits(session: Session, memos: list[CategorizationMemo]) -> None:
+    if not memos:
+        return
+    session.execute(
+        update(CategorizationMemo)
+        .where(CategorizationMemo.id.in_([memo.id for memo in memos]))
+        .values(hits=CategorizationMemo.hits + 1)
+    )
+
+
+def invalidate_category(session: Session, category_id: CategoryId) -> None:
+    """The category's meaning changed (renamed or archived), forget it entirely."""
+    session.query(CategorizationMemo).filter(
+        CategorizationMemo.category_id == category_id
+    ).delete()
+
+
+def invalidate_learned(
+    session: Session, transaction_source_id: TransactionSourceId
+) -> None:
+    """
+    A new category may fit merchants better than the one we learned, so only
+    the user's own overrides survive.
+    """
+    session.query(CategorizationMemo).filter(
+        CategorizationMemo.transaction_source_id == transaction_source_id,
+        CategorizationMemo.source != MemoSource.override,
+    ).delete()
+
+
+def most_common_categories(
+    rows: list[tuple[str, CategoryId]],
+) -> dict[str, CategoryId]:
+    """(description, category_id) pairs -> fingerprint -> its most used category"""
+    counts: dict[str, Counter[CategoryId]] = defaultdict(Counter)
+    for description, category_id in rows:
+        fingerprint = normalize_description(description)
+        if fingerprint:
+            counts[fingerprint][category_id] += 1
+    return {
+        fingerprint: counter.most_common(1)[0][0]
+        for fingerprint, counter in counts.items()
+    }
@@ -0,0 +1,197 @@
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from functools import cache
+
+DATE_FORMATS = [
+    "%m/%d/%Y",
+    "%m/%d/%y",
+    "%Y-%m-%d",
+    "%d/%m/%Y",
+    "%d/%m/%y",
+    "%m-%d-%Y",
+    "%d-%m-%Y",
+    "%Y/%m/%d",
+    "%b %d, %Y",
+    "%d %b %Y",
+    "%Y-%m-%dT%H:%M:%S",
+]
+
+# a column's format is picked from this many of its dates
+SAMPLE_SIZE = 20
+
+_DIRECTIVES = {
+    "%m": r"(?P<month>\d{1,2})",
+    "%d": r"(?P<day>\d{1,2})",
+    "%Y": r"(?P<year>\d{4})",
+    "%y": r"(?P<short_year>\d{2})",
+    "%b": r"(?P<month_name>[A-Za-z]{3,9})",
+    "%B": r"(?P<month_name>[A-Za-z]{3,9})",
+    "%H": r"(?P<hour>\d{1,2})",
+    "%M": r"(?P<minute>\d{1,2})",
+    "%S": r"(?P<second>\d{1,2})",
+}
+_MONTH_NAMES = [
+    "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december",
+]  # fmt: skip
+_MONTHS = {
+    **{name: number for number, name in enumerate(_MONTH_NAMES, 1)},
+    **{name[:3]: number for number, name in enumerate(_MONTH_NAMES, 1)},
+    "sept": 9,
+}
+
+DateParser = Callable[[str], datetime | None]
+
+
+def _compile_format(date_format: str) -> re.Pattern[str] | None:
+    parts = re.split(r"(%.)", date_format)
+    pattern = []
+    for part in parts:
+        if part.startswith("%") and len(part) == 2:
+            if part not in _DIRECTIVES:
+                return None
+            pattern.append(_DIRECTIVES[part])
+        else:
+            pattern.append(r"\s+".join(map(re.escape, part.split(" "))))
+    return re.compile("".join(pattern), re.IGNORECASE)
+
+
+def _strptime_parser(date_format: str) -> DateParser:
+    def parse(value: str) -> datetime | None:
+        try:
+            return datetime.strptime(value.strip(), date_format)
+        except ValueError:
+            return None
+
+    return parse
+
+
+@cache
+def date_parser(date_format: str) -> DateParser:
+    """
+    Reads dates written in `date_format` like strptime does, with the format
+    compiled once instead of looked up on every call. Formats without a year
+    get 1900, as they do from strptime.
+    """
+    pattern = _compile_format(date_format)
+    if pattern is None:
+        return _strptime_parser(date_format)
+
+    def parse(value: str) -> datetime | None:
+        match = pattern.fullmatch(value.strip())
+        if not match:
+            return None
+        fields = match.groupdict()
+        if fields.get("month_name"):
+            month = _MONTHS.get(fields["month_name"].lower())
+        else:
+            month = int(fields.get("month") or 1)
+        if fields.get("short_year"):
+            # strptime's pivot: 69-99 are the 1900s, 00-68 the 2000s
+            short_year = int(fields["short_year"])
+            year = short_year + (1900 if short_year >= 69 else 2000)
+        else:
+            year = int(fields.get("year") or 1900)
+        if month is None:
+            return None
+        try:
+            return datetime(
+                year,
+                month,
+                int(fields.get("day") or 1),
+                int(fields.get("hour") or 0),
+                int(fields.get("minute") or 0),
+                int(fields.get("second") or 0),
+            )
+        except ValueError:
+            return None
+
+    return parse
+
+
+def parse_date(value: str, date_format: str | None = None) -> datetime | None:
+    for candidate in [date_format] if date_format else DATE_FORMATS:
+        date = date_parser(candidate)(value)
+        if date:
+            return date
+    return None
+
+
+def infer_date_format(
+    values: list[str], formats: list[str] = DATE_FORMATS
+) -> str | None:
+    """The first format that reads every value, so 03/04 is decided by the column."""
+    values = [value for value in values if value]
+    if not values:
+        return None
+    for date_format in formats:
+        parse = date_parser(date_format)
+        if all(parse(value) for value in values):
+            return date_format
+    return None
+
+
+@dataclass(frozen=True)
+class ParsedDates:
+    date_format: str | None
+    # None where a value isn't a date in that format
+    dates: list[datetime | None]
+    # rows another format that reads the whole column would date differently,
+    # 03/04 in a column that never gets past the 12th
+    ambiguous: list[int]
+
+
+def _reads_column(values: list[str], dates: list[datetime | None]) -> bool:
+    return all(date for value, date in zip(values, dates, strict=True) if value)
+
+
+def parse_dates(
+    values: list[str],
+    date_format: str | None = None,
+    formats: list[str] = DATE_FORMATS,
+) -> ParsedDates:
+    """
+    Reads a column of dates in one format, `date_format` when it's known,
+    otherwise the first of `formats` that reads a sample of the column, and
+    the whole of it if one does.
+    """
+    sample = [value for value in values if value][:SAMPLE_SIZE]
+    readers = [
+        candidate
+        for candidate in formats
+        if sample and all(map(date_parser(candidate), sample))
+    ]
+    columns = {
+        candidate: [
+            date_parser(candidate)(value) if value else None for value in values
+        ]
+        for candidate in dict.fromkeys([date_format] if date_format else readers)
+    }
+    if not date_format:
+        date_format = next(
+            (c for c, dates in columns.items() if _reads_column(values, dates)),
+            readers[0] if readers else None,
+        )
+    if date_format is None:
+        return ParsedDates(None, [None] * len(values), [])
+
+    dates = columns[date_format]
+    ambiguous: set[int] = set()
+    for other in readers:
+        if other == date_format:
+            continue
+        alternative = columns.get(other) or [
+            date_parser(other)(value) if value else None for value in values
+        ]
+        if not _reads_column(values, alternative):
+            continue
+        ambiguous.update(
+            index
+            for index, (date, other_date) in enumerate(
+                zip(dates, alternative, strict=True)
+            )
+            if date and other_date and date != other_date
+        )
+    return ParsedDates(date_format, dates, sorted(ambiguous))
@@ -0,0 +1,376 @@
+"""
+Load test of the worker: enqueue synthetic uploads and Plaid accounts for a
+load test user, run them through the worker's own job loop and report job
+throughput and queue latency.
+
+Meant to run against the stub server, so nothing leaves the machine:
+
+    uvicorn app.devtools.stub_server:app --port 8090 &
+    OPENAI_BASE_URL=http://localhost:8090/v1 PLAID_HOST=http://localhost:8090 \\
+    LLM_CACHE_MODE=off python -m app.devtools.load_harness --uploads 50 --plaid-accounts 10
+
+With --external the jobs are left to a worker that is already running, and
+the harness only watches them.
+"""
+
+import argparse
+import hashlib
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy.orm import Session
+
+from app.db import get_auth_db, get_db_for_user
+from app.models.llm_call_log import LLMCallLog, LLMStage
+from app.models.plaid import PlaidAccount, PlaidAccountId, PlaidItem
+from app.models.transaction import Transaction
+from app.models.transaction_source import SourceKind, TransactionSource
+from app.models.uploaded_pdf import UploadedFileContent, UploadedPdf
+from app.models.user import User, UserId, UserSettings
+from app.models.worker_job import JobKind, JobStatus, WorkerJob, WorkerJobId
+from app.plaid.sync_service import sync_plaid_account_transactions
+from app.worker.enqueue_job import enqueue_or_reset_job
+
+LOAD_TEST_EMAIL = "loadtest@example.com"
+POLL_SECONDS = 0.25
+
+DESCRIPTIONS = [
+    "WHOLE FOODS MARKET #10234",
+    "SHELL OIL 57442",
+    "NETFLIX.COM",
+    "UBER *TRIP HELP.UBER.COM",
+    "STARBUCKS STORE 0912",
+    "AMAZON MKTPLACE PMTS",
+    "TRADER JOE S #552",
+    "COMCAST CABLE COMM",
+    "DELTA AIR LINES",
+    "CVS/PHARMACY #0433",
+    "PAYROLL DEPOSIT ACME CORP",
+    "VENMO CASHOUT",
+]
+
+
+def synthetic_statement(index: int, transactions: int, run_id: str) -> str:
+    """A text statement in the shape pdftotext produces for a checking account."""
+    rng = random.Random(index)
+    start = date.today().replace(day=1) - timedelta(days=30 * (index % 12 + 1))
+    lines = [
+        "LOAD TEST BANK",
+        f"Checking Account Statement  Account ending {index % 10_000:04d}",
+        f"Reference {run_id}-{index}",
+        f"Statement Period {start:%m/%d/%Y} - {start + timedelta(days=29):%m/%d/%Y}",
+        "",
+        "Transaction Details",
+        "Date        Description                               Amount",
+    ]
+    for _ in range(transactions):
+        day = start + timedelta(days=rng.randrange(30))
+        description = rng.choice(DESCRIPTIONS)
+        amount = rng.uniform(2, 250)
+        if description.startswith("PAYROLL"):
+            amount = rng.uniform(1500, 3500)
+        else:
+            amount = -amount
+        lines.append(f"{day:%m/%d}       {description:<40}  {amount:,.2f}")
+    lines += ["", "Ending Balance                                         1,234.56"]
+    return "\n".join(lines)
+
+
+def get_or_create_load_test_user(session: Session) -> User:
+    user = session.query(User).filter(User.email == LOAD_TEST_EMAIL).one_or_none()
+    if user:
+        return user
+
+    user = User(
+        email=LOAD_TEST_EMAIL,
+        full_name="Load Test",
+        hashed_password=None,
+        send_email=False,
+        requires_two_factor=False,
+        settings=UserSettings(power_user_filters=True, has_budget=False),
+    )
+    session.add(user)
+    session.commit()
+    return user
+
+
+def enqueue_uploads(
+    session: Session, user: User, count: int, transactions: int, run_id: str
+) -> list[WorkerJobId]:
+    job_ids = []
+    for index in range(count):
+        content = synthetic_statement(index, transactions, run_id)
+        upload = UploadedPdf(
+            filename=f"loadtest-{run_id}-{index}.pdf",
+            raw_content_hash=hashlib.md5(content.encode()).hexdigest(),
+            upload_time=datetime.now(timezone.utc),
+            user_id=user.id,
+            archived=False,
+        )
+        session.add(upload)
+        session.flush()
+        # already text, so the worker has nothing to extract
+        session.add(
+            UploadedFileContent(
+                uploaded_pdf_id=upload.id, user_id=user.id, content=content
+            )
+        )
+        session.commit()
+        job = enqueue_or_reset_job(session, user.id, upload.id, JobKind.full_upload)
+        job_ids.append(job.id)
+    return job_ids
+
+
+def add_plaid_accounts(
+    session: Session, user: User, count: int, run_id: str
+) -> list[PlaidAccountId]:
+    item = PlaidItem(
+        user_id=user.id,
+        plaid_item_id=f"item-load-{run_id}",
+        access_token=f"access-stub-load-{run_id}",
+    )
+    session.add(item)
+    session.flush()
+
+    accounts = []
+    for index in range(count):
+        account = PlaidAccount(
+            user_id=user.id,
+            plaid_item_id=item.id,
+            plaid_account_id=f"load-{run_id}-{index}",
+            name=f"Load Test Checking {index}",
+            mask=f"{index:04d}",
+            type="depository",
+            subtype="checking",
+        )
+        session.add(account)
+        session.flush()
+        session.add(
+            TransactionSource(
+                user_id=user.id,
+                name=f"Load Test Checking {run_id} {index}",
+                plaid_account_id=account.id,
+                source_kind=SourceKind.account,
+            )
+        )
+        accounts.append(account)
+    session.commit()
+    return [account.id for account in accounts]
+
+
+@dataclass
+class JobTiming:
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    status: JobStatus = JobStatus.pending
+
+
+@dataclass
+class JobWatcher:
+    """Polls the jobs, noting when each is picked up and when it finishes."""
+
+    user_id: UserId
+    job_ids: list[WorkerJobId]
+    timings: dict[WorkerJobId, JobTiming] = field(default_factory=dict)
+    done: threading.Event = field(default_factory=threading.Event)
+
+    def poll(self) -> None:
+        session = next(get_db_for_user(self.user_id))
+        try:
+            jobs = session.query(WorkerJob).filter(WorkerJob.id.in_(self.job_ids))
+            for job in jobs:
+                timing = self.timings.setdefault(job.id, JobTiming(job.created_at))
+                timing.status = job.status
+                # last_tried_at is stamped when the job is locked and again when it ends
+                if job.status == JobStatus.processing and timing.started_at is None:
+                    timing.started_at = job.last_tried_at
+                if job.status in (JobStatus.completed, JobStatus.failed):
+                    timing.finished_at = timing.finished_at or job.last_tried_at
+                    timing.started_at = timing.started_at or timing.finished_at
+        finally:
+            session.close()
+
+    @property
+    def finished(self) -> bool:
+        return len(self.timings) == len(self.job_ids) and all(
+            t.finished_at is not None for t in self.timings.values()
+        )
+
+    def run(self) -> None:
+        while not self.done.is_set():
+            self.poll()
+            if self.finished:
+                self.done.set()
+                return
+            time.sleep(POLL_SECONDS)
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def render_seconds(name: str, values: list[float]) -> str:
+    return (
+        f"{name}: p50 {percentile(values, 0.5):.1f}s, "
+        f"p95 {percentile(values, 0.95):.1f}s, max {max(values, default=0):.1f}s"
+    )
+
+
+def run_uploads(
+    user_id: UserId, job_ids: list[WorkerJobId], external: bool, timeout: float
+) -> None:
+    watcher = JobWatcher(user_id, job_ids)
+    thread = threading.Thread(target=watcher.run, daemon=True)
+    started = time.monotonic()
+    thread.start()
+
+    if external:
+        watcher.done.wait(timeout)
+    else:
+        # imported here, it connects to the worker database on import
+        from app.worker.main import upload_file_worker
+
+        while not watcher.done.is_set() and time.monotonic() - started < timeout:
+            upload_file_worker()
+            time.sleep(POLL_SECONDS)
+    watcher.done.set()
+    thread.join()
+    watcher.poll()
+    elapsed = time.monotonic() - started
+
+    timings = list(watcher.timings.values())
+    completed = [t for t in timings if t.status == JobStatus.completed]
+    failed = [t for t in timings if t.status == JobStatus.failed]
+    finished = [t for t in timings if t.finished_at and t.started_at]
+    print(
+        f"uploads: {len(completed)} completed, {len(failed)} failed, "
+        f"{len(job_ids) - len(finished)} unfinished in {elapsed:.1f}s "
+        f"({len(finished) / elapsed * 60:.1f} jobs/min)"
+    )
+    print(
+        render_seconds(
+            "  queue latency",
+            [(t.started_at - t.created_at).total_seconds() for t in finished],  # type: ignore[operator]
+        )
+    )
+    print(
+        render_seconds(
+            "  end to end",
+            [(t.finished_at - t.created_at).total_seconds() for t in finished],  # type: ignore[operator]
+        )
+    )
+
+
+def report_llm_usage(user_id: UserId, job_ids: list[WorkerJobId]) -> None:
+    """Per stage tokens, prompt cache share and latency of the run's LLM calls."""
+    session = next(get_db_for_user(user_id))
+    try:
+        calls = (
+            session.query(LLMCallLog)
+            .filter(LLMCallLog.job_id.in_(job_ids), ~LLMCallLog.cache_hit)
+            .all()
+        )
+    finally:
+        session.close()
+
+    by_stage: dict[LLMStage, list[LLMCallLog]] = defaultdict(list)
+    for call in calls:
+        by_stage[call.stage].append(call)
+    for stage, stage_calls in by_stage.items():
+        prompt_tokens = sum(c.prompt_tokens for c in stage_calls)
+        cached_tokens = sum(c.cached_tokens for c in stage_calls)
+        print(
+            f"  llm {stage.value}: {len(stage_calls)} calls, "
+            f"{prompt_tokens} prompt tokens "
+            f"({cached_tokens / prompt_tokens if prompt_tokens else 0:.0%} cached)"
+        )
+        print(render_seconds("    latency", [c.latency_ms / 1000 for c in stage_calls]))
+
+
+def run_plaid_syncs(user_id: UserId, account_ids: list[PlaidAccountId]) -> None:
+    session = next(get_db_for_user(user_id))
+    try:
+        user = session.query(User).filter(User.id == user_id).one()
+        source_ids = [
+            source_id
+            for (source_id,) in session.query(TransactionSource.id).filter(
+                TransactionSource.plaid_account_id.in_(account_ids)
+            )
+        ]
+        durations = []
+        failures = 0
+        for account in session.query(PlaidAccount).filter(
+            PlaidAccount.id.in_(account_ids)
+        ):
+            started = time.monotonic()
+            try:
+                sync_plaid_account_transactions(
+                    session, user, account, days_back=365, batch_id=uuid.uuid4().hex
+                )
+            except Exception as e:
+                failures += 1
+                session.rollback()
+                print(f"  sync of {account.plaid_account_id} failed: {e}")
+            durations.append(time.monotonic() - started)
+
+        added = (
+            session.query(Transaction)
+            .filter(Transaction.transaction_source_id.in_(source_ids))
+            .count()
+        )
+        total = sum(durations)
+        print(
+            f"plaid: {len(durations) - failures} accounts synced, {failures} failed, "
+            f"{added} transactions in {total:.1f}s "
+            f"({added / total if total else 0:.1f} transactions/s)"
+        )
+        print(render_seconds("  per account", durations))
+    finally:
+        session.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=60)
+    parser.add_argument("--plaid-accounts", type=int, default=0)
+    parser.add_argument("--external", action="store_true")
+    parser.add_argument("--timeout", type=float, default=1800)
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex[:8]
+    auth_session = next(get_auth_db())
+    try:
+        user_id = get_or_create_load_test_user(auth_session).id
+    finally:
+        auth_session.close()
+
+    session = next(get_db_for_user(user_id))
+    try:
+        user = session.query(User).filter(User.id == user_id).one()
+        job_ids = enqueue_uploads(
+            session, user, args.uploads, args.transactions, run_id
+        )
+        account_ids = add_plaid_accounts(session, user, args.plaid_accounts, run_id)
+    finally:
+        session.close()
+    print(f"run {run_id}: {len(job_ids)} uploads, {len(account_ids)} plaid accounts")
+
+    if job_ids:
+        run_uploads(user_id, job_ids, args.external, args.timeout)
+        report_llm_usage(user_id, job_ids)
+    if account_ids:
+        run_plaid_syncs(user_id, account_ids)
+
+
+if __name__ == "__main__":
+    main()
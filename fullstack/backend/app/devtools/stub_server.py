@@ -0,0 +1,495 @@
+"""
+Local stand-ins for OpenAI, Plaid and Resend, so whole pipelines can be run
+and profiled without network access or API spend.
+
+    uvicorn app.devtools.stub_server:app --port 8090
+
+and point the backend or worker at it:
+
+    OPENAI_BASE_URL=http://localhost:8090/v1
+    PLAID_HOST=http://localhost:8090
+    RESEND_API_URL=http://localhost:8090
+    LLM_CACHE_MODE=off
+
+Chat completions implement the structured output subset make_chat_request
+uses. Answers are deterministic and driven by the response schema: statement
+lines are parsed with a regex, transactions are echoed back with a category
+picked from the schema's enum by a hash of the description, and anything
+else gets a generic instance of the schema.
+
+    STUB_LATENCY_MS            mean chat completion latency (default 800)
+    STUB_JITTER_MS             uniform spread around it (default 200)
+    STUB_FAILURE_RATE          share of completions answered 429/500 (default 0)
+    STUB_SEED                  seed for latency and failures (default 0)
+    STUB_PLAID_TRANSACTIONS    transactions on an account's first sync (default 200)
+    STUB_PLAID_NEW_PER_SYNC    transactions added on each later sync (default 5)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Any
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+# OpenAI caches prompts past 1024 tokens, in steps of 128
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_STEP_TOKENS = 128
+PROMPT_CACHE_MAX_ENTRIES = 50_000
+CHARS_PER_TOKEN = 4
+
+ARRAY_ITEMS = 3
+
+_STATEMENT_LINE = re.compile(
+    r"(?P<date>\d{1,2}/\d{1,2}(?:/\d{2,4})?)\s+(?P<description>.+?)\s+"
+    r"(?P<amount>-?\$?-?[\d,]+\.\d{2})(?:\s|$)"
+)
+
+MERCHANTS = [
+    "WHOLE FOODS MARKET",
+    "SHELL OIL",
+    "NETFLIX.COM",
+    "UBER *TRIP",
+    "STARBUCKS STORE",
+    "AMAZON MKTPLACE",
+    "TRADER JOES",
+    "COMCAST CABLE",
+    "DELTA AIR LINES",
+    "CVS PHARMACY",
+    "PAYROLL DEPOSIT",
+    "VENMO CASHOUT",
+]
+
+
+@dataclass(frozen=True)
+class StubSettings:
+    latency_ms: float
+    jitter_ms: float
+    failure_rate: float
+    seed: int
+    plaid_transactions: int
+    plaid_new_per_sync: int
+
+
+def stub_settings() -> StubSettings:
+    return StubSettings(
+        latency_ms=float(os.getenv("STUB_LATENCY_MS", "800")),
+        jitter_ms=float(os.getenv("STUB_JITTER_MS", "200")),
+        failure_rate=float(os.getenv("STUB_FAILURE_RATE", "0")),
+        seed=int(os.getenv("STUB_SEED", "0")),
+        plaid_transactions=int(os.getenv("STUB_PLAID_TRANSACTIONS", "200")),
+        plaid_new_per_sync=int(os.getenv("STUB_PLAID_NEW_PER_SYNC", "5")),
+    )
+
+
+def _stable_hash(*parts: object) -> int:
+    digest = hashlib.sha256("|".join(str(p) for p in parts).encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+# --- chat completions ---
+
+
+def _resolve(schema: dict[str, Any], defs: dict[str, Any]) -> dict[str, Any]:
+    while "$ref" in schema:
+        schema = defs[schema["$ref"].rsplit("/", 1)[-1]]
+    return schema
+
+
+def schema_instance(
+    schema: dict[str, Any], defs: dict[str, Any], name: str = "value"
+) -> Any:
+    """A deterministic value that validates against `schema`."""
+    schema = _resolve(schema, defs)
+    if "const" in schema:
+        return schema["const"]
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "anyOf" in schema:
+        # the first branch, which for `X | None` is the X
+        return schema_instance(schema["anyOf"][0], defs, name)
+
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object":
+        return {
+            key: schema_instance(value, defs, key)
+            for key, value in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        return [
+            schema_instance(schema.get("items", {}), defs, f"{name} {i + 1}")
+            for i in range(ARRAY_ITEMS)
+        ]
+    if kind == "integer":
+        return 0
+    if kind == "number":
+        return 0.0
+    if kind == "boolean":
+        return False
+    if kind == "null":
+        return None
+    return name
+
+
+def _choices(schema: dict[str, Any], defs: dict[str, Any]) -> list[Any]:
+    schema = _resolve(schema, defs)
+    if "const" in schema:
+        return [schema["const"]]
+    if "enum" in schema:
+        return list(schema["enum"])
+    for branch in schema.get("anyOf", []):
+        values = _choices(branch, defs)
+        if values:
+            return values
+    return []
+
+
+def parse_statement_lines(prompt: str) -> list[dict[str, Any]]:
+    """The statement lines of a parse prompt, as PartialTransaction dicts."""
+    year = date.today().year
+    transactions = []
+    for line in prompt.splitlines():
+        match = _STATEMENT_LINE.search(line)
+        if not match:
+            continue
+        month, day, *rest = match["date"].split("/")
+        line_year = int(rest[0]) if rest else year
+        if line_year < 100:
+            line_year += 2000
+        amount = match["amount"].replace("$", "").replace(",", "")
+        transactions.append(
+            {
+                "partialTransactionId": None,
+                "partialPlaidTransactionId": None,
+                "partialTransactionDateOfTransaction": f"{int(month):02d}/{int(day):02d}/{line_year}",
+                "partialTransactionDescription": match["description"].strip(),
+                "partialTransactionAmount": abs(float(amount)),
+                "partialTransactionKind": "withdrawal"
+                if amount.startswith("-")
+                else "deposit",
+            }
+        )
+    return transactions
+
+
+def categorize_prompt_transactions(
+    prompt: str, item_schema: dict[str, Any], defs: dict[str, Any]
+) -> list[dict[str, Any]]:
+    """The JSON transactions of a categorization prompt, each given a category."""
+    properties = item_schema.get("properties", {})
+    categories = _choices(properties["category"], defs) or ["Uncategorized"]
+    out = []
+    for line in prompt.splitlines():
+        line = line.strip()
+        if not line.startswith("{"):
+            continue
+        try:
+            transaction = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        description = transaction.get("partialTransactionDescription")
+        if description is None:
+            continue
+        item = {
+            key: transaction.get(key, schema_instance(value, defs, key))
+            for key, value in properties.items()
+        }
+        item["category"] = categories[_stable_hash(description) % len(categories)]
+        out.append(item)
+    return out
+
+
+def structured_response(schema: dict[str, Any], prompt: str) -> dict[str, Any]:
+    defs = schema.get("$defs", {})
+    transactions = schema.get("properties", {}).get("transactions")
+    if transactions is not None:
+        item_schema = _resolve(transactions.get("items", {}), defs)
+        if "category" in item_schema.get("properties", {}):
+            return {
+                "transactions": categorize_prompt_transactions(
+                    prompt, item_schema, defs
+                )
+            }
+        return {"transactions": parse_statement_lines(prompt)}
+    return schema_instance(schema, defs)
+
+
+class PromptCache:
+    """Which prompt prefixes have been seen, the way OpenAI's prompt caching counts them."""
+
+    def __init__(self, max_entries: int = PROMPT_CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._seen: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached_tokens(self, model: str, prompt: str) -> int:
+        tokens = _estimate_tokens(prompt)
+        cached = 0
+        with self._lock:
+            for boundary in range(
+                PROMPT_CACHE_MIN_TOKENS, tokens + 1, PROMPT_CACHE_STEP_TOKENS
+            ):
+                key = hashlib.sha1(
+                    f"{model}|{prompt[: boundary * CHARS_PER_TOKEN]}".encode()
+                ).hexdigest()
+                if key in self._seen:
+                    cached = boundary
+                    self._seen.move_to_end(key)
+                else:
+                    self._seen[key] = None
+            while len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+        return cached
+
+
+def _message_text(message: dict[str, Any]) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content)
+    return content
+
+
+def chat_completion(
+    body: dict[str, Any], prompt_cache: PromptCache | None = None
+) -> dict[str, Any]:
+    prompt = "\n".join(_message_text(m) for m in body.get("messages", []))
+    response_format = body.get("response_format") or {}
+    schema = response_format.get("json_schema", {}).get("schema")
+    content = json.dumps(
+        structured_response(schema, prompt) if schema else {"text": "stub"}
+    )
+
+    model = body.get("model", "stub")
+    # the schema is rendered ahead of the messages, so it's part of the cached prefix
+    cacheable = f"{json.dumps(schema, sort_keys=True)}\n{prompt}" if schema else prompt
+    prompt_tokens = _estimate_tokens(cacheable)
+    completion_tokens = _estimate_tokens(content)
+    return {
+        "id": f"chatcmpl-stub-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content, "refusal": None},
+                "finish_reason": "stop",
+                "logprobs": None,
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {
+                "cached_tokens": prompt_cache.cached_tokens(model, cacheable)
+                if prompt_cache
+                else 0
+            },
+        },
+    }
+
+
+# --- plaid ---
+
+
+def plaid_account_ids(access_token: str) -> list[str]:
+    item = _stable_hash(access_token) % 10**8
+    return [f"stub-acct-{item}-{i}" for i in range(2)]
+
+
+def plaid_account(account_id: str) -> dict[str, Any]:
+    balance = (_stable_hash(account_id, "balance") % 1_000_000) / 100
+    mask = f"{_stable_hash(account_id, 'mask') % 10_000:04d}"
+    return {
+        "account_id": account_id,
+        "balances": {
+            "available": balance,
+            "current": balance,
+            "limit": None,
+            "iso_currency_code": "USD",
+            "unofficial_currency_code": None,
+        },
+        "mask": mask,
+        "name": f"Stub Checking {mask}",
+        "official_name": None,
+        "type": "depository",
+        "subtype": "checking",
+    }
+
+
+def plaid_transaction(account_id: str, index: int) -> dict[str, Any]:
+    h = _stable_hash(account_id, index)
+    merchant = MERCHANTS[h % len(MERCHANTS)]
+    amount = round((h % 20_000) / 100 + 1, 2)
+    # payroll is money in, which plaid reports as negative
+    if merchant == "PAYROLL DEPOSIT":
+        amount = -amount * 10
+    day = (date.today() - timedelta(days=(h >> 16) % 365)).isoformat()
+    return {
+        "account_id": account_id,
+        "account_owner": None,
+        "amount": amount,
+        "authorized_date": day,
+        "authorized_datetime": None,
+        "category": None,
+        "category_id": None,
+        "date": day,
+        "datetime": None,
+        "iso_currency_code": "USD",
+        "location": {
+            "address": None,
+            "city": None,
+            "region": None,
+            "postal_code": None,
+            "country": None,
+            "lat": None,
+            "lon": None,
+            "store_number": None,
+        },
+        "merchant_name": merchant.title(),
+        "name": f"{merchant} {h % 10_000:04d}",
+        "payment_channel": "in store",
+        "payment_meta": {
+            "by_order_of": None,
+            "payee": None,
+            "payer": None,
+            "payment_method": None,
+            "payment_processor": None,
+            "ppd_id": None,
+            "reason": None,
+            "reference_number": None,
+        },
+        "pending": False,
+        "pending_transaction_id": None,
+        "transaction_code": None,
+        "transaction_id": f"{account_id}-txn-{index}",
+        "unofficial_currency_code": None,
+    }
+
+
+def transactions_sync(body: dict[str, Any], settings: StubSettings) -> dict[str, Any]:
+    access_token = body["access_token"]
+    account_id = (body.get("options") or {}).get("account_id") or plaid_account_ids(
+        access_token
+    )[0]
+    offset = int(body.get("cursor") or 0)
+    count = int(body.get("count") or 100)
+
+    if offset < settings.plaid_transactions:
+        end = min(offset + count, settings.plaid_transactions)
+    else:
+        end = offset + settings.plaid_new_per_sync
+
+    return {
+        "transactions_update_status": "HISTORICAL_UPDATE_COMPLETE",
+        "accounts": [plaid_account(account_id)],
+        "added": [plaid_transaction(account_id, i) for i in range(offset, end)],
+        "modified": [],
+        "removed": [],
+        "next_cursor": str(end),
+        "has_more": end < settings.plaid_transactions,
+        "request_id": uuid.uuid4().hex,
+    }
+
+
+# --- app ---
+
+app = FastAPI(title="yearly_report stubs")
+_prompt_cache = PromptCache()
+_rng = random.Random(stub_settings().seed)
+_rng_lock = threading.Lock()
+
+
+def _openai_error(status: int, message: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status,
+        content={
+            "error": {
+                "message": message,
+                "type": "server_error" if status >= 500 else "rate_limit_exceeded",
+                "param": None,
+                "code": None,
+            }
+        },
+    )
+
+
+@app.post("/v1/chat/completions")
+async def stub_chat_completions(body: dict[str, Any]) -> JSONResponse:
+    settings = stub_settings()
+    with _rng_lock:
+        jitter = _rng.uniform(-settings.jitter_ms, settings.jitter_ms)
+        failure = _rng.random() < settings.failure_rate
+        status = _rng.choice([429, 500])
+
+    await asyncio.sleep(max(settings.latency_ms + jitter, 0) / 1000)
+    if failure:
+        return _openai_error(status, "Injected failure from the stub server")
+    return JSONResponse(chat_completion(body, _prompt_cache))
+
+
+@app.post("/link/token/create")
+async def stub_link_token_create() -> dict[str, Any]:
+    expiration = datetime.now(timezone.utc) + timedelta(hours=4)
+    return {
+        "link_token": f"link-stub-{uuid.uuid4().hex}",
+        "expiration": expiration.isoformat().replace("+00:00", "Z"),
+        "request_id": uuid.uuid4().hex,
+    }
+
+
+@app.post("/item/public_token/exchange")
+async def stub_item_public_token_exchange(body: dict[str, Any]) -> dict[str, Any]:
+    public_token = body["public_token"]
+    return {
+        "access_token": f"access-stub-{public_token}",
+        "item_id": f"item-stub-{_stable_hash(public_token) % 10**8}",
+        "request_id": uuid.uuid4().hex,
+    }
+
+
+@app.post("/accounts/get")
+async def stub_accounts_get(body: dict[str, Any]) -> dict[str, Any]:
+    access_token = body["access_token"]
+    return {
+        "accounts": [
+            plaid_account(account_id) for account_id in plaid_account_ids(access_token)
+        ],
+        "item": {
+            "item_id": f"item-stub-{_stable_hash(access_token) % 10**8}",
+            "webhook": None,
+            "error": None,
+            "available_products": [],
+            "billed_products": ["transactions"],
+            "consent_expiration_time": None,
+            "update_type": "background",
+        },
+        "request_id": uuid.uuid4().hex,
+    }
+
+
+@app.post("/transactions/sync")
+async def stub_transactions_sync(body: dict[str, Any]) -> dict[str, Any]:
+    return transactions_sync(body, stub_settings())
+
+
+@app.post("/emails")
+async def stub_send_email() -> dict[str, Any]:
+    return {"id": str(uuid.uuid4())}
@@ -0,0 +1,122 @@
+"""
+Peak RSS of the upload request's ingestion with concurrent large files:
+reading each upload whole before hashing and storing it, against hashing and
+storing it from the spooled copy a chunk at a time.
+
+    python -m app.devtools.upload_benchmark --uploads 8 --size-mb 20
+
+Each way runs in its own process, so the peaks don't mix. Uploads are
+spooled the way Starlette spools them, and run on threads the way FastAPI
+runs the sync endpoint. The database is left out: a write copies its
+parameters once, as the driver does, and the request keeps what the session
+keeps until commit.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.datastructures import UploadFile
+
+from app.api.routes.uploads import hash_upload, upload_chunks
+
+# what Starlette keeps in memory of each file before it spills to disk
+SPOOL_MAX_SIZE = 1024 * 1024
+WRITE_BLOCK = 1024 * 1024
+
+
+def peak_rss_mb() -> float:
+    # kilobytes on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def spooled_upload(index: int, size: int) -> UploadFile:
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    block = os.urandom(WRITE_BLOCK)
+    written = 0
+    while written < size:
+        spool.write(block[: size - written])
+        written += len(block)
+    spool.seek(0)
+    return UploadFile(spool, size=size, filename=f"statement-{index}.pdf")
+
+
+def ingest_buffered(file: UploadFile) -> str:
+    content_bytes = file.file.read()
+    raw_hash = hashlib.md5(content_bytes).hexdigest()
+    # held by the ORM object until commit, copied by the driver on flush
+    pending = [content_bytes]
+    sent = bytes(memoryview(content_bytes))
+    del sent, pending
+    return raw_hash
+
+
+def ingest_streamed(file: UploadFile) -> str:
+    raw_hash = hash_upload(file)
+    for chunk in upload_chunks(file):
+        sent = bytes(memoryview(chunk))
+        del sent
+    return raw_hash
+
+
+MODES = {"buffered": ingest_buffered, "streamed": ingest_streamed}
+
+
+def run_mode(mode: str, uploads: int, size: int) -> dict[str, float]:
+    files = [spooled_upload(index, size) for index in range(uploads)]
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=uploads) as pool:
+        list(pool.map(MODES[mode], files))
+    return {
+        "baseline_mb": baseline,
+        "peak_mb": peak_rss_mb(),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--uploads", type=int, default=8)
+    parser.add_argument("--size-mb", type=int, default=20)
+    parser.add_argument("--mode", choices=list(MODES))
+    args = parser.parse_args()
+    size = args.size_mb * 1024 * 1024
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.uploads, size)))
+        return
+
+    print(f"{args.uploads} concurrent uploads of {args.size_mb}MB")
+    for mode in MODES:
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "app.devtools.upload_benchmark",
+                "--mode",
+                mode,
+                f"--uploads={args.uploads}",
+                f"--size-mb={args.size_mb}",
+            ],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        print(
+            f"  {mode}: peak RSS {stats['peak_mb']:.0f}MB "
+            f"(+{stats['peak_mb'] - stats['baseline_mb']:.0f}MB over idle), "
+            f"{stats['seconds']:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,36 @@ def make_batches(data: list[T], batch_size: int = 30) -> list[list[T]]:
     return [data[i : i + batch_size] for i in range(0, len(data), batch_size)]
 
 
+def make_budgeted_batches(
+    data: list[T],
+    cost: Callable[[T], tuple[int, ...]],
+    budget: tuple[int, ...],
+    max_size: int,
+) -> list[list[T]]:
+    """
+    Fill each batch in order until one more item would take any of its summed
+    costs over budget, or the batch to `max_size`. An item over budget on its
+    own still gets a batch.
+    """
+    batches: list[list[T]] = []
+    batch: list[T] = []
+    totals = [0] * len(budget)
+    for item in data:
+        item_cost = cost(item)
+        if batch and (
+            len(batch) == max_size
+            or any(t + c > b for t, c, b in zip(totals, item_cost, budget, strict=True))
+        ):
+            batches.append(batch)
+            batch = []
+            totals = [0] * len(budget)
+        batch.append(item)
+        totals = [t + c for t, c in zip(totals, item_cost, strict=True)]
+    if batch:
+        batches.append(batch)
+    return batches
+
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -0,0 +1,161 @@
+"""
+On disk cache of parsed LLM responses, keyed by everything that decides the
+answer: model, response schema, messages and sampling settings.
+
+    LLM_CACHE_MODE=off|read_write|replay  (default off)
+    LLM_CACHE_DIR                         (default <tmp>/yearly_report_llm_cache)
+    LLM_CACHE_TTL_DAYS                    (default 30)
+    LLM_CACHE_MAX_MB                      (default 500)
+
+Only the local docker compose turns on `read_write`, so reruns of an upload
+don't pay for it twice. `replay` only serves from the cache and raises
+LLMCacheMiss otherwise, so a pipeline run against a recorded cache never
+reaches OpenAI.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from enum import Enum
+from pathlib import Path
+from typing import Any, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=BaseModel)
+
+# eviction walks the whole directory, so only do it every so often
+SWEEP_EVERY_WRITES = 100
+
+
+class CacheMode(str, Enum):
+    off = "off"
+    read_write = "read_write"
+    replay = "replay"
+
+
+class LLMCacheMiss(Exception):
+    pass
+
+
+def cache_mode() -> CacheMode:
+    return CacheMode(os.getenv("LLM_CACHE_MODE", CacheMode.off.value))
+
+
+def cache_dir() -> Path:
+    default = Path(tempfile.gettempdir()) / "yearly_report_llm_cache"
+    return Path(os.getenv("LLM_CACHE_DIR") or default)
+
+
+def _ttl_seconds() -> float:
+    return float(os.getenv("LLM_CACHE_TTL_DAYS", "30")) * 24 * 3600
+
+
+def _max_bytes() -> int:
+    return int(float(os.getenv("LLM_CACHE_MAX_MB", "500")) * 1024 * 1024)
+
+
+def cache_key(
+    model: str,
+    response_format: type[BaseModel],
+    messages: list[dict[str, Any]],
+    **settings: Any,
+) -> str:
+    payload = json.dumps(
+        {
+            "model": model,
+            "schema": response_format.model_json_schema(),
+            "messages": messages,
+            "settings": settings,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _path(key: str) -> Path:
+    return cache_dir() / key[:2] / f"{key}.json"
+
+
+def lookup(response_format: type[T], key: str) -> T | None:
+    """A cached response, or None if it should be requested."""
+    mode = cache_mode()
+    if mode == CacheMode.off:
+        return None
+
+    path = _path(key)
+    try:
+        age = time.time() - path.stat().st_mtime
+        # replayed fixtures are kept however old they are
+        if mode != CacheMode.replay and age > _ttl_seconds():
+            path.unlink(missing_ok=True)
+            raise FileNotFoundError(path)
+        value = response_format.model_validate_json(path.read_bytes())
+    except (FileNotFoundError, ValidationError) as e:
+        if mode == CacheMode.replay:
+            raise LLMCacheMiss(f"No cached LLM response for {key}") from e
+        return None
+
+    # mtime doubles as last use, for eviction
+    os.utime(path)
+    return value
+
+
+_lock = threading.Lock()
+_writes_since_sweep = 0
+
+
+def store(key: str, value: BaseModel) -> None:
+    global _writes_since_sweep
+    if cache_mode() != CacheMode.read_write:
+        return
+
+    path = _path(key)
+    try:
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        # write then rename, so a concurrent reader never sees half a file
+        with tempfile.NamedTemporaryFile(
+            "w", dir=path.parent, suffix=".tmp", delete=False
+        ) as tmp:
+            tmp.write(value.model_dump_json())
+        os.replace(tmp.name, path)
+    except OSError as e:
+        logger.warning(f"Could not cache LLM response {key}: {e}")
+        return
+
+    with _lock:
+        _writes_since_sweep += 1
+        sweep = _writes_since_sweep >= SWEEP_EVERY_WRITES
+        if sweep:
+            _writes_since_sweep = 0
+    if sweep:
+        evict()
+
+
+def evict() -> None:
+    """Drop expired entries, then the least recently used until under the size cap."""
+    now = time.time()
+    entries: list[tuple[float, int, Path]] = []
+    for path in cache_dir().glob("*/*.json"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        if now - stat.st_mtime > _ttl_seconds():
+            path.unlink(missing_ok=True)
+        else:
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= _max_bytes():
+            break
+        path.unlink(missing_ok=True)
+        total -= size
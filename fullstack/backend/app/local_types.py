@@ -122,7 +122,6 @@ class TransactionEdit(TransactionBase):
 class UploadedPdfBase(BaseModel):
     filename: str
     nickname: str | None = None
-    raw_content: str
     raw_content_hash: str
     upload_time: datetime
     user_id: int
@@ -418,6 +417,30 @@ class WorkerStatusOut(BaseModel):
     additional_info: str
 
 
+class LLMUsageRow(BaseModel):
+    # a job kind, stage or user id, depending on the grouping
+    key: str
+    calls: int
+    cache_hits: int
+    failures: int
+    retries: int
+    # latency and token percentiles leave out cache hits
+    p50_latency_ms: float | None
+    p95_latency_ms: float | None
+    p50_tokens: float | None
+    p95_tokens: float | None
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+
+
+class LLMUsageSummary(BaseModel):
+    since: datetime
+    by_job_kind: list[LLMUsageRow]
+    by_stage: list[LLMUsageRow]
+    by_user: list[LLMUsageRow]
+
+
 class EffectOut(BaseModel):
     id: int
     name: str
@@ -3,6 +3,7 @@ from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.api.upload_limits import UploadSizeLimitMiddleware
 from app.core.config import settings
 from app.no_code.functions import init_no_code
 
@@ -30,4 +31,8 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+app.add_middleware(
+    UploadSizeLimitMiddleware, path_prefix=f"{settings.API_V1_STR}/uploads"
+)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
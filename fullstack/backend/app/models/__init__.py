@@ -8,10 +8,13 @@ from .pos.orders import *
 from .pos.variants import *
 from .audit_log import *
 from .budget import *
+from .categorization_memo import *
 from .category import *
 from .column_chart_config import *
+from .cron_state import *
 from .effect import *
 from .filter import *
+from .llm_call_log import *
 from .plaid import *
 from .report import *
 from .sankey import *
@@ -0,0 +1,56 @@
+import enum
+from datetime import datetime, timezone
+from typing import NewType
+
+from sqlalchemy import (
+    DateTime,
+    Enum,
+    ForeignKey,
+    Integer,
+    String,
+    UniqueConstraint,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.category import CategoryId
+from app.models.models import Base
+from app.models.transaction_source import TransactionSourceId
+from app.models.user import UserId
+
+CategorizationMemoId = NewType("CategorizationMemoId", int)
+
+
+class MemoSource(str, enum.Enum):
+    history = "history"
+    llm = "llm"
+    # the user picked the category themselves, never overwritten by the others
+    override = "override"
+
+
+class CategorizationMemo(Base):
+    __tablename__ = "categorization_memo"
+
+    id: Mapped[CategorizationMemoId] = mapped_column(
+        Integer, primary_key=True, autoincrement=True
+    )
+    user_id: Mapped[UserId] = mapped_column(ForeignKey("user.id"), nullable=False)
+    transaction_source_id: Mapped[TransactionSourceId] = mapped_column(
+        ForeignKey("transaction_source.id", ondelete="CASCADE"), nullable=False
+    )
+    fingerprint: Mapped[str] = mapped_column(String, nullable=False)
+    category_id: Mapped[CategoryId] = mapped_column(
+        ForeignKey("category.id", ondelete="CASCADE"), nullable=False
+    )
+    source: Mapped[MemoSource] = mapped_column(Enum(MemoSource), nullable=False)
+    hits: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    __table_args__ = (
+        UniqueConstraint(
+            "transaction_source_id", "fingerprint", name="uq_categorization_memo"
+        ),
+    )
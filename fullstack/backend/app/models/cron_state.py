@@ -1,9 +1,25 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+from typing import NewType
 from app.models.models import Base
+from sqlalchemy import (
+    DateTime,
+    Integer,
+    String,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+CronStateId = NewType("CronStateId", int)
 
 
 class CronState(Base):
     __tablename__ = "cron_state"
-    id = Column(Integer, primary_key=True)
-    job_name = Column(String, unique=True, nullable=False)
-    last_run = Column(DateTime, nullable=False)
+
+    id: Mapped[CronStateId] = mapped_column(
+        Integer, primary_key=True, autoincrement=True
+    )
+    job_name: Mapped[str] = mapped_column(String, unique=True, nullable=False)
+    last_run: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    next_run: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    # progress marker for long running jobs, cleared once a run completes
+    checkpoint: Mapped[int | None] = mapped_column(Integer, nullable=True)
@@ -9,8 +9,10 @@ from sqlalchemy import (
     ForeignKey,
     Integer,
     Enum,
+    Index,
     String,
     UniqueConstraint,
+    text,
 )
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy import DateTime
@@ -80,4 +82,13 @@ class Effect(Base):
         JSONType(ConditionalParameters), nullable=False
     )
 
-    __table_args__ = (UniqueConstraint("user_id", "ref_name"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "ref_name"),
+        # timed events fan out to users with an active effect of that type
+        Index(
+            "ix_effect_active_event_type_user",
+            "event_type",
+            "user_id",
+            postgresql_where=text("active"),
+        ),
+    )
@@ -0,0 +1,56 @@
+import enum
+from datetime import datetime, timezone
+from typing import NewType
+
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.models import Base
+from app.models.user import UserId
+from app.models.worker_job import JobKind, WorkerJobId
+
+LLMCallLogId = NewType("LLMCallLogId", int)
+
+
+class LLMStage(str, enum.Enum):
+    config_creation = "config_creation"
+    csv_mapping = "csv_mapping"
+    parse = "parse"
+    categorize = "categorize"
+
+
+class LLMCallLog(Base):
+    __tablename__ = "llm_call_log"
+
+    id: Mapped[LLMCallLogId] = mapped_column(
+        Integer, primary_key=True, autoincrement=True
+    )
+    user_id: Mapped[UserId] = mapped_column(ForeignKey("user.id"), nullable=False)
+    # no foreign key, the log outlives cleaned up jobs
+    job_id: Mapped[WorkerJobId | None] = mapped_column(Integer, nullable=True)
+    # null for calls made outside a worker job, e.g. the plaid sync
+    job_kind: Mapped[JobKind | None] = mapped_column(Enum(JobKind), nullable=True)
+    batch_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    stage: Mapped[LLMStage] = mapped_column(Enum(LLMStage), nullable=False)
+    model: Mapped[str] = mapped_column(String, nullable=False)
+    prompt_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    completion_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cached_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    latency_ms: Mapped[float] = mapped_column(Float, nullable=False)
+    retries: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cache_hit: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    success: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+
+    __table_args__ = (Index("ix_llm_call_log_created_at", "created_at"),)
@@ -1,9 +1,11 @@
+import gzip
 from typing import Generic, TypeVar
 
 from pydantic import BaseModel
 from sqlalchemy import (
     JSON,
     Dialect,
+    LargeBinary,
     TypeDecorator,
 )
 from sqlalchemy.orm import DeclarativeBase
@@ -45,5 +47,24 @@ class JSONType(TypeDecorator[T], Generic[T]):
             return self.dataclass_type.model_validate_json(value)
 
 
+class GzipText(TypeDecorator[str]):
+    """Text stored gzip compressed, for large documents rarely read."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: str | None, _dialect: Dialect) -> bytes | None:
+        if value is None:
+            return None
+        return gzip.compress(value.encode(), compresslevel=6)
+
+    def process_result_value(
+        self, value: bytes | None, _dialect: Dialect
+    ) -> str | None:
+        if value is None:
+            return None
+        return gzip.decompress(value).decode()
+
+
 class Base(DeclarativeBase):
     __rls_enabled__ = True
@@ -1,5 +1,7 @@
+from decimal import ROUND_HALF_UP, Decimal
 from typing import NewType
 import enum
+import re
 
 from datetime import datetime, timezone
 from app.models.category import CategoryId
@@ -8,6 +10,7 @@ from sqlalchemy import (
     Boolean,
     Enum,
     ForeignKey,
+    Index,
     Text,
     String,
     DateTime,
@@ -28,6 +31,32 @@ class TransactionKind(str, enum.Enum):
     deposit = "deposit"
 
 
+_NOT_WORD = re.compile(r"[^\w&']+")
+
+
+def transaction_fingerprint(
+    date_of_transaction: datetime,
+    amount: float,
+    description: str,
+    kind: TransactionKind | str,
+) -> str:
+    """
+    The same line of a statement, however it was uploaded. Amounts are
+    rounded the way the amount column stores them, and the description
+    keeps its digits, so two different checks on a day still differ.
+    """
+    whole_amount = Decimal(str(amount)).quantize(Decimal(1), ROUND_HALF_UP)
+    words = _NOT_WORD.sub(" ", description.lower()).split()
+    return "|".join(
+        [
+            f"{date_of_transaction:%Y-%m-%d}",
+            str(whole_amount),
+            TransactionKind(kind).value,
+            " ".join(words),
+        ]
+    )
+
+
 class Transaction(Base):
     __tablename__ = "transaction"
 
@@ -55,3 +84,11 @@ class Transaction(Base):
     last_updated: Mapped[datetime | None] = mapped_column(
         DateTime, nullable=True, default=lambda: datetime.now(timezone.utc)
     )
+    fingerprint: Mapped[str | None] = mapped_column(String, nullable=True)
+
+    __table_args__ = (
+        # uploads look up which of their lines a source already has
+        Index(
+            "ix_transaction_source_fingerprint", "transaction_source_id", "fingerprint"
+        ),
+    )
@@ -1,5 +1,7 @@
-from typing import NewType
-from app.models.models import Base
+from typing import Literal, NewType
+
+from pydantic import BaseModel, Field
+from app.models.models import Base, JSONType
 from sqlalchemy import (
     ForeignKey,
     UniqueConstraint,
@@ -15,6 +17,56 @@ from app.models.user import UserId
 UploadConfigurationId = NewType("UploadConfigurationId", int)
 
 
+class CsvColumnMapping(BaseModel):
+    """Column indexes of one CSV layout, learned the first time we see it."""
+
+    date: int
+    description: int
+    # either a signed amount column, or separate debit / credit columns
+    amount: int | None = None
+    debit: int | None = None
+    credit: int | None = None
+    # a column saying debit/credit, withdrawal/deposit, ...
+    kind: int | None = None
+    date_format: str
+    # how a signed amount column encodes spending, most rows are spending
+    negative_is_withdrawal: bool = True
+    has_header: bool = True
+
+
+class TemplateLine(BaseModel):
+    """A regex for one shape of transaction row in `pdftotext -layout` output."""
+
+    # named groups: date, description, amount and optionally balance
+    pattern: str
+    date_format: str
+    # how to tell withdrawals from deposits on this kind of row
+    kind_rule: Literal["sign", "position"]
+    negative_is_withdrawal: bool = True
+    # position rule: amounts ending right of this column are deposits
+    deposit_after: int | None = None
+
+
+class ParseTemplate(BaseModel):
+    lines: list[TemplateLine]
+    # normalized descriptions of matching rows that aren't transactions
+    skip_descriptions: list[str] = Field(default_factory=list)
+
+
+class CsvColumnMappings(BaseModel):
+    # keyed by header signature, an account's export can change over time
+    mappings: dict[str, CsvColumnMapping] = Field(default_factory=dict)
+
+
+class LayoutFingerprint(BaseModel):
+    """What identifies an account's statements apart from the filename."""
+
+    # header words every statement of the layout had so far
+    tokens: list[str]
+    # last four digits of the account numbers the statements showed
+    account_masks: list[str] = Field(default_factory=list)
+
+
 class UploadConfiguration(Base):
     __tablename__ = "upload_configuration"
 
@@ -28,6 +80,15 @@ class UploadConfiguration(Base):
         ForeignKey("transaction_source.id"), nullable=False
     )
     user_id: Mapped[UserId] = mapped_column(ForeignKey("user.id"), nullable=False)
+    csv_column_mappings: Mapped[CsvColumnMappings | None] = mapped_column(
+        JSONType(CsvColumnMappings), nullable=True
+    )
+    parse_template: Mapped[ParseTemplate | None] = mapped_column(
+        JSONType(ParseTemplate), nullable=True
+    )
+    layout_fingerprint: Mapped[LayoutFingerprint | None] = mapped_column(
+        JSONType(LayoutFingerprint), nullable=True
+    )
 
     __table_args__ = (
         UniqueConstraint("transaction_source_id", name="uq_upload_configuration"),
@@ -1,10 +1,11 @@
 from datetime import datetime
 from typing import NewType
-from app.models.models import Base
+from app.models.models import Base, GzipText
 from sqlalchemy import (
     Boolean,
     DateTime,
     ForeignKey,
+    LargeBinary,
     UniqueConstraint,
     Text,
     Integer,
@@ -27,7 +28,6 @@ class UploadedPdf(Base):
     )
     filename: Mapped[str] = mapped_column(Text, nullable=False)
     nickname: Mapped[str | None] = mapped_column(Text, nullable=True)
-    raw_content: Mapped[str] = mapped_column(Text, nullable=False)
     raw_content_hash: Mapped[str] = mapped_column(Text, nullable=False)
     upload_time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     user_id: Mapped[UserId] = mapped_column(ForeignKey("user.id"), nullable=False)
@@ -36,3 +36,35 @@ class UploadedPdf(Base):
     __table_args__ = (
         UniqueConstraint("raw_content_hash", "user_id", name="uq_uploaded_pdf"),
     )
+
+
+class UploadedFileBytes(Base):
+    """
+    The file as uploaded, kept until the worker has extracted its text. Stored
+    in chunks, so neither end holds more than one in memory per write.
+    """
+
+    __tablename__ = "uploaded_file_bytes"
+
+    uploaded_pdf_id: Mapped[UploadedPdfId] = mapped_column(
+        ForeignKey("uploaded_pdf.id", ondelete="CASCADE"), primary_key=True
+    )
+    chunk_index: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[UserId] = mapped_column(ForeignKey("user.id"), nullable=False)
+    content: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+
+class UploadedFileContent(Base):
+    """
+    The text extracted from an upload. Kept apart from `UploadedPdf`, so
+    listing and loading uploads never pulls it, and only read by the stages
+    that parse it.
+    """
+
+    __tablename__ = "uploaded_file_content"
+
+    uploaded_pdf_id: Mapped[UploadedPdfId] = mapped_column(
+        ForeignKey("uploaded_pdf.id", ondelete="CASCADE"), primary_key=True
+    )
+    user_id: Mapped[UserId] = mapped_column(ForeignKey("user.id"), nullable=False)
+    content: Mapped[str] = mapped_column(GzipText, nullable=False)
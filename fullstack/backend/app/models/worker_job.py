@@ -1,19 +1,24 @@
 from datetime import datetime
 import enum
 from typing import NewType
-from app.models.models import Base
+
+from pydantic import BaseModel, Field
+from app.models.models import Base, JSONType
 from sqlalchemy import (
     Boolean,
     Enum,
     DateTime,
     ForeignKey,
+    Index,
     UniqueConstraint,
     Text,
     Integer,
+    text,
 )
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy import DateTime
 from datetime import datetime, timezone
+from app.models.category import CategoryId
 from app.models.upload_configuration import UploadConfigurationId
 from app.models.uploaded_pdf import UploadedPdfId
 
@@ -31,11 +36,36 @@ class JobKind(str, enum.Enum):
     full_upload = "full_upload"
     recategorize = "recategorize"
     plaid_recategorize = "plaid_recategorize"
+    # one unit covering every transaction of a source, see enqueue_recategorization
+    source_recategorize = "source_recategorize"
 
 
 WorkerJobId = NewType("WorkerJobId", int)
 
 
+class RecategorizeScope(BaseModel):
+    """
+    What changed about a source's categories since it was last categorized,
+    so a recategorization only sends the transactions that could move. A
+    job without a scope recategorizes everything.
+    """
+
+    # renamed, archived or deleted
+    category_ids: list[CategoryId] = Field(default_factory=list)
+    new_category_ids: list[CategoryId] = Field(default_factory=list)
+
+
+def merge_scopes(
+    first: RecategorizeScope | None, second: RecategorizeScope | None
+) -> RecategorizeScope | None:
+    if first is None or second is None:
+        return None
+    return RecategorizeScope(
+        category_ids=sorted({*first.category_ids, *second.category_ids}),
+        new_category_ids=sorted({*first.new_category_ids, *second.new_category_ids}),
+    )
+
+
 class WorkerJob(Base):
     __tablename__ = "process_file_job"
 
@@ -58,5 +88,17 @@ class WorkerJob(Base):
     attempt_count: Mapped[int] = mapped_column(Integer, default=0)
     error_messages: Mapped[str] = mapped_column(Text, nullable=True)
     kind: Mapped[JobKind] = mapped_column(Enum(JobKind), nullable=False)
+    scope: Mapped[RecategorizeScope | None] = mapped_column(
+        JSONType(RecategorizeScope), nullable=True
+    )
 
-    __table_args__ = (UniqueConstraint("pdf_id", name="uq_process_file_job"),)
+    __table_args__ = (
+        UniqueConstraint("pdf_id", name="uq_process_file_job"),
+        # at most one pending source level unit per config, new requests merge into it
+        Index(
+            "uq_process_file_job_pending_source",
+            "config_id",
+            unique=True,
+            postgresql_where=text("status = 'pending' AND pdf_id IS NULL"),
+        ),
+    )
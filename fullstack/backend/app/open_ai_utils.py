@@ -1,12 +1,43 @@
+import asyncio
 import logging
 import os
-from typing import TypeVar
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import cache
+from typing import Any, Generic, TypeVar, cast
 
 import openai
 from pydantic import BaseModel
 
+from app import llm_cache
+from app.worker.llm_calls import (
+    LLMCall,
+    LLMCallContext,
+    current_llm_context,
+    record_llm_call,
+    use_llm_context,
+)
+
 logger = logging.getLogger(__name__)
 
+MODEL = "gpt-4o-mini"
+MAX_OUTPUT_TOKENS = 9000
+
+# shared by every pipeline in the process, so parallel files don't multiply it
+MAX_CONCURRENT_REQUESTS = 8
+
+# retried here rather than by the client, so the attempts can be counted
+MAX_RETRIES = 2
+RETRY_BACKOFF_SECONDS = 1.0
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
 
 class ChatMessage(BaseModel):
     role: str
@@ -18,30 +49,240 @@ type Prompt = list[ChatMessage]
 T = TypeVar("T", bound=BaseModel)
 
 
-def make_chat_request(model: type[T], messages: list[ChatMessage]) -> T | None:
-    """Send a chat request to OpenAI and return the response as a Pydantic model."""
+@dataclass(frozen=True)
+class ChatResult(Generic[T]):
+    parsed: T | None
+    # the response ran into MAX_OUTPUT_TOKENS, a shorter prompt could finish
+    cut_off: bool = False
+
 
+def _api_key() -> str:
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError("Environment variable 'OPENAI_API_KEY' not set.")
+    return api_key
 
-    client = openai.OpenAI(api_key=api_key)
 
-    try:
-        response = client.beta.chat.completions.parse(
-            model="gpt-4o-mini",
-            messages=[msg.model_dump() for msg in messages],  # type: ignore[misc]
-            response_format=model,
-            temperature=0.0,
-            max_tokens=9000,
+@cache
+def get_async_client() -> openai.AsyncOpenAI:
+    # only ever used from the LLM loop, which its connection pool is bound to
+    return openai.AsyncOpenAI(api_key=_api_key(), max_retries=0)
+
+
+def _request_args(messages: list[ChatMessage]) -> dict[str, Any]:
+    return {
+        "model": MODEL,
+        "messages": [msg.model_dump() for msg in messages],
+        "temperature": 0.0,
+        "max_tokens": MAX_OUTPUT_TOKENS,
+    }
+
+
+def _cache_key(model: type[T], args: dict[str, Any]) -> str:
+    return llm_cache.cache_key(
+        args["model"],
+        model,
+        args["messages"],
+        temperature=args["temperature"],
+        max_tokens=args["max_tokens"],
+    )
+
+
+def _elapsed_ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
+
+
+def _record_cache_hit(started: float) -> None:
+    record_llm_call(
+        LLMCall(
+            model=MODEL,
+            latency_ms=_elapsed_ms(started),
+            success=True,
+            cache_hit=True,
         )
+    )
+
+
+def _parsed_response(
+    response: Any, key: str, started: float, retries: int
+) -> BaseModel | None:
+    usage = response.usage
+    details = getattr(usage, "prompt_tokens_details", None) if usage else None
+    parsed = response.choices[0].message.parsed if response.choices else None
+    record_llm_call(
+        LLMCall(
+            model=MODEL,
+            latency_ms=_elapsed_ms(started),
+            success=parsed is not None,
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0,
+            cached_tokens=(details.cached_tokens or 0) if details else 0,
+            retries=retries,
+        )
+    )
+
+    if not response.choices:
+        raise ValueError("No response choices received from OpenAI.")
+    if parsed is not None:
+        llm_cache.store(key, parsed)
+    return parsed
 
-        if not response.choices:
-            raise ValueError("No response choices received from OpenAI.")
 
-        val = response.choices[0].message.parsed
-        return val
+def _record_failure(started: float, retries: int) -> None:
+    record_llm_call(
+        LLMCall(
+            model=MODEL,
+            latency_ms=_elapsed_ms(started),
+            success=False,
+            retries=retries,
+        )
+    )
+
+
+async def chat_result_async(
+    model: type[T], messages: list[ChatMessage]
+) -> ChatResult[T]:
+    started = time.perf_counter()
+    args = _request_args(messages)
+    key = _cache_key(model, args)
+    cached = llm_cache.lookup(model, key)
+    if cached is not None:
+        _record_cache_hit(started)
+        return ChatResult(cached)
+
+    client = get_async_client()
+
+    retries = 0
+    try:
+        while True:
+            try:
+                response = await client.beta.chat.completions.parse(
+                    **args,
+                    response_format=model,
+                )
+                break
+            except RETRYABLE_ERRORS:
+                if retries == MAX_RETRIES:
+                    raise
+                await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2**retries)
+                retries += 1
 
+        return ChatResult(
+            cast(T | None, _parsed_response(response, key, started, retries))
+        )
+
+    except openai.LengthFinishReasonError:
+        _record_failure(started, retries)
+        logger.warning(f"Response cut off at {MAX_OUTPUT_TOKENS} tokens")
+        return ChatResult(None, cut_off=True)
     except openai.OpenAIError as e:
-        print(f"OpenAI API error: {e}")
-        return None
+        _record_failure(started, retries)
+        logger.error(f"OpenAI API error: {e}")
+        return ChatResult(None)
+
+
+async def make_chat_request_async(
+    model: type[T], messages: list[ChatMessage]
+) -> T | None:
+    """Send a chat request to OpenAI and return the response as a Pydantic model."""
+    return (await chat_result_async(model, messages)).parsed
+
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+_semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+
+def _llm_loop() -> asyncio.AbstractEventLoop:
+    """
+    A long lived event loop on its own thread that owns the async client.
+
+    Pipelines run in worker threads (and the plaid sync inside another
+    running loop), so they hand coroutines to this loop rather than calling
+    asyncio.run themselves.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="llm-loop", daemon=True
+            ).start()
+        return _loop
+
+
+async def _chat_request_in_context(
+    model: type[T], messages: list[ChatMessage], context: LLMCallContext | None
+) -> T | None:
+    with use_llm_context(context):
+        return await make_chat_request_async(model, messages)
+
+
+def make_chat_request(model: type[T], messages: list[ChatMessage]) -> T | None:
+    """The blocking form of make_chat_request_async, run on the LLM loop."""
+    future = asyncio.run_coroutine_threadsafe(
+        _chat_request_in_context(model, messages, current_llm_context()),
+        _llm_loop(),
+    )
+    return future.result()
+
+
+async def _gather_chat_requests(
+    model: type[T],
+    prompts: list[Prompt],
+    on_done: Callable[[int], None] | None,
+    context: LLMCallContext | None,
+) -> list[ChatResult[T]]:
+    completed = 0
+
+    async def run(index: int, prompt: Prompt) -> ChatResult[T]:
+        nonlocal completed
+        async with _semaphore:
+            try:
+                result = await chat_result_async(model, prompt)
+            except llm_cache.LLMCacheMiss:
+                raise
+            except Exception as e:
+                logger.error(f"Failed LLM request for batch {index + 1}: {e}")
+                result = ChatResult(None)
+        completed += 1
+        if on_done:
+            on_done(completed)
+        return result
+
+    # the tasks copy the context they're created in, so they're logged
+    # against the caller's pipeline stage
+    with use_llm_context(context):
+        return await asyncio.gather(
+            *[run(index, prompt) for index, prompt in enumerate(prompts)]
+        )
+
+
+def make_chat_results(
+    model: type[T],
+    prompts: list[Prompt],
+    on_done: Callable[[int], None] | None = None,
+) -> list[ChatResult[T]]:
+    """
+    Send one request per prompt concurrently, bounded by MAX_CONCURRENT_REQUESTS.
+
+    Results line up with `prompts`; a failed batch is logged and comes back
+    without a parsed response, marked when it was cut off. `on_done` is
+    called with the number of finished requests.
+    """
+    if not prompts:
+        return []
+    future = asyncio.run_coroutine_threadsafe(
+        _gather_chat_requests(model, prompts, on_done, current_llm_context()),
+        _llm_loop(),
+    )
+    return future.result()
+
+
+def make_chat_requests(
+    model: type[T],
+    prompts: list[Prompt],
+    on_done: Callable[[int], None] | None = None,
+) -> list[T | None]:
+    """make_chat_results' parsed responses, None for a failed batch."""
+    return [result.parsed for result in make_chat_results(model, prompts, on_done)]
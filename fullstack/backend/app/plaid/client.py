@@ -21,10 +21,14 @@ def get_plaid_client() -> plaid_api.PlaidApi:
     assert secret, "must have"
     assert environment, "must have"
 
-    configuration = plaid.Configuration(
-        host=plaid.Environment.Sandbox
+    host = (
+        plaid.Environment.Sandbox
         if environment == "sandbox"
-        else plaid.Environment.Production,
+        else plaid.Environment.Production
+    )
+    configuration = plaid.Configuration(
+        # PLAID_HOST points at a local stand-in, see app/devtools/stub_server.py
+        host=os.getenv("PLAID_HOST") or host,
         api_key={
             "clientId": client_id,
             "secret": secret,
@@ -1,7 +1,8 @@
 import logging
 import uuid
+from collections.abc import Sequence
 from dataclasses import dataclass, replace
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, time, timedelta, timezone
 from typing import Any, Callable
 
 from plaid.api.plaid_api import TransactionsSyncRequest, TransactionsSyncResponse
@@ -10,6 +11,7 @@ from sqlalchemy.orm import Session
 
 from app.async_pipelines.uploaded_file_pipeline.categorizer import (
     categorize_extracted_transactions,
+    transaction_dates,
 )
 from app.async_pipelines.uploaded_file_pipeline.configuration_creator import (
     add_default_categories,
@@ -21,6 +23,7 @@ from app.async_pipelines.uploaded_file_pipeline.local_types import (
     TransactionsWrapper,
 )
 from app.budgets.check_budget import build_budget_status
+from app.categorization.corrections import dedupe_recategorizations
 from app.func_utils import not_none, pipe
 from app.local_types import Month
 from app.models.audit_log import AuditLog
@@ -32,7 +35,11 @@ from app.models.plaid import (
     PlaidSyncLog,
     SyncStatus,
 )
-from app.models.transaction import Transaction, TransactionKind
+from app.models.transaction import (
+    Transaction,
+    TransactionKind,
+    transaction_fingerprint,
+)
 from app.models.transaction_source import TransactionSource
 from app.models.user import User
 from app.models.worker_status import ProcessingState
@@ -48,7 +55,7 @@ from app.no_code.notifications.trigger import (
 from app.plaid.client import get_plaid_client
 from app.schemas.no_code import NoCodeTransaction, NoCodeBudgetEntry
 from app.telegram_utils import send_telegram_message
-from app.worker.status import status_update_monad, update_worker_status
+from app.worker.status import queue_worker_status, status_update_monad
 
 logger = logging.getLogger(__name__)
 
@@ -172,8 +179,7 @@ def sync_plaid_account_transactions(
     batch_id: str,
 ) -> None:
     def _update_worker_status(x: ProcessingState, y: str) -> None:
-        update_worker_status(
-            session,
+        queue_worker_status(
             user,
             status=x,
             additional_info=y,
@@ -283,6 +289,7 @@ def apply_previous_plaid_recategorizations(in_process: InProcessJob) -> InProces
             ~Transaction.archived,
             AuditLog.apply_to_future,
         )
+        .order_by(AuditLog.created_at)
         .all()
     )
 
@@ -311,10 +318,29 @@ def apply_previous_plaid_recategorizations(in_process: InProcessJob) -> InProces
 
     return replace(
         in_process,
-        previous_recategorizations=recats or None,
+        previous_recategorizations=dedupe_recategorizations(recats) or None,
     )
 
 
+def synced_transaction_dates(
+    in_process: InProcessJob, transactions: Sequence[PartialTransaction]
+) -> list[datetime]:
+    """
+    Plaid's own dates; the %m/%d/%Y strings are written for the LLM and only
+    read back when a transaction came without one.
+    """
+    native = in_process.transaction_dates or {}
+    dates = []
+    for t in transactions:
+        if t.partialPlaidTransactionId is None:
+            return transaction_dates(transactions)
+        date = native.get(t.partialPlaidTransactionId)
+        if date is None:
+            return transaction_dates(transactions)
+        dates.append(datetime.combine(date, time()))
+    return dates
+
+
 def insert_categorized_plaid_transactions(in_process: InProcessJob) -> InProcessJob:
     assert not_none(in_process.transaction_source)
     assert not_none(in_process.categorized_transactions)
@@ -326,27 +352,35 @@ def insert_categorized_plaid_transactions(in_process: InProcessJob) -> InProcess
 
     transactions_to_insert = []
 
-    for transaction in in_process.categorized_transactions:
+    for transaction, date_of_transaction in zip(
+        in_process.categorized_transactions,
+        synced_transaction_dates(in_process, in_process.categorized_transactions),
+        strict=True,
+    ):
         existing_transaction = existing_transaction_lookup.get(
             transaction.partialPlaidTransactionId
         )
+        # lets an uploaded export of the same account skip these
+        fingerprint = transaction_fingerprint(
+            date_of_transaction,
+            transaction.partialTransactionAmount,
+            transaction.partialTransactionDescription,
+            transaction.partialTransactionKind,
+        )
         if existing_transaction:
             existing_transaction.category_id = category_lookup[transaction.category]
             existing_transaction.last_updated = datetime.now()
             existing_transaction.amount = transaction.partialTransactionAmount
-            existing_transaction.date_of_transaction = datetime.strptime(
-                transaction.partialTransactionDateOfTransaction, "%m/%d/%Y"
-            )
+            existing_transaction.date_of_transaction = date_of_transaction
             existing_transaction.description = transaction.partialTransactionDescription
+            existing_transaction.fingerprint = fingerprint
 
         else:
             transactions_to_insert.append(
                 Transaction(
                     description=transaction.partialTransactionDescription,
                     category_id=category_lookup[transaction.category],
-                    date_of_transaction=datetime.strptime(
-                        transaction.partialTransactionDateOfTransaction, "%m/%d/%Y"
-                    ),
+                    date_of_transaction=date_of_transaction,
                     amount=transaction.partialTransactionAmount,
                     transaction_source_id=in_process.transaction_source.id,
                     kind=transaction.partialTransactionKind,
@@ -354,6 +388,7 @@ def insert_categorized_plaid_transactions(in_process: InProcessJob) -> InProcess
                     uploaded_pdf_id=in_process.file.id if in_process.file else None,
                     user_id=in_process.user.id,
                     archived=False,
+                    fingerprint=fingerprint,
                 )
             )
 
@@ -378,15 +413,17 @@ def trigger_new_transaction_effect(in_process: InProcessJob) -> InProcessJob:
             account_name=in_process.transaction_source.name,
             amount=t.partialTransactionAmount,
             description=t.partialTransactionDescription,
-            date_of_transaction=datetime.strptime(
-                t.partialTransactionDateOfTransaction, "%m/%d/%Y"
-            ),
+            date_of_transaction=date_of_transaction,
             kind=TransactionKind.deposit
             if t.partialTransactionKind == "deposit"
             else TransactionKind.withdrawal,
             category_name=t.category,
         )
-        for t in in_process.categorized_transactions
+        for t, date_of_transaction in zip(
+            in_process.categorized_transactions,
+            synced_transaction_dates(in_process, in_process.categorized_transactions),
+            strict=True,
+        )
     ]
     trigger_effects(
         in_process.session,
@@ -411,15 +448,17 @@ def trigger_budget_effect(in_process: InProcessJob) -> None:
             account_name=in_process.transaction_source.name,
             amount=t.partialTransactionAmount,
             description=t.partialTransactionDescription,
-            date_of_transaction=datetime.strptime(
-                t.partialTransactionDateOfTransaction, "%m/%d/%Y"
-            ),
+            date_of_transaction=date_of_transaction,
             kind=TransactionKind.deposit
             if t.partialTransactionKind == "deposit"
             else TransactionKind.withdrawal,
             category_name=t.category,
         )
-        for t in in_process.categorized_transactions
+        for t, date_of_transaction in zip(
+            in_process.categorized_transactions,
+            synced_transaction_dates(in_process, in_process.categorized_transactions),
+            strict=True,
+        )
     ]
 
     budget_status = build_budget_status(in_process.session, in_process.user)
@@ -481,12 +520,14 @@ def add_new_transactions(
             .all()
         )
 
+    synced = plaid_response.added + plaid_response.modified
     in_process = InProcessJob(
         session=session,
         user=user,
         batch_id=uuid.uuid4().hex,
         transaction_source=transaction_source,
         categories=categories,
+        transaction_dates={pt["transaction_id"]: pt["date"] for pt in synced},
         transactions_to_delete=[pt["transaction_id"] for pt in plaid_response.removed],
         transactions=TransactionsWrapper(
             transactions=[
@@ -500,7 +541,7 @@ def add_new_transactions(
                         float(pt["amount"])
                     ).value,  # todo this should be improved
                 )
-                for pt in plaid_response.added + plaid_response.modified
+                for pt in synced
             ]
         ),
     )
@@ -525,6 +566,12 @@ def update_modified_transactions(
         local_tx.date_of_transaction = pt["date"]
         local_tx.amount = abs(float(pt["amount"]))
         local_tx.kind = get_transaction_kind(float(pt["amount"]))
+        local_tx.fingerprint = transaction_fingerprint(
+            local_tx.date_of_transaction,
+            local_tx.amount,
+            local_tx.description,
+            local_tx.kind,
+        )
         local_tx.last_updated = datetime.now()
 
         session.add(local_tx)
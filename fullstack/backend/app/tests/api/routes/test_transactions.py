@@ -0,0 +1,34 @@
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from app.api.routes.transactions import update_transaction
+from app.local_types import TransactionEdit
+from app.models.transaction import Transaction, TransactionKind
+
+
+def test_edit_refreshes_the_fingerprint() -> None:
+    stored = Transaction(
+        id=1,
+        user_id=1,
+        description="COFFEE",
+        category_id=3,
+        date_of_transaction=datetime(2025, 1, 5),
+        amount=12.0,
+        kind=TransactionKind.withdrawal,
+        fingerprint="2025-01-05|12|withdrawal|coffee",
+    )
+    session = MagicMock()
+    session.query.return_value.filter.return_value.one.return_value = stored
+    edit = TransactionEdit(
+        id=1,
+        description="Coffee Shop",
+        category_id=3,
+        date_of_transaction=datetime(2025, 1, 6),
+        amount=14.0,
+        transaction_source_id=1,
+        kind=TransactionKind.withdrawal,
+    )
+
+    update_transaction(edit, user=MagicMock(id=1), session=session)
+
+    assert stored.fingerprint == "2025-01-06|14|withdrawal|coffee shop"
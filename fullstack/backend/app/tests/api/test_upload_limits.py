@@ -0,0 +1,47 @@
+import hashlib
+import io
+
+import pytest
+from fastapi import FastAPI, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+from app.api import upload_limits
+from app.api.routes.uploads import hash_upload
+from app.api.upload_limits import UploadSizeLimitMiddleware
+
+
+def test_oversized_requests_are_refused_before_the_route(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(upload_limits, "MAX_REQUEST_BYTES", 1024)
+    reached = []
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware, path_prefix="/uploads")
+
+    @app.post("/uploads/")
+    def upload(file: UploadFile) -> int:
+        reached.append(file.filename)
+        return len(file.file.read())
+
+    client = TestClient(app)
+
+    small = client.post("/uploads/", files={"file": ("a.pdf", b"x" * 100)})
+    large = client.post("/uploads/", files={"file": ("b.pdf", b"x" * 2048)})
+
+    assert small.json() == 100
+    assert large.status_code == 413
+    assert reached == ["a.pdf"]
+
+
+def test_files_are_hashed_in_chunks_up_to_the_limit(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr("app.api.routes.uploads.UPLOAD_CHUNK_BYTES", 3)
+    monkeypatch.setattr("app.api.routes.uploads.MAX_FILE_BYTES", 8)
+
+    assert hash_upload(UploadFile(io.BytesIO(b"statemen"))) == (
+        hashlib.md5(b"statemen").hexdigest()
+    )
+    with pytest.raises(HTTPException) as error:
+        hash_upload(UploadFile(io.BytesIO(b"statement")))
+    assert error.value.status_code == 413
@@ -0,0 +1,81 @@
+from app.async_pipelines.uploaded_file_pipeline.local_types import Recategorization
+from app.categorization.affected import affected_transactions
+from app.categorization.classifier import LabeledDescription, NgramClassifier
+from app.models.category import Category, CategoryId
+from app.models.transaction import Transaction, TransactionId, TransactionKind
+from app.models.worker_job import RecategorizeScope, merge_scopes
+
+GROCERIES, DINING, TRAVEL, COFFEE = (CategoryId(i) for i in range(1, 5))
+
+CATEGORIES = [
+    Category(id=GROCERIES, name="Groceries", archived=False),
+    Category(id=DINING, name="Dining", archived=False),
+    Category(id=TRAVEL, name="Travel", archived=True),
+    Category(id=COFFEE, name="Coffee Shops", archived=False),
+]
+
+
+def transaction(id: int, description: str, category_id: CategoryId) -> Transaction:
+    return Transaction(
+        id=TransactionId(id),
+        description=description,
+        category_id=category_id,
+        kind=TransactionKind.withdrawal,
+    )
+
+
+HISTORY = [
+    transaction(1, "WHOLE FOODS #1023", GROCERIES),
+    transaction(2, "WHOLE FOODS #2211", GROCERIES),
+    transaction(3, "CHIPOTLE 0042", DINING),
+    transaction(4, "CHIPOTLE 0917", DINING),
+    transaction(5, "DELTA AIR LINES", TRAVEL),
+    transaction(6, "BLUE BOTTLE COFFEE", DINING),
+    transaction(7, "BLUE BOTTLE COFFEE", DINING),
+]
+
+
+def classifier() -> NgramClassifier:
+    return NgramClassifier().fit(
+        [LabeledDescription(t.description, t.category_id) for t in HISTORY] * 3
+    )
+
+
+def affected_ids(scope: RecategorizeScope, recats: list[Recategorization]) -> set[int]:
+    return {
+        t.id
+        for t in affected_transactions(HISTORY, scope, CATEGORIES, recats, classifier())
+    }
+
+
+def test_a_settled_source_only_resends_archived_categories():
+    assert affected_ids(RecategorizeScope(), []) == {5}
+
+
+def test_touched_categories_and_correction_rules_are_resent():
+    scope = RecategorizeScope(category_ids=[GROCERIES])
+    recats = [
+        Recategorization(
+            description="CHIPOTLE 1111",
+            previous_category="Dining",
+            overrided_category="Groceries",
+        )
+    ]
+
+    assert affected_ids(scope, recats) == {1, 2, 3, 4, 5}
+
+
+def test_new_category_pulls_in_merchants_named_like_it():
+    scope = RecategorizeScope(new_category_ids=[COFFEE])
+
+    assert affected_ids(scope, []) == {5, 6, 7}
+
+
+def test_scopes_merge_and_a_full_request_wins():
+    first = RecategorizeScope(category_ids=[DINING])
+    second = RecategorizeScope(category_ids=[GROCERIES], new_category_ids=[COFFEE])
+
+    assert merge_scopes(first, second) == RecategorizeScope(
+        category_ids=[GROCERIES, DINING], new_category_ids=[COFFEE]
+    )
+    assert merge_scopes(first, None) is None
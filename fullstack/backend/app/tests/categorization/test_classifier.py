@@ -0,0 +1,56 @@
+from app.categorization.classifier import LabeledDescription, NgramClassifier
+from app.models.category import CategoryId
+
+GROCERIES = CategoryId(1)
+TRANSPORT = CategoryId(2)
+DINING = CategoryId(3)
+
+
+def make_classifier() -> NgramClassifier:
+    return NgramClassifier().fit(
+        [
+            LabeledDescription("TRADER JOE'S #552 SEATTLE", GROCERIES),
+            LabeledDescription("SAFEWAY STORE 1441", GROCERIES),
+            LabeledDescription("WHOLEFDS MKT 10234", GROCERIES),
+            LabeledDescription("UBER *TRIP HELP.UBER.COM", TRANSPORT),
+            LabeledDescription("LYFT *RIDE SUN 10AM", TRANSPORT),
+            LabeledDescription("CHIPOTLE 0923", DINING),
+            LabeledDescription("STARBUCKS STORE 22811", DINING),
+        ]
+    )
+
+
+def test_predicts_near_duplicate_merchants_confidently():
+    classifier = make_classifier()
+
+    prediction = classifier.predict("UBER *TRIP HELP.UBER.COM CA")
+    assert prediction is not None
+    assert prediction.category_id == TRANSPORT
+    assert prediction.confidence > 0.6
+
+    prediction = classifier.predict("TRADER JOES #117 PORTLAND")
+    assert prediction is not None
+    assert prediction.category_id == GROCERIES
+
+
+def test_unrelated_description_is_not_confident():
+    prediction = make_classifier().predict("ZELLE PAYMENT TO J SMITH")
+    assert prediction is None or prediction.confidence < 0.6
+
+
+def test_empty_classifier_predicts_nothing():
+    assert NgramClassifier().fit([]).predict("anything") is None
+
+
+def test_corrections_outvote_plain_history():
+    classifier = NgramClassifier().fit(
+        [
+            LabeledDescription("AMAZON MKTPLACE PMTS", GROCERIES),
+            LabeledDescription("AMAZON MKTPLACE PMTS", GROCERIES),
+            LabeledDescription("AMAZON MKTPLACE PMTS", DINING, weight=3.0),
+        ]
+    )
+
+    prediction = classifier.predict("AMAZON MKTPLACE PMTS")
+    assert prediction is not None
+    assert prediction.category_id == DINING
@@ -0,0 +1,70 @@
+from app.async_pipelines.uploaded_file_pipeline.local_types import (
+    PartialTransaction,
+    Recategorization,
+)
+from app.categorization.corrections import (
+    CorrectionSelector,
+    dedupe_recategorizations,
+)
+
+
+def recat(description: str, before: str, after: str) -> Recategorization:
+    return Recategorization(
+        description=description, previous_category=before, overrided_category=after
+    )
+
+
+def transaction(description: str) -> PartialTransaction:
+    return PartialTransaction(
+        partialTransactionId=None,
+        partialPlaidTransactionId=None,
+        partialTransactionDateOfTransaction="04/02/2025",
+        partialTransactionDescription=description,
+        partialTransactionKind="withdrawal",
+        partialTransactionAmount=10.0,
+    )
+
+
+def test_dedupe_keeps_the_latest_per_merchant_and_override():
+    recats = [
+        recat("UBER *TRIP 1234", "Misc", "Travel"),
+        recat("COSTCO WHSE #0012", "Misc", "Groceries"),
+        recat("UBER *TRIP 5678", "Entertainment", "Travel"),
+        recat("UBER *TRIP 9999", "Travel", "Misc"),
+    ]
+
+    assert dedupe_recategorizations(recats) == [
+        recat("COSTCO WHSE #0012", "Misc", "Groceries"),
+        recat("UBER *TRIP 5678", "Entertainment", "Travel"),
+        recat("UBER *TRIP 9999", "Travel", "Misc"),
+    ]
+
+
+def test_selects_only_corrections_similar_to_the_batch():
+    merchants = [
+        "UBER *TRIP HELP.UBER.COM",
+        "COSTCO WHSE #0012",
+        "NETFLIX.COM",
+        "SHELL OIL 5521",
+        "CHIPOTLE 0923",
+        "AMAZON MKTPL*2K4",
+        "TARGET T-1234",
+        "SPOTIFY USA",
+    ]
+    recats = [recat(m, "Misc", "Other") for m in merchants]
+    selector = CorrectionSelector(recats, limit=3)
+
+    selected = selector.select(
+        [transaction("UBER *TRIP HELP.UBER.COM CA"), transaction("SHELL OIL 8812")]
+    )
+
+    assert [r.description for r in selected] == [
+        "UBER *TRIP HELP.UBER.COM",
+        "SHELL OIL 5521",
+    ]
+
+
+def test_small_correction_lists_are_sent_whole():
+    recats = [recat("NETFLIX.COM", "Misc", "Subscriptions")]
+
+    assert CorrectionSelector(recats).select([transaction("SAFEWAY")]) == recats
@@ -0,0 +1,30 @@
+from app.categorization.memo import most_common_categories, normalize_description
+from app.models.category import CategoryId
+
+
+def test_normalize_description_strips_store_numbers_and_digits():
+    assert normalize_description("STARBUCKS #1234 SEATTLE WA 04/12") == (
+        "starbucks seattle wa"
+    )
+    assert normalize_description("Starbucks  5678 Seattle WA") == "starbucks seattle wa"
+    assert normalize_description("WALGREENS STORE 0042") == "walgreens"
+    assert normalize_description("AT&T  Payment") == "at&t payment"
+
+
+def test_normalize_description_of_only_digits_is_empty():
+    assert normalize_description("123 456") == ""
+
+
+def test_most_common_categories_picks_majority_per_fingerprint():
+    rows = [
+        ("UBER *TRIP 123", CategoryId(1)),
+        ("UBER *TRIP 456", CategoryId(1)),
+        ("UBER *TRIP 789", CategoryId(2)),
+        ("Trader Joe's #552", CategoryId(3)),
+        ("0000", CategoryId(4)),
+    ]
+
+    assert most_common_categories(rows) == {
+        "uber trip": CategoryId(1),
+        "trader joe's": CategoryId(3),
+    }
@@ -0,0 +1,106 @@
+import json
+
+from openai.lib._pydantic import to_strict_json_schema
+
+from app.async_pipelines.uploaded_file_pipeline.local_types import (
+    PartialTransaction,
+    PartialUploadConfig,
+    TransactionsWrapper,
+    create_categorized_transactions_wrapper,
+)
+from app.devtools.stub_server import (
+    PROMPT_CACHE_MIN_TOKENS,
+    PromptCache,
+    chat_completion,
+)
+
+
+def complete(model: type, prompt: str, cache: PromptCache | None = None) -> dict:
+    body = {
+        "model": "gpt-4o-mini",
+        "messages": [{"role": "user", "content": prompt}],
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": {
+                "name": model.__name__,
+                "schema": to_strict_json_schema(model),
+                "strict": True,
+            },
+        },
+    }
+    return chat_completion(body, cache)
+
+
+def content(response: dict) -> str:
+    return response["choices"][0]["message"]["content"]
+
+
+def test_parses_statement_lines() -> None:
+    prompt = """
+    Parse the following PDF content into a JSON array of transactions.
+    Date  Description  Amount
+    01/02  WHOLE FOODS MARKET  -12.50
+    01/05/2025  PAYROLL DEPOSIT  $1,200.00
+    Ending Balance
+    """
+    parsed = TransactionsWrapper.model_validate_json(
+        content(complete(TransactionsWrapper, prompt))
+    )
+
+    assert [
+        (
+            t.partialTransactionDescription,
+            t.partialTransactionAmount,
+            t.partialTransactionKind,
+        )
+        for t in parsed.transactions
+    ] == [
+        ("WHOLE FOODS MARKET", 12.5, "withdrawal"),
+        ("PAYROLL DEPOSIT", 1200.0, "deposit"),
+    ]
+    assert parsed.transactions[1].partialTransactionDateOfTransaction == "01/05/2025"
+
+
+def test_categorizes_deterministically_from_the_schema() -> None:
+    transactions = [
+        PartialTransaction(
+            partialTransactionId=None,
+            partialPlaidTransactionId=plaid_id,
+            partialTransactionAmount=10.0,
+            partialTransactionDescription=description,
+            partialTransactionDateOfTransaction="01/02/2025",
+            partialTransactionKind="withdrawal",
+        )
+        for plaid_id, description in [("a", "NETFLIX.COM"), ("b", "SHELL OIL")]
+    ]
+    wrapper = create_categorized_transactions_wrapper(
+        ["Dining", "Travel", "Bills"], ["a", "b"], []
+    )
+    prompt = "Assign a category:\n\n" + "\n".join(
+        t.model_dump_json() for t in transactions
+    )
+
+    first = content(complete(wrapper, prompt))
+    parsed = wrapper.model_validate_json(first)
+
+    assert [t.partialPlaidTransactionId for t in parsed.transactions] == ["a", "b"]
+    assert {t.category for t in parsed.transactions} <= {"Dining", "Travel", "Bills"}
+    assert content(complete(wrapper, prompt)) == first
+
+
+def test_generic_schema_and_prompt_caching() -> None:
+    cache = PromptCache()
+    prompt = "x" * (PROMPT_CACHE_MIN_TOKENS * 4 * 2)
+
+    first = complete(PartialUploadConfig, prompt, cache)
+    second = complete(PartialUploadConfig, prompt + " more", cache)
+
+    assert set(json.loads(content(first))) == {
+        "filenameRegex",
+        "startKeyword",
+        "endKeyword",
+    }
+    assert first["usage"]["prompt_tokens_details"]["cached_tokens"] == 0
+    assert second["usage"]["prompt_tokens_details"]["cached_tokens"] >= (
+        PROMPT_CACHE_MIN_TOKENS
+    )
@@ -1,5 +1,5 @@
 import uuid
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -24,6 +24,7 @@ from app.plaid.sync_service import (
     fetch_existing_plaid_transactions,
     fetch_plaid_transactions,
     insert_categorized_plaid_transactions,
+    synced_transaction_dates,
 )
 from app.tests.utils.utils import TestKit, random_lower_string
 
@@ -436,3 +437,97 @@ def test_insert_categorized_plaid_transactions_mixed(test_kit: TestKit):
     assert new_tx.amount == 200.0
     assert new_tx.kind == TransactionKind.deposit
     assert new_tx.category_id == category1.id
+
+
+def plaid_transaction(external_id: str, date_string: str) -> CategorizedTransaction:
+    return CategorizedTransaction(
+        partialTransactionId=None,
+        partialPlaidTransactionId=PlaidTransactionId(external_id),
+        partialTransactionAmount=12.0,
+        partialTransactionDescription="Coffee",
+        partialTransactionDateOfTransaction=date_string,
+        partialTransactionKind=TransactionKind.withdrawal.value,
+        category="Category 1",
+    )
+
+
+def test_synced_transaction_dates_use_plaid_dates():
+    in_process = InProcessJob(
+        session=MagicMock(),
+        user=MagicMock(),
+        batch_id=uuid.uuid4().hex,
+        transaction_dates={
+            PlaidTransactionId("txn-abc"): date(2025, 1, 5),
+            PlaidTransactionId("txn-def"): date(2025, 1, 6),
+        },
+    )
+    transactions = [
+        # the string is only what the prompt saw
+        plaid_transaction("txn-abc", "01/05/2025"),
+        plaid_transaction("txn-def", "not read"),
+    ]
+
+    assert synced_transaction_dates(in_process, transactions) == [
+        datetime(2025, 1, 5),
+        datetime(2025, 1, 6),
+    ]
+
+
+def test_synced_transaction_dates_read_strings_without_plaid_dates():
+    in_process = InProcessJob(
+        session=MagicMock(),
+        user=MagicMock(),
+        batch_id=uuid.uuid4().hex,
+        transaction_dates={PlaidTransactionId("txn-abc"): date(2025, 1, 5)},
+    )
+    transactions = [
+        plaid_transaction("txn-abc", "01/05/2025"),
+        plaid_transaction("txn-missing", "01/07/2025"),
+    ]
+
+    assert synced_transaction_dates(in_process, transactions) == [
+        datetime(2025, 1, 5),
+        datetime(2025, 1, 7),
+    ]
+
+
+def test_insert_categorized_plaid_transactions_with_plaid_dates(test_kit: TestKit):
+    session = test_kit.session
+    user = test_kit.user
+
+    transaction_source = TransactionSource(
+        name=random_lower_string(),
+        user_id=user.id,
+        source_kind="account",
+    )
+    session.add(transaction_source)
+    session.flush()
+
+    category1 = Category(
+        name="Category 1",
+        source_id=transaction_source.id,
+        user_id=user.id,
+    )
+    session.add(category1)
+    session.flush()
+
+    external_id = f"plaid_tx_{uuid.uuid4().hex}"
+    in_process = InProcessJob(
+        session=session,
+        user=user,
+        batch_id=uuid.uuid4().hex,
+        transaction_source=transaction_source,
+        categories=[category1],
+        existing_transactions=[],
+        transaction_dates={PlaidTransactionId(external_id): date(2025, 1, 5)},
+        categorized_transactions=[plaid_transaction(external_id, "01/05/2025")],
+    )
+
+    result = insert_categorized_plaid_transactions(in_process)
+
+    assert result.inserted_transactions is not None
+    new_tx = (
+        session.query(Transaction).filter(Transaction.external_id == external_id).one()
+    )
+    assert new_tx.date_of_transaction == datetime(2025, 1, 5)
+    assert new_tx.fingerprint == "2025-01-05|12|withdrawal|coffee"
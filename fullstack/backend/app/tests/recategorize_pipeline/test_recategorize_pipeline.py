@@ -0,0 +1,103 @@
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.async_pipelines.recategorize_pipeline import main as recategorize_pipeline
+from app.async_pipelines.recategorize_pipeline.main import (
+    apply_existing_transactions,
+    insert_recategorized_transactions,
+)
+from app.async_pipelines.uploaded_file_pipeline import categorizer
+from app.async_pipelines.uploaded_file_pipeline.categorizer import (
+    categorize_extracted_transactions,
+)
+from app.async_pipelines.uploaded_file_pipeline.local_types import (
+    CategorizedTransaction,
+    InProcessJob,
+    PartialTransaction,
+)
+from app.categorization.classifier import LabeledDescription
+from app.func_utils import pipe
+from app.models.category import Category
+from app.models.transaction import Transaction, TransactionKind
+from app.models.worker_job import JobKind, RecategorizeScope
+from app.open_ai_utils import ChatResult
+
+
+def stored(id: int, description: str) -> Transaction:
+    return Transaction(
+        id=id,
+        user_id=1,
+        description=description,
+        category_id=1,
+        date_of_transaction=datetime(2025, 4, 2),
+        amount=5.0,
+        kind=TransactionKind.withdrawal,
+        transaction_source_id=1,
+        archived=False,
+    )
+
+
+def test_scoped_recategorization_moves_the_affected_rows(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    rows = [stored(1, "BLUE BOTTLE COFFEE 0412"), stored(2, "COSTCO WHSE 0088")]
+    asked_about: list[str] = []
+
+    def make_chat_results(model, prompts, on_done=None):  # noqa: ARG001
+        results = []
+        for prompt in prompts:
+            batch = [
+                PartialTransaction.model_validate_json(line)
+                for line in prompt[1].content.splitlines()
+                if line.startswith("{")
+            ]
+            asked_about.extend(t.partialTransactionDescription for t in batch)
+            categorized = [
+                CategorizedTransaction(**t.model_dump(), category="Coffee")
+                for t in batch
+            ]
+            results.append(ChatResult(SimpleNamespace(transactions=categorized)))
+        return results
+
+    # both rows are still Groceries, the memo was cleared when Coffee was added
+    training = [LabeledDescription(row.description, 1) for row in rows]
+    for module in (recategorize_pipeline, categorizer):
+        monkeypatch.setattr(module, "load_training_samples", lambda *_: training)
+        monkeypatch.setattr(module, "queue_worker_status", MagicMock())
+    monkeypatch.setattr(categorizer, "load_memo", lambda *_: {})
+    monkeypatch.setattr(categorizer, "record_hits", MagicMock())
+    monkeypatch.setattr(categorizer, "remember", MagicMock())
+    monkeypatch.setattr(categorizer, "make_chat_results", make_chat_results)
+
+    session = MagicMock()
+    # the source's transactions, then the recategorized ones by id
+    session.query.return_value.filter.return_value.all.side_effect = [rows, rows[:1]]
+    process = InProcessJob(
+        session=session,
+        user=MagicMock(id=1),
+        batch_id="batch",
+        job=MagicMock(
+            kind=JobKind.plaid_recategorize,
+            scope=RecategorizeScope(new_category_ids=[2]),
+        ),
+        config=MagicMock(transaction_source_id=1),
+        transaction_source=MagicMock(id=1),
+        categories=[
+            Category(id=1, name="Groceries", archived=False),
+            Category(id=2, name="Coffee", archived=False),
+        ],
+    )
+
+    pipe(
+        process,
+        apply_existing_transactions,
+        categorize_extracted_transactions,
+        insert_recategorized_transactions,
+        final=lambda x: x,
+    )
+
+    assert asked_about == ["BLUE BOTTLE COFFEE 0412"]
+    assert [row.category_id for row in rows] == [2, 1]
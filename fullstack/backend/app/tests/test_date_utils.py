@@ -0,0 +1,76 @@
+from datetime import datetime
+
+import pytest
+
+from app.date_utils import DATE_FORMATS, date_parser, parse_date, parse_dates
+
+
+@pytest.mark.parametrize(
+    "value, date_format",
+    [
+        ("04/02/2025", "%m/%d/%Y"),
+        ("4/2/25", "%m/%d/%y"),
+        ("12/31/69", "%m/%d/%y"),
+        ("2025-04-02", "%Y-%m-%d"),
+        ("31/12/2024", "%d/%m/%Y"),
+        ("Apr 02, 2025", "%b %d, %Y"),
+        ("2 apr 2025", "%d %b %Y"),
+        ("2025-04-02T13:05:09", "%Y-%m-%dT%H:%M:%S"),
+        ("04/02", "%m/%d"),
+    ],
+)
+def test_reads_what_strptime_reads(value: str, date_format: str):
+    assert date_parser(date_format)(value) == datetime.strptime(value, date_format)
+
+
+@pytest.mark.parametrize(
+    "value, date_format",
+    [
+        ("02/30/2025", "%m/%d/%Y"),
+        ("13/02/2025", "%m/%d/%Y"),
+        ("2025-04-02", "%m/%d/%Y"),
+        ("Foo 02, 2025", "%b %d, %Y"),
+        ("", "%m/%d/%Y"),
+    ],
+)
+def test_rejects_what_strptime_rejects(value: str, date_format: str):
+    assert date_parser(date_format)(value) is None
+
+
+def test_parse_date_tries_each_format():
+    assert parse_date("2025-04-02") == datetime(2025, 4, 2)
+    assert parse_date("not a date") is None
+
+
+def test_column_format_is_inferred_once():
+    parsed = parse_dates(["2025-04-02", "", "2025-04-13"])
+
+    assert parsed.date_format == "%Y-%m-%d"
+    assert parsed.dates == [datetime(2025, 4, 2), None, datetime(2025, 4, 13)]
+    assert parsed.ambiguous == []
+
+
+def test_a_day_past_twelve_settles_the_column():
+    values = ["03/04/2025"] * 25 + ["25/04/2025"]
+
+    parsed = parse_dates(values)
+
+    # the sample alone would have read it month first
+    assert parsed.date_format == "%d/%m/%Y"
+    assert parsed.dates[0] == datetime(2025, 4, 3)
+    assert parsed.ambiguous == []
+
+
+def test_rows_another_format_reads_differently_are_flagged():
+    parsed = parse_dates(["03/04/2025", "05/05/2025", "12/01/2025"])
+
+    assert parsed.date_format == DATE_FORMATS[0]
+    assert parsed.dates[0] == datetime(2025, 3, 4)
+    assert parsed.ambiguous == [0, 2]
+
+
+def test_known_format_is_not_second_guessed():
+    parsed = parse_dates(["03/04/2025", "2025-04-05"], "%m/%d/%Y")
+
+    assert parsed.dates == [datetime(2025, 3, 4), None]
+    assert parsed.ambiguous == []
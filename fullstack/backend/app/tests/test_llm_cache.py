@@ -0,0 +1,68 @@
+import os
+import time
+
+import pytest
+from pydantic import BaseModel
+
+from app import llm_cache
+
+
+class Answer(BaseModel):
+    value: str
+
+
+class OtherAnswer(BaseModel):
+    other: int
+
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+@pytest.fixture(autouse=True)
+def cache_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("LLM_CACHE_MODE", "read_write")
+
+
+def test_key_covers_schema_messages_and_settings():
+    key = llm_cache.cache_key("m", Answer, MESSAGES, temperature=0.0)
+
+    assert key == llm_cache.cache_key("m", Answer, MESSAGES, temperature=0.0)
+    assert key != llm_cache.cache_key("m", OtherAnswer, MESSAGES, temperature=0.0)
+    assert key != llm_cache.cache_key("m", Answer, MESSAGES, temperature=0.5)
+    assert key != llm_cache.cache_key("m", Answer, [], temperature=0.0)
+
+
+def test_round_trip_and_expiry(monkeypatch):
+    key = llm_cache.cache_key("m", Answer, MESSAGES)
+    assert llm_cache.lookup(Answer, key) is None
+
+    llm_cache.store(key, Answer(value="hi"))
+    assert llm_cache.lookup(Answer, key) == Answer(value="hi")
+
+    monkeypatch.setenv("LLM_CACHE_TTL_DAYS", "0")
+    time.sleep(0.01)
+    assert llm_cache.lookup(Answer, key) is None
+
+
+def test_replay_serves_hits_and_fails_on_miss(monkeypatch):
+    key = llm_cache.cache_key("m", Answer, MESSAGES)
+    llm_cache.store(key, Answer(value="hi"))
+
+    monkeypatch.setenv("LLM_CACHE_MODE", "replay")
+    assert llm_cache.lookup(Answer, key) == Answer(value="hi")
+    with pytest.raises(llm_cache.LLMCacheMiss):
+        llm_cache.lookup(Answer, llm_cache.cache_key("m", Answer, []))
+
+
+def test_eviction_drops_least_recently_used(monkeypatch):
+    keys = [llm_cache.cache_key("m", Answer, [{"n": n}]) for n in range(3)]
+    for age, key in zip([300, 200, 100], keys, strict=True):
+        llm_cache.store(key, Answer(value="x" * 1000))
+        path = llm_cache._path(key)
+        os.utime(path, (time.time() - age, time.time() - age))
+
+    monkeypatch.setenv("LLM_CACHE_MAX_MB", str(2500 / 1024 / 1024))
+    llm_cache.evict()
+
+    assert [llm_cache._path(key).exists() for key in keys] == [False, True, True]
@@ -0,0 +1,222 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.async_pipelines.uploaded_file_pipeline import categorizer
+from app.async_pipelines.uploaded_file_pipeline.categorizer import (
+    CATEGORIZE_OUTPUT_TOKEN_BUDGET,
+    MAX_CATEGORIZE_BATCH_SIZE,
+    categorization_token_cost,
+    categorize_extracted_transactions,
+    generate_categorization_prefix,
+    generate_categorization_prompt,
+    make_categorization_batches,
+    missing_from_response,
+)
+from app.async_pipelines.uploaded_file_pipeline.local_types import (
+    CategorizedTransaction,
+    InProcessJob,
+    PartialTransaction,
+    Recategorization,
+    TransactionsWrapper,
+)
+from app.categorization.classifier import LabeledDescription
+from app.models.category import Category
+from app.models.worker_job import JobKind
+from app.open_ai_utils import ChatResult, Prompt
+
+
+def transaction(id: int | None, description: str) -> PartialTransaction:
+    return PartialTransaction(
+        partialTransactionId=id,
+        partialPlaidTransactionId=None,
+        partialTransactionDateOfTransaction="04/02/2025",
+        partialTransactionDescription=description,
+        partialTransactionKind="withdrawal",
+        partialTransactionAmount=10.0,
+    )
+
+
+def test_batches_share_a_byte_identical_prefix():
+    recats = [
+        Recategorization(
+            description="UBER *TRIP 1234",
+            previous_category="Misc",
+            overrided_category="Travel",
+        )
+    ]
+    prefix = generate_categorization_prefix(["Groceries", "Travel"], recats)
+
+    first = generate_categorization_prompt(prefix, [transaction(1, "UBER *TRIP")])
+    second = generate_categorization_prompt(
+        prefix, [transaction(2, "COSTCO")], batch_recategorizations=recats
+    )
+
+    assert first[0] == second[0]
+    assert "UBER *TRIP 1234: Misc changed to Travel" in first[0].content
+    # everything that varies comes after it
+    assert '"partialTransactionId":1' in first[1].content
+    assert second[1].content.startswith("Previous overwrites relevant")
+    assert second[1].content.endswith(transaction(2, "COSTCO").model_dump_json())
+
+
+def categorized(t: PartialTransaction, **changes: str) -> CategorizedTransaction:
+    return CategorizedTransaction(**{**t.model_dump(), **changes}, category="Groceries")
+
+
+def test_batches_fill_the_response_budget():
+    categories = ["Groceries", "Travel"]
+    short = [transaction(i, "COSTCO") for i in range(400)]
+    long = [transaction(i, "AMAZON MKTPLACE PMTS " * 12) for i in range(400)]
+
+    short_batches = make_categorization_batches(short, categories)
+    long_batches = make_categorization_batches(long, categories)
+
+    assert sum(map(len, short_batches)) == sum(map(len, long_batches)) == 400
+    assert MAX_CATEGORIZE_BATCH_SIZE >= len(short_batches[0]) > len(long_batches[0])
+    cost = categorization_token_cost(categories)
+    for batch in short_batches + long_batches:
+        assert sum(cost(t)[1] for t in batch) <= CATEGORIZE_OUTPUT_TOKEN_BUDGET
+
+
+def test_missing_transactions_are_found_by_content():
+    batch = [transaction(None, "COSTCO"), transaction(None, "COSTCO")]
+    batch += [transaction(None, "UBER *TRIP")]
+
+    assert missing_from_response(batch, [categorized(t) for t in batch]) == []
+    assert missing_from_response(batch, [categorized(batch[2])]) == batch[:2]
+    # reworded by the model, so it's the tail that is sent again
+    assert (
+        missing_from_response(
+            batch, [categorized(batch[0], partialTransactionDescription="Costco")]
+        )
+        == batch[1:]
+    )
+
+
+def prompted_transactions(prompt: Prompt) -> list[PartialTransaction]:
+    return [
+        PartialTransaction.model_validate_json(line)
+        for line in prompt[1].content.splitlines()
+        if line.startswith("{")
+    ]
+
+
+def categorize_with(
+    monkeypatch: pytest.MonkeyPatch,
+    transactions: list[PartialTransaction],
+    first_result: ChatResult,
+) -> tuple[list[CategorizedTransaction], list[int]]:
+    """Categorizes with a model that answers `first_result` and then everything."""
+    sizes: list[int] = []
+
+    def make_chat_results(model, prompts, on_done=None):  # noqa: ARG001
+        sizes.extend(len(prompted_transactions(prompt)) for prompt in prompts)
+        if len(sizes) == 1:
+            return [first_result]
+        return [
+            ChatResult(
+                SimpleNamespace(
+                    transactions=[categorized(t) for t in prompted_transactions(p)]
+                )
+            )
+            for p in prompts
+        ]
+
+    monkeypatch.setattr(categorizer, "make_chat_results", make_chat_results)
+    monkeypatch.setattr(categorizer, "queue_worker_status", MagicMock())
+    process = InProcessJob(
+        session=MagicMock(),
+        user=MagicMock(),
+        batch_id="batch",
+        categories=[Category(name="Groceries", archived=False)],
+        transactions=TransactionsWrapper(transactions=transactions),
+    )
+    result = categorize_extracted_transactions(process)
+    assert result.categorized_transactions is not None
+    return result.categorized_transactions, sizes
+
+
+def test_cut_off_batch_is_split(monkeypatch: pytest.MonkeyPatch):
+    batch = [transaction(i, f"SHOP {i}") for i in range(4)]
+
+    result, sizes = categorize_with(monkeypatch, batch, ChatResult(None, cut_off=True))
+
+    assert sizes == [4, 2, 2]
+    assert len(result) == 4
+
+
+def test_partial_response_resends_the_rest(monkeypatch: pytest.MonkeyPatch):
+    batch = [transaction(i, f"SHOP {i}") for i in range(4)]
+    partial = ChatResult(SimpleNamespace(transactions=[categorized(batch[0])]))
+
+    result, sizes = categorize_with(monkeypatch, batch, partial)
+
+    assert sizes == [4, 3]
+    assert len(result) == 4
+
+
+def test_failed_batch_is_not_split(monkeypatch: pytest.MonkeyPatch):
+    batch = [transaction(i, f"SHOP {i}") for i in range(4)]
+
+    result, sizes = categorize_with(monkeypatch, batch, ChatResult(None))
+
+    assert sizes == [4]
+    assert result == []
+
+
+@pytest.mark.parametrize(
+    ("kind", "asked"), [(JobKind.recategorize, 2), (JobKind.full_upload, 0)]
+)
+def test_recategorization_after_a_new_category_reaches_the_llm(
+    monkeypatch: pytest.MonkeyPatch, kind: JobKind, asked: int
+):
+    batch = [transaction(1, "BLUE BOTTLE COFFEE"), transaction(2, "BLUE BOTTLE CAFE")]
+    asked_about: list[PartialTransaction] = []
+
+    def make_chat_results(model, prompts, on_done=None):  # noqa: ARG001
+        asked_about.extend(t for p in prompts for t in prompted_transactions(p))
+        return [
+            ChatResult(
+                SimpleNamespace(
+                    transactions=[
+                        CategorizedTransaction(**t.model_dump(), category="Coffee")
+                        for t in prompted_transactions(p)
+                    ]
+                )
+            )
+            for p in prompts
+        ]
+
+    # creating Coffee cleared the memo, the transactions are still Groceries
+    monkeypatch.setattr(categorizer, "load_memo", lambda *_: {})
+    monkeypatch.setattr(categorizer, "record_hits", MagicMock())
+    monkeypatch.setattr(categorizer, "remember", MagicMock())
+    monkeypatch.setattr(
+        categorizer,
+        "load_training_samples",
+        lambda *_: [
+            LabeledDescription(t.partialTransactionDescription, 1) for t in batch
+        ],
+    )
+    monkeypatch.setattr(categorizer, "make_chat_results", make_chat_results)
+    monkeypatch.setattr(categorizer, "queue_worker_status", MagicMock())
+    process = InProcessJob(
+        session=MagicMock(),
+        user=MagicMock(),
+        batch_id="batch",
+        job=MagicMock(kind=kind),
+        transaction_source=MagicMock(id=1),
+        categories=[
+            Category(id=1, name="Groceries", archived=False),
+            Category(id=2, name="Coffee", archived=False),
+        ],
+        transactions=TransactionsWrapper(transactions=batch),
+    )
+
+    result = categorize_extracted_transactions(process)
+
+    assert len(asked_about) == asked
+    assert result.categorized_transactions is not None
+    assert len(result.categorized_transactions) == 2
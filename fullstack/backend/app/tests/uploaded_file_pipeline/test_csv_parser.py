@@ -0,0 +1,89 @@
+from app.async_pipelines.uploaded_file_pipeline.csv_parser import (
+    header_signature,
+    infer_mapping_from_header,
+    parse_amount,
+    parse_rows,
+    read_rows,
+)
+
+SIGNED_AMOUNT = """Transaction Date,Post Date,Description,Category,Type,Amount
+04/02/2025,04/03/2025,"STARBUCKS STORE 1234, SEATTLE",Food & Drink,Sale,-5.75
+04/03/2025,04/04/2025,PAYMENT THANK YOU,,Payment,250.00
+04/05/2025,04/06/2025,SAFEWAY #1441,Groceries,Sale,-82.10
+"""
+
+SPLIT_COLUMNS = """Date,Details,Money Out,Money In,Balance
+2025-04-01,Rent,"1,200.00",,3000.00
+2025-04-02,Salary,,"4,000.00",7000.00
+2025-04-03,Coffee,3.50,,6996.50
+"""
+
+
+def test_signed_amount_layout_is_inferred_from_header():
+    rows = read_rows(SIGNED_AMOUNT)
+    mapping = infer_mapping_from_header(rows)
+
+    assert mapping is not None
+    assert (mapping.date, mapping.description, mapping.amount, mapping.kind) == (
+        0,
+        2,
+        5,
+        4,
+    )
+    assert mapping.negative_is_withdrawal
+
+    transactions = parse_rows(rows, mapping)
+    assert transactions is not None
+    assert [t.partialTransactionKind for t in transactions] == [
+        "withdrawal",
+        "deposit",
+        "withdrawal",
+    ]
+    assert transactions[0].partialTransactionDescription == (
+        "STARBUCKS STORE 1234, SEATTLE"
+    )
+    assert transactions[0].partialTransactionAmount == 5.75
+    assert transactions[0].partialTransactionDateOfTransaction == "04/02/2025"
+
+
+def test_split_debit_credit_layout():
+    rows = read_rows(SPLIT_COLUMNS)
+    mapping = infer_mapping_from_header(rows)
+
+    assert mapping is not None
+    assert mapping.amount is None
+    assert mapping.date_format == "%Y-%m-%d"
+
+    transactions = parse_rows(rows, mapping)
+    assert transactions is not None
+    assert [
+        (t.partialTransactionKind, t.partialTransactionAmount) for t in transactions
+    ] == [
+        ("withdrawal", 1200.0),
+        ("deposit", 4000.0),
+        ("withdrawal", 3.5),
+    ]
+
+
+def test_mapping_that_does_not_fit_is_rejected():
+    rows = read_rows(SIGNED_AMOUNT)
+    mapping = infer_mapping_from_header(rows)
+    assert mapping is not None
+
+    other_rows = read_rows(SPLIT_COLUMNS)
+    assert parse_rows(other_rows, mapping) is None
+
+
+def test_header_signature_ignores_case_and_spacing():
+    assert header_signature([["Date", "Description ", "AMOUNT"]]) == (
+        "date|description|amount"
+    )
+    assert header_signature([["04/02/2025", "x", "1"]]) == "columns:3"
+
+
+def test_parse_amount_formats():
+    assert parse_amount("$1,234.50") == 1234.5
+    assert parse_amount("(12.00)") == -12.0
+    assert parse_amount("12.00-") == -12.0
+    assert parse_amount("") is None
+    assert parse_amount("n/a") is None
@@ -0,0 +1,68 @@
+from collections import Counter
+from datetime import datetime
+
+from app.async_pipelines.uploaded_file_pipeline.known_transactions import (
+    partial_fingerprints,
+    unseen_transactions,
+)
+from app.async_pipelines.uploaded_file_pipeline.local_types import PartialTransaction
+from app.models.transaction import TransactionKind, transaction_fingerprint
+
+
+def partial_fingerprint(transaction: PartialTransaction) -> str:
+    return partial_fingerprints([transaction])[0]
+
+
+def transaction(
+    description: str, amount: float = 4.5, date: str = "04/02/2025"
+) -> PartialTransaction:
+    return PartialTransaction(
+        partialTransactionId=None,
+        partialPlaidTransactionId=None,
+        partialTransactionDateOfTransaction=date,
+        partialTransactionDescription=description,
+        partialTransactionKind="withdrawal",
+        partialTransactionAmount=amount,
+    )
+
+
+def test_fingerprint_matches_the_stored_transaction():
+    parsed = transaction("Starbucks  #1234, Seattle", amount=4.5)
+
+    # the amount column keeps whole units, rounded half up
+    assert partial_fingerprint(parsed) == transaction_fingerprint(
+        datetime(2025, 4, 2, 13, 30),
+        5,
+        "STARBUCKS #1234 SEATTLE",
+        TransactionKind.withdrawal,
+    )
+    assert (
+        partial_fingerprint(parsed) == "2025-04-02|5|withdrawal|starbucks 1234 seattle"
+    )
+
+
+def test_fingerprint_keeps_check_numbers_apart():
+    assert partial_fingerprint(transaction("CHECK 101")) != partial_fingerprint(
+        transaction("CHECK 102")
+    )
+
+
+def test_each_known_copy_skips_one_parsed_transaction():
+    coffee = transaction("STARBUCKS")
+    known = Counter({partial_fingerprint(coffee): 1})
+
+    parsed = [coffee, transaction("STARBUCKS"), transaction("COSTCO", amount=80)]
+
+    unseen = unseen_transactions(parsed, partial_fingerprints(parsed), known)
+
+    assert [t.partialTransactionDescription for t in unseen] == ["STARBUCKS", "COSTCO"]
+    # the caller's counts are left alone
+    assert known[partial_fingerprint(coffee)] == 1
+
+
+def test_nothing_known_keeps_everything():
+    parsed = [transaction("STARBUCKS"), transaction("STARBUCKS")]
+
+    assert (
+        unseen_transactions(parsed, partial_fingerprints(parsed), Counter()) == parsed
+    )
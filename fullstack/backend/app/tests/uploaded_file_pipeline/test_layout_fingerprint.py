@@ -0,0 +1,134 @@
+from app.async_pipelines.uploaded_file_pipeline.layout_fingerprint import (
+    ConfigMatcher,
+    layout_fingerprint,
+    merge_fingerprints,
+)
+from app.models.upload_configuration import UploadConfiguration
+
+APRIL = """ACME BANK                                   Statement Period April 1, 2025 - April 30, 2025
+Everyday Checking                           Account ending 1234
+Customer Service 1-800-555-0100
+
+TRANSACTION DETAIL
+Date     Description                          Withdrawals      Deposits        Balance
+04/01    Beginning Balance                                                     1,000.00
+04/02    STARBUCKS STORE 1234                       5.75                         994.25
+04/03    PAYROLL ACME CORP                                     2,000.00        2,994.25
+"""
+
+MAY = APRIL.replace("April", "May").replace("04/", "05/")
+SAVINGS = APRIL.replace("Everyday Checking", "Savings").replace("1234", "9876")
+OTHER_BANK = """GLOBEX CREDIT UNION
+Visa Signature Card   XXXX-XXXX-XXXX-5555
+Payment due date 05/25/2025
+Posting  Merchant                   Amount
+04/02    SHELL OIL                   40.00
+"""
+
+
+def config(id: int, regex: str, content: str | None = None) -> UploadConfiguration:
+    return UploadConfiguration(
+        id=id,
+        filename_regex=regex,
+        transaction_source_id=id,
+        user_id=1,
+        layout_fingerprint=layout_fingerprint(content, "statement.pdf")
+        if content
+        else None,
+    )
+
+
+def test_fingerprint_keeps_header_words_and_account_masks():
+    fingerprint = layout_fingerprint(APRIL, "statement.pdf")
+
+    assert fingerprint.account_masks == ["1234"]
+    assert {"acme", "bank", "checking", "withdrawals", "deposits"} <= set(
+        fingerprint.tokens
+    )
+    # months and transaction rows change from statement to statement
+    assert "april" not in fingerprint.tokens
+    assert "starbucks" not in fingerprint.tokens
+
+
+def test_csv_fingerprint_is_its_header():
+    content = "Date,Description,Amount\n04/02/2025,STARBUCKS,-5.75\n"
+
+    assert layout_fingerprint(content, "export.csv").tokens == [
+        "amount",
+        "date",
+        "description",
+    ]
+
+
+def test_renamed_download_matches_by_layout():
+    matcher = ConfigMatcher([config(1, "acme_checking"), config(2, "globex")])
+    matcher.add(config(1, "acme_checking", APRIL))
+    matcher.add(config(2, "globex", OTHER_BANK))
+
+    seen = layout_fingerprint(MAY, "Download (3).pdf")
+
+    assert matcher.match("Download (3).pdf", seen) == 1
+
+
+def test_account_number_tells_same_bank_accounts_apart():
+    matcher = ConfigMatcher([config(1, "acme", APRIL), config(2, "acme", SAVINGS)])
+
+    assert matcher.match("x.pdf", layout_fingerprint(MAY, "x.pdf")) == 1
+    assert matcher.match("x.pdf", layout_fingerprint(SAVINGS, "x.pdf")) == 2
+
+
+def test_a_new_account_at_a_known_bank_is_left_to_the_llm():
+    matcher = ConfigMatcher([config(1, "acme_checking", APRIL)])
+    brokerage = APRIL.replace("1234", "4321")
+
+    assert matcher.match("x.pdf", layout_fingerprint(brokerage, "x.pdf")) is None
+
+
+def test_lookalike_layouts_without_account_numbers_fall_back_to_filename():
+    unmasked = APRIL.replace("Account ending 1234", "")
+    matcher = ConfigMatcher(
+        [config(1, "checking", unmasked), config(2, "savings", unmasked)]
+    )
+    seen = layout_fingerprint(unmasked, "savings.pdf")
+
+    assert matcher.match("savings.pdf", seen) == 2
+    assert matcher.match("renamed.pdf", seen) is None
+
+
+def test_a_config_without_a_layout_keeps_its_files():
+    unmasked = APRIL.replace("Account ending 1234", "")
+    matcher = ConfigMatcher([config(1, "checking", unmasked), config(2, "savings")])
+
+    assert matcher.match("savings.pdf", layout_fingerprint(unmasked, "x.pdf")) == 2
+    # unless the statement shows an account the other config has seen
+    matcher.add(config(1, "checking", APRIL))
+    assert matcher.match("savings.pdf", layout_fingerprint(MAY, "x.pdf")) == 1
+
+
+def test_catch_all_config_doesnt_take_uploads():
+    # a Plaid account's placeholder, it never learns a layout
+    placeholder = config(2, ".*")
+    matcher = ConfigMatcher([config(1, "chase_.*", APRIL), placeholder])
+    unmasked = layout_fingerprint(APRIL.replace("Account ending 1234", ""), "x.pdf")
+
+    assert matcher.match("chase_2024.pdf", unmasked) == 1
+    assert matcher.match("other.pdf", layout_fingerprint(OTHER_BANK, "x.pdf")) is None
+
+
+def test_bad_filename_regex_is_skipped():
+    matcher = ConfigMatcher([config(1, "acme[", None), config(2, "acme", None)])
+
+    assert matcher.by_filename("acme.pdf") == 2
+
+
+def test_merge_keeps_stable_words_and_all_masks():
+    april = layout_fingerprint(APRIL, "a.pdf")
+    reissued = layout_fingerprint(
+        MAY.replace("Customer Service", "").replace("1234", "5678"), "b.pdf"
+    )
+
+    merged = merge_fingerprints(april, reissued)
+
+    assert "customer" not in merged.tokens
+    assert "acme" in merged.tokens
+    assert merged.account_masks == ["1234", "5678"]
@@ -0,0 +1,162 @@
+from app.async_pipelines.uploaded_file_pipeline.local_types import PartialTransaction
+from app.async_pipelines.uploaded_file_pipeline.pdf_template import (
+    TemplateRow,
+    _resolve_year,
+    derive_template,
+    parse_with_template,
+    split_cells,
+)
+from app.async_pipelines.uploaded_file_pipeline.statement_text import (
+    transaction_region,
+)
+
+APRIL = """ACME BANK                                   Statement Period 04/01/2025 - 04/30/2025
+Account ending 1234
+
+TRANSACTION DETAIL
+Date     Description                          Withdrawals      Deposits        Balance
+04/01    Beginning Balance                                                     1,000.00
+04/02    STARBUCKS STORE 1234                       5.75                         994.25
+04/03    PAYROLL ACME CORP                                     2,000.00        2,994.25
+04/05    SAFEWAY #1441                             82.10                       2,912.15
+04/09    RENT PAYMENT                           1,200.00                       1,712.15
+04/12    VENMO CASHOUT                                            45.00        1,757.15
+04/20    SHELL OIL 5521                            40.00                       1,717.15
+TOTAL FEES
+Thank you for banking with us
+"""
+
+MAY = """ACME BANK                                   Statement Period 05/01/2025 - 05/31/2025
+Account ending 1234
+
+TRANSACTION DETAIL
+Date     Description                          Withdrawals      Deposits        Balance
+05/01    Beginning Balance                                                     1,717.15
+05/03    PAYROLL ACME CORP                                     2,000.00        3,717.15
+05/04    TRADER JOES #552                          61.20                       3,655.95
+05/08    RENT PAYMENT                           1,200.00                       2,455.95
+05/15    CITY WATER                                33.10                       2,422.85
+TOTAL FEES
+"""
+
+
+def transaction(date: str, description: str, kind: str, amount: float):
+    return PartialTransaction(
+        partialTransactionId=None,
+        partialPlaidTransactionId=None,
+        partialTransactionDateOfTransaction=date,
+        partialTransactionDescription=description,
+        partialTransactionKind=kind,  # type: ignore[arg-type]
+        partialTransactionAmount=amount,
+    )
+
+
+LLM_APRIL = [
+    transaction("04/02/2025", "STARBUCKS STORE 1234", "withdrawal", 5.75),
+    transaction("04/03/2025", "PAYROLL ACME CORP", "deposit", 2000.0),
+    transaction("04/05/2025", "SAFEWAY #1441", "withdrawal", 82.10),
+    transaction("04/09/2025", "RENT PAYMENT", "withdrawal", 1200.0),
+    transaction("04/12/2025", "VENMO CASHOUT", "deposit", 45.0),
+    transaction("04/20/2025", "SHELL OIL 5521", "withdrawal", 40.0),
+]
+
+
+def region(content: str) -> str:
+    return transaction_region(content, "TRANSACTION DETAIL", "TOTAL FEES")
+
+
+def test_cells_split_on_column_gaps():
+    cells = split_cells("04/02 STARBUCKS STORE 1234        5.75     994.25")
+
+    assert [cell.kind for cell in cells] == ["date:%m/%d", "text", "amount", "amount"]
+
+
+def test_template_learned_from_one_statement_parses_the_next():
+    template = derive_template(region(APRIL), LLM_APRIL)
+
+    assert template is not None
+    assert template.lines[0].kind_rule == "position"
+    # the opening balance row matches the layout but isn't a transaction
+    assert template.skip_descriptions == ["beginning balance"]
+
+    parsed = parse_with_template(region(MAY), template, MAY)
+
+    assert parsed is not None
+    assert [
+        (
+            t.partialTransactionDateOfTransaction,
+            t.partialTransactionDescription,
+            t.partialTransactionKind,
+            t.partialTransactionAmount,
+        )
+        for t in parsed
+    ] == [
+        ("05/03/2025", "PAYROLL ACME CORP", "deposit", 2000.0),
+        ("05/04/2025", "TRADER JOES #552", "withdrawal", 61.2),
+        ("05/08/2025", "RENT PAYMENT", "withdrawal", 1200.0),
+        ("05/15/2025", "CITY WATER", "withdrawal", 33.1),
+    ]
+
+
+def test_template_is_not_kept_when_it_disagrees_with_the_llm():
+    # the LLM saw a transaction on a line the template can't explain
+    extra = [*LLM_APRIL, transaction("04/25/2025", "WIRE FEE", "withdrawal", 15.0)]
+
+    assert derive_template(region(APRIL), extra) is None
+
+
+def test_changed_layout_falls_back():
+    template = derive_template(region(APRIL), LLM_APRIL)
+    assert template is not None
+
+    changed = "\n".join(
+        line.replace("    ", " | ") for line in region(MAY).splitlines()
+    )
+
+    assert parse_with_template(changed, template, MAY) is None
+
+
+def test_running_balance_must_add_up():
+    template = derive_template(region(APRIL), LLM_APRIL)
+    assert template is not None
+
+    broken = region(MAY).replace("3,717.15", "1,234.00").replace("3,655.95", "9,999.99")
+    broken = broken.replace("2,455.95", "5,555.55").replace("2,422.85", "7,777.77")
+
+    assert parse_with_template(broken, template, MAY) is None
+
+
+def row(month: int, day: int) -> TemplateRow:
+    return TemplateRow(
+        month=month,
+        day=day,
+        year=None,
+        description="COFFEE",
+        amount=5.0,
+        kind="withdrawal",
+        balance=None,
+    )
+
+
+def test_january_due_date_keeps_rows_in_the_statement_year():
+    statement = """ACME CARD     Statement Period 11/16/2025 - 12/15/2025
+Payment Due Date 01/10/2026   Minimum Payment Due 35.00
+"""
+
+    assert _resolve_year([row(11, 20), row(12, 1)], statement) == [2025, 2025]
+
+
+def test_period_over_new_year_splits_rows():
+    statement = "Statement Period December 16, 2025 through January 15, 2026"
+
+    assert _resolve_year([row(12, 20), row(1, 5)], statement) == [2025, 2026]
+
+
+def test_without_a_period_the_latest_date_anchors_the_rows():
+    statement = "Payment Due Date 01/10/2026\nMember since 03/01/2011"
+
+    assert _resolve_year([row(12, 1)], statement) == [2025]
+
+
+def test_no_dates_on_the_statement_leaves_it_to_the_llm():
+    assert _resolve_year([row(12, 1)], "no dates here") is None
@@ -0,0 +1,63 @@
+from app.async_pipelines.uploaded_file_pipeline.statement_text import (
+    chunk_lines,
+    count_tokens,
+    prepare_statement_text,
+    transaction_region,
+)
+
+STATEMENT = """ACME BANK                          Page 1 of 2
+Account summary                    Beginning balance        1,000.00
+Transaction history
+04/02    STARBUCKS STORE 1234              5.75
+04/03    PAYROLL ACME CORP             2,000.00
+Questions? Call 1-800-555-0100
+\fACME BANK                          Page 2 of 2
+04/05    SAFEWAY #1441                    82.10
+04/05    SAFEWAY #1441                    82.10
+Questions? Call 1-800-555-0100
+Ending balance                                  2,830.30
+Interest disclosures
+"""
+
+
+def test_region_falls_back_when_keywords_are_missing():
+    assert transaction_region(STATEMENT, "no such heading", None) == STATEMENT
+    # an end keyword only found before the start is ignored
+    assert (
+        transaction_region(STATEMENT, "Ending balance", "Transaction history")
+        == (STATEMENT[STATEMENT.index("Ending balance") :])
+    )
+    assert (
+        transaction_region(STATEMENT, "transaction history", "ending balance")
+        == (
+            STATEMENT[
+                STATEMENT.index("Transaction history") : STATEMENT.index("Ending")
+            ]
+        )
+    )
+
+
+def test_page_furniture_and_padding_are_dropped():
+    lines = prepare_statement_text(STATEMENT, "Transaction history", "Ending balance")
+
+    assert lines == [
+        "Transaction history",
+        "04/02  STARBUCKS STORE 1234  5.75",
+        "04/03  PAYROLL ACME CORP  2,000.00",
+        "Questions? Call 1-800-555-0100",
+        "ACME BANK  Page 2 of 2",
+        # identical transactions are never deduplicated here
+        "04/05  SAFEWAY #1441  82.10",
+        "04/05  SAFEWAY #1441  82.10",
+    ]
+
+
+def test_chunks_stay_within_budget():
+    lines = [f"04/{day:02d}  MERCHANT NUMBER {day}  {day}.00" for day in range(1, 29)]
+    budget = 40
+
+    chunks = chunk_lines(lines, budget)
+
+    assert "\n".join(chunks).splitlines() == lines
+    assert all(count_tokens(chunk) <= budget for chunk in chunks)
+    assert len(chunks) > 1
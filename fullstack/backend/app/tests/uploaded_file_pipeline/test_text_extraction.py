@@ -0,0 +1,74 @@
+import asyncio
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.async_pipelines.uploaded_file_pipeline import text_extraction
+from app.async_pipelines.uploaded_file_pipeline.local_types import (
+    InProcessJob,
+    PdfParseException,
+)
+from app.async_pipelines.uploaded_file_pipeline.text_extraction import (
+    extract_pending_text,
+    extract_raw_text,
+    is_supported_file,
+    page_ranges,
+)
+from app.models.uploaded_pdf import UploadedFileContent
+from app.models.worker_job import JobStatus
+
+
+def test_long_statements_split_into_page_ranges():
+    assert page_ranges(1) == [(1, 1)]
+    assert page_ranges(10) == [(1, 10)]
+    assert page_ranges(23) == [(1, 10), (11, 20), (21, 23)]
+
+
+def test_csv_is_normalized_in_the_pool(tmp_path: Path):
+    path = tmp_path / "upload"
+    path.write_bytes(
+        '\ufeffDate, Description,Amount\n04/02/2025,"STARBUCKS, #12",5.75\n'.encode()
+    )
+
+    text = asyncio.run(extract_raw_text(str(path), "Statement.CSV"))
+
+    assert text == 'Date, Description,Amount\n04/02/2025,"STARBUCKS, #12",5.75'
+    assert is_supported_file("march.pdf")
+    assert not is_supported_file("march.xlsx")
+
+
+def test_raw_content_is_stored_compressed():
+    column = UploadedFileContent.__table__.c.content.type
+    text = "04/02    STARBUCKS STORE 1234              5.75\n" * 200
+
+    stored = column.process_bind_param(text, None)
+
+    assert len(stored) < len(text) / 10
+    assert column.process_result_value(stored, None) == text
+
+
+def test_unreadable_file_fails_only_its_job(monkeypatch: pytest.MonkeyPatch):
+    async def extract_file_text(process: InProcessJob) -> None:
+        assert process.file, "must have"
+        if process.file.filename == "corrupt.pdf":
+            raise PdfParseException("Failed to extract text from PDF")
+
+    monkeypatch.setattr(text_extraction, "extract_file_text", extract_file_text)
+    monkeypatch.setattr(text_extraction, "log_completed", MagicMock())
+    jobs = [
+        InProcessJob(
+            session=MagicMock(),
+            user=MagicMock(),
+            batch_id=filename,
+            file=MagicMock(filename=filename),
+            job=MagicMock(status=JobStatus.processing),
+        )
+        for filename in ["march.pdf", "corrupt.pdf", "april.pdf"]
+    ]
+
+    extracted = asyncio.run(extract_pending_text(jobs))
+
+    assert extracted == [jobs[0], jobs[2]]
+    assert jobs[1].job and jobs[1].job.status == JobStatus.failed
+    assert jobs[0].job and jobs[0].job.status == JobStatus.processing
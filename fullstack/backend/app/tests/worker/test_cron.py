@@ -0,0 +1,165 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from app.models.cron_state import CronState
+from app.worker.cron import (
+    CronEntry,
+    CronScheduler,
+    Frequency,
+    checkpoint_is_stale,
+    initial_next_run,
+)
+
+
+def utc(*args: int) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def noop() -> None:
+    return None
+
+
+def test_interval_next_run_is_relative():
+    now = utc(2025, 6, 10, 13, 37, 5)
+    assert Frequency.every_20_seconds.next_run_after(now) == now + timedelta(seconds=20)
+    assert Frequency.every_hour.next_run_after(now) == now + timedelta(hours=1)
+
+
+def test_daily_next_run():
+    assert Frequency.every_day_at_8am.next_run_after(utc(2025, 6, 10, 7, 59)) == utc(
+        2025, 6, 10, 8
+    )
+    assert Frequency.every_day_at_8am.next_run_after(utc(2025, 6, 10, 8)) == utc(
+        2025, 6, 11, 8
+    )
+
+
+def test_weekly_next_run_lands_on_monday():
+    # 2025-06-10 is a Tuesday
+    assert Frequency.every_week_monday_at_8am.next_run_after(
+        utc(2025, 6, 10, 12)
+    ) == utc(2025, 6, 16, 8)
+    assert Frequency.every_week_monday_at_8am.next_run_after(
+        utc(2025, 6, 16, 7)
+    ) == utc(2025, 6, 16, 8)
+
+
+def test_monthly_next_run_rolls_over_year():
+    assert Frequency.every_month_1st_at_8am.next_run_after(utc(2025, 12, 1, 9)) == utc(
+        2026, 1, 1, 8
+    )
+    assert Frequency.every_month_1st_at_8am.next_run_after(utc(2025, 2, 14)) == utc(
+        2025, 3, 1, 8
+    )
+
+
+def test_initial_next_run_without_state():
+    now = utc(2025, 6, 10, 12)
+    assert initial_next_run(Frequency.every_minute, None, now) == now
+    assert initial_next_run(Frequency.every_day_at_8am, None, now) == utc(
+        2025, 6, 11, 8
+    )
+
+
+def test_missed_window_is_caught_up_once():
+    now = utc(2025, 6, 12, 12)
+    state = CronState(
+        job_name="fire_daily_event",
+        last_run=utc(2025, 6, 9, 8),
+        next_run=datetime(2025, 6, 10, 8),
+    )
+    next_run = initial_next_run(Frequency.every_day_at_8am, state, now)
+    assert next_run == utc(2025, 6, 10, 8)
+
+    scheduler = CronScheduler(session_factory=None, lock=None, crons={})  # type: ignore[arg-type]
+    scheduler.entries = [
+        CronEntry(
+            name="fire_daily_event",
+            frequency=Frequency.every_day_at_8am,
+            job=noop,
+            next_run=next_run,
+        ),
+        CronEntry(
+            name="heartbeat",
+            frequency=Frequency.every_hour,
+            job=noop,
+            next_run=now + timedelta(minutes=10),
+        ),
+    ]
+    assert [entry.name for entry in scheduler.due(now)] == ["fire_daily_event"]
+
+    scheduler.entries[0].next_run = Frequency.every_day_at_8am.next_run_after(now)
+    assert scheduler.due(now) == []
+    assert scheduler.seconds_until_next(now) == 60
+
+
+def test_wake_makes_the_woken_jobs_due():
+    def upload_file_worker() -> None:
+        return None
+
+    wake = threading.Event()
+    scheduler = CronScheduler(
+        session_factory=None,  # type: ignore[arg-type]
+        lock=None,  # type: ignore[arg-type]
+        crons={},
+        wake=wake,
+        wake_jobs=[upload_file_worker],
+    )
+    later = datetime.now(timezone.utc) + timedelta(seconds=20)
+    scheduler.entries = [
+        CronEntry(
+            "upload_file_worker", Frequency.every_20_seconds, upload_file_worker, later
+        ),
+        CronEntry("heartbeat", Frequency.every_hour, noop, later),
+    ]
+
+    wake.set()
+    started = time.monotonic()
+    scheduler.sleep(30)
+
+    assert time.monotonic() - started < 1
+    assert not wake.is_set()
+    assert [entry.name for entry in scheduler.due(datetime.now(timezone.utc))] == [
+        "upload_file_worker"
+    ]
+
+
+def test_checkpoint_only_resumes_its_own_window():
+    state = CronState(
+        job_name="fire_daily_event",
+        last_run=utc(2025, 6, 9, 8),
+        next_run=utc(2025, 6, 10, 8),
+        checkpoint=40,
+    )
+    daily = Frequency.every_day_at_8am
+
+    assert not checkpoint_is_stale(daily, state, utc(2025, 6, 10, 9))
+    assert checkpoint_is_stale(daily, state, utc(2025, 6, 11, 9))
+
+
+def test_failed_run_clears_its_checkpoint():
+    def fire_daily_event() -> None:
+        raise RuntimeError("database went away")
+
+    state = CronState(
+        job_name="fire_daily_event",
+        last_run=utc(2025, 6, 9, 8),
+        next_run=utc(2025, 6, 10, 8),
+        checkpoint=40,
+    )
+    session = MagicMock()
+    session.query.return_value.filter.return_value.one_or_none.return_value = state
+    session_factory = MagicMock()
+    session_factory.return_value.__enter__.return_value = session
+    scheduler = CronScheduler(session_factory, lock=None, crons={})  # type: ignore[arg-type]
+    entry = CronEntry(
+        "fire_daily_event", Frequency.every_day_at_8am, fire_daily_event, state.next_run
+    )
+
+    scheduler.run(entry)
+
+    assert entry.next_run > utc(2025, 6, 10, 8)
+    assert state.next_run == entry.next_run
+    assert state.checkpoint is None
@@ -0,0 +1,36 @@
+from unittest.mock import MagicMock
+
+from app.models.worker_job import JobKind
+from app.worker.enqueue_job import enqueue_or_reset_job, enqueue_recategorization
+
+
+def notified_before_commit(session: MagicMock) -> bool:
+    calls = [
+        "notify" if name == "execute" and str(args[0]).startswith("NOTIFY") else name
+        for name, args, _ in session.mock_calls
+        if name in ("execute", "commit")
+    ]
+    return "notify" in calls and calls[calls.index("notify") + 1 :][:1] == ["commit"]
+
+
+def test_reprocessing_a_file_wakes_the_worker():
+    for existing in (None, MagicMock(status="completed")):
+        session = MagicMock()
+        session.query.return_value.filter.return_value.one_or_none.return_value = (
+            existing
+        )
+
+        enqueue_or_reset_job(session, 1, 7, JobKind.recategorize)
+
+        assert notified_before_commit(session)
+
+
+def test_recategorizing_a_source_wakes_the_worker():
+    session = MagicMock()
+    session.query.return_value.filter.return_value.first.return_value = MagicMock(id=3)
+    pending = session.query.return_value.filter.return_value.with_for_update
+    pending.return_value.one_or_none.return_value = None
+
+    enqueue_recategorization(session, 1, 2)
+
+    assert notified_before_commit(session)
@@ -0,0 +1,39 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from app.models.user import UserId
+from app.worker.listener import drain_notifies
+from app.worker.status_stream import StatusHub
+from app.worker.wakeup import JobWakeup
+
+
+def test_drain_returns_and_clears_the_payloads():
+    connection = MagicMock()
+    connection.notifies = [SimpleNamespace(payload="1"), SimpleNamespace(payload="")]
+
+    assert drain_notifies(connection) == ["1", ""]
+    connection.poll.assert_called_once()
+    assert connection.notifies == []
+
+
+def test_job_notification_sets_the_wakeup_event():
+    wakeup = JobWakeup("postgresql://unused")
+
+    wakeup.listener.on_notify([""])
+
+    assert wakeup.event.is_set()
+
+
+def test_status_notification_wakes_the_users_streams():
+    hub = StatusHub("postgresql://unused")
+    hub._listener = MagicMock()  # don't connect
+
+    async def notified() -> list[int]:
+        queue = hub.subscribe(UserId(1))
+        other = hub.subscribe(UserId(2))
+        hub._on_notify(["1", "1"])
+        await asyncio.sleep(0)
+        return [queue.qsize(), other.qsize()]
+
+    assert asyncio.run(notified()) == [1, 0]
@@ -0,0 +1,93 @@
+import asyncio
+from unittest.mock import MagicMock
+
+from app.models.llm_call_log import LLMStage
+from app.models.user import UserId
+from app.models.worker_job import JobKind, WorkerJobId
+from app.worker.llm_calls import (
+    LLMCall,
+    LLMCallContext,
+    LLMCallWriter,
+    current_llm_context,
+    use_llm_context,
+)
+
+CONTEXT = LLMCallContext(
+    user_id=UserId(1),
+    stage=LLMStage.parse,
+    job_id=WorkerJobId(7),
+    job_kind=JobKind.full_upload,
+    batch_id="batch",
+)
+
+
+def make_call(latency_ms: float = 10.0) -> LLMCall:
+    return LLMCall(model="m", latency_ms=latency_ms, success=True, prompt_tokens=5)
+
+
+def test_calls_outside_a_stage_are_not_recorded():
+    session = MagicMock()
+    writer = LLMCallWriter(session_factory=lambda _: session)
+
+    writer.record(make_call())
+    writer.flush()
+
+    session.execute.assert_not_called()
+
+
+def test_flush_writes_the_stage_and_job_of_each_call():
+    sessions: dict[UserId, MagicMock] = {}
+    writer = LLMCallWriter(
+        session_factory=lambda user_id: sessions.setdefault(user_id, MagicMock())
+    )
+
+    with use_llm_context(CONTEXT):
+        writer.record(make_call())
+    with use_llm_context(LLMCallContext(user_id=UserId(2), stage=LLMStage.categorize)):
+        writer.record(make_call())
+        writer.record(make_call())
+    writer.flush()
+
+    first = sessions[UserId(1)].execute.call_args.args[1]
+    assert first == [
+        {
+            "user_id": 1,
+            "job_id": 7,
+            "job_kind": JobKind.full_upload,
+            "batch_id": "batch",
+            "stage": LLMStage.parse,
+            "model": "m",
+            "prompt_tokens": 5,
+            "completion_tokens": 0,
+            "cached_tokens": 0,
+            "latency_ms": 10.0,
+            "retries": 0,
+            "cache_hit": False,
+            "success": True,
+        }
+    ]
+    assert len(sessions[UserId(2)].execute.call_args.args[1]) == 2
+
+
+def test_context_carries_into_tasks_started_under_it():
+    async def gather() -> list[LLMCallContext | None]:
+        async def read() -> LLMCallContext | None:
+            return current_llm_context()
+
+        with use_llm_context(CONTEXT):
+            return await asyncio.gather(read(), read())
+
+    assert asyncio.run(gather()) == [CONTEXT, CONTEXT]
+    assert current_llm_context() is None
+
+
+def test_writer_flushes_once_the_buffer_is_full():
+    session = MagicMock()
+    writer = LLMCallWriter(session_factory=lambda _: session, flush_at=2)
+
+    with use_llm_context(CONTEXT):
+        writer.record(make_call())
+        session.execute.assert_not_called()
+        writer.record(make_call())
+
+    assert len(session.execute.call_args.args[1]) == 2
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from app.models.user import UserId
+from app.models.worker_status import ProcessingState
+from app.worker.status import PendingStatus, StatusWriter, coalesce
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def make_status(
+    status: ProcessingState,
+    info: str,
+    offset: int,
+    batch_id: str = "batch",
+    user_id: int = 1,
+) -> PendingStatus:
+    moment = START + timedelta(seconds=offset)
+    return PendingStatus(
+        user_id=UserId(user_id),
+        batch_id=batch_id,
+        status=status,
+        additional_info=info,
+        created_at=moment,
+        updated_at=moment,
+    )
+
+
+def test_coalesce_keeps_latest_message_and_first_timestamp():
+    updates = [
+        make_status(ProcessingState.parsing_transactions, "parsing", 0),
+        make_status(ProcessingState.categorizing_transactions, "batch 1 of 3", 1),
+        make_status(ProcessingState.categorizing_transactions, "batch 2 of 3", 2),
+        make_status(ProcessingState.categorizing_transactions, "batch 3 of 3", 3),
+        make_status(ProcessingState.completed, "done", 4),
+    ]
+
+    out = coalesce(updates)
+
+    assert [u.status for u in out] == [
+        ProcessingState.parsing_transactions,
+        ProcessingState.categorizing_transactions,
+        ProcessingState.completed,
+    ]
+    assert out[1].additional_info == "batch 3 of 3"
+    assert out[1].created_at == START + timedelta(seconds=1)
+    assert out[1].updated_at == START + timedelta(seconds=3)
+
+
+def test_coalesce_only_merges_consecutive_updates():
+    updates = [
+        make_status(ProcessingState.parsing_transactions, "a", 0),
+        make_status(ProcessingState.categorizing_transactions, "b", 1),
+        make_status(ProcessingState.parsing_transactions, "c", 2),
+    ]
+
+    assert len(coalesce(updates)) == 3
+
+
+def test_flush_writes_one_insert_per_user():
+    sessions: dict[UserId, MagicMock] = {}
+
+    def session_factory(user_id: UserId) -> MagicMock:
+        sessions[user_id] = MagicMock()
+        return sessions[user_id]
+
+    writer = StatusWriter(session_factory=session_factory)
+    writer._thread = MagicMock()  # don't start the background thread
+
+    writer.enqueue(make_status(ProcessingState.parsing_transactions, "a", 0))
+    writer.enqueue(make_status(ProcessingState.parsing_transactions, "b", 1))
+    writer.enqueue(make_status(ProcessingState.completed, "c", 2, batch_id="other"))
+    writer.enqueue(make_status(ProcessingState.completed, "d", 3, user_id=2))
+    writer.flush()
+
+    assert set(sessions) == {1, 2}
+    _, rows = sessions[UserId(1)].execute.call_args_list[0].args
+    assert [row["additional_info"] for row in rows] == ["b", "c"]
+    sessions[UserId(1)].commit.assert_called_once()
+
+    # nothing left to write
+    sessions.clear()
+    writer.flush()
+    assert sessions == {}
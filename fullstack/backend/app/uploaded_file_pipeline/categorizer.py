@@ -2,7 +2,7 @@ import logging
 from dataclasses import dataclass, replace
 from typing import cast
 
-from app.async_pipelines.uploaded_file_pipeline.categorizer import safe_parse_date
+from app.async_pipelines.uploaded_file_pipeline.categorizer import transaction_dates
 from app.async_pipelines.uploaded_file_pipeline.local_types import (
     CategorizedTransaction,
     InProcessJob,
@@ -103,7 +103,7 @@ def insert_categorized_transactions(in_process: InProcessJob) -> None:
         Transaction(
             description=t.partialTransactionDescription,
             category_id=category_lookup[t.category],
-            date_of_transaction=safe_parse_date(t.partialTransactionDateOfTransaction),
+            date_of_transaction=date_of_transaction,
             amount=t.partialTransactionAmount,
             transaction_source_id=in_process.transaction_source.id,
             kind=t.partialTransactionKind,
@@ -111,7 +111,11 @@ def insert_categorized_transactions(in_process: InProcessJob) -> None:
             user_id=in_process.user.id,
             archived=False,
         )
-        for t in in_process.categorized_transactions
+        for t, date_of_transaction in zip(
+            in_process.categorized_transactions,
+            transaction_dates(in_process.categorized_transactions),
+            strict=True,
+        )
     ]
 
     in_process.session.bulk_save_objects(transactions_to_insert)
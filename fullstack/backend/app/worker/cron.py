@@ -0,0 +1,329 @@
+import calendar
+import enum
+import logging
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Connection, Engine, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.models.cron_state import CronState
+
+logger = logging.getLogger(__name__)
+
+# arbitrary, but must be the same for every worker replica
+LEADER_LOCK_KEY = 727_462_001
+
+# followers retry the lock this often, and the leader never sleeps longer
+# than this so it notices a lost lock connection in reasonable time
+LEADER_RETRY_SECONDS = 15
+MAX_SLEEP_SECONDS = 60
+
+
+class Frequency(str, enum.Enum):
+    every_20_seconds = "every_20_seconds"
+    every_minute = "every_minute"
+    every_hour = "every_hour"
+    every_day_at_8am = "every_day_at_8am"
+    every_week_monday_at_8am = "every_week_monday_at_8am"
+    every_month_1st_at_8am = "every_month_1st_at_8am"
+
+    @property
+    def seconds(self) -> int:
+        minute = 60
+        hour = 60 * minute
+        day = 24 * hour
+        week = 7 * day
+        month = 30 * day  # YOLO
+
+        return {
+            self.every_20_seconds: 20,
+            self.every_minute: minute,
+            self.every_hour: hour,
+            self.every_day_at_8am: day,
+            self.every_week_monday_at_8am: week,
+            self.every_month_1st_at_8am: month,
+        }[self]
+
+    @property
+    def is_interval(self) -> bool:
+        return self in [self.every_20_seconds, self.every_minute, self.every_hour]
+
+    def next_run_after(self, moment: datetime) -> datetime:
+        """The first time strictly after `moment` this frequency should fire (UTC)"""
+        if self.is_interval:
+            return moment + timedelta(seconds=self.seconds)
+
+        # All time-specific jobs run at 8am UTC
+        candidate = moment.astimezone(timezone.utc).replace(
+            hour=8, minute=0, second=0, microsecond=0
+        )
+
+        if self == self.every_day_at_8am:
+            if candidate <= moment:
+                candidate += timedelta(days=1)
+            return candidate
+
+        if self == self.every_week_monday_at_8am:
+            candidate += timedelta(days=(0 - candidate.weekday()) % 7)
+            if candidate <= moment:
+                candidate += timedelta(weeks=1)
+            return candidate
+
+        candidate = candidate.replace(day=1)
+        if candidate <= moment:
+            days_in_month = calendar.monthrange(candidate.year, candidate.month)[1]
+            candidate += timedelta(days=days_in_month)
+        return candidate
+
+
+def initial_next_run(
+    frequency: Frequency, state: CronState | None, now: datetime
+) -> datetime:
+    """
+    Where a job's schedule starts when the scheduler boots.
+
+    A persisted next_run in the past means the window was missed while no
+    worker was running; it is returned as-is so the job fires once to catch
+    up, however many windows were missed.
+    """
+    if state is None:
+        # never ran: interval jobs start straight away, timed jobs wait for
+        # their first real window instead of firing on deploy
+        return now if frequency.is_interval else frequency.next_run_after(now)
+
+    return _as_utc(state.next_run)
+
+
+def checkpoint_is_stale(frequency: Frequency, state: CronState, now: datetime) -> bool:
+    """
+    A checkpoint belongs to the window in next_run. Once a later window has
+    started as well, the catch up run is for that one and starts over.
+    """
+    return (
+        state.checkpoint is not None
+        and frequency.next_run_after(_as_utc(state.next_run)) <= now
+    )
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def load_checkpoint(session: Session, job_name: str) -> int | None:
+    return (
+        session.query(CronState.checkpoint)
+        .filter(CronState.job_name == job_name)
+        .scalar()
+    )
+
+
+def save_checkpoint(session: Session, job_name: str, checkpoint: int | None) -> None:
+    """
+    Record how far a long running job got, so a crashed run can resume.
+
+    The scheduler only advances next_run once a run finishes, so after a
+    crash the job is due again on boot and picks up from here. Finishing,
+    even with an error, clears it for the next window.
+    """
+    state = (
+        session.query(CronState).filter(CronState.job_name == job_name).one_or_none()
+    )
+    if state is None:
+        now = datetime.now(timezone.utc)
+        state = CronState(job_name=job_name, last_run=now, next_run=now)
+        session.add(state)
+    state.checkpoint = checkpoint
+    session.commit()
+
+
+@dataclass
+class CronEntry:
+    name: str
+    frequency: Frequency
+    job: Callable[[], None]
+    next_run: datetime
+
+
+class LeaderLock:
+    """
+    Session level advisory lock held on a dedicated connection.
+
+    Postgres releases it when the connection goes away, so a crashed leader
+    hands over to another replica without any cleanup.
+    """
+
+    def __init__(self, engine: Engine, key: int = LEADER_LOCK_KEY) -> None:
+        self.engine = engine
+        self.key = key
+        self._connection: Connection | None = None
+
+    def ensure(self) -> bool:
+        """Returns True if this process is (still) the leader."""
+        if self._connection is not None:
+            try:
+                self._connection.execute(text("SELECT 1"))
+                return True
+            except DBAPIError:
+                logger.warning("Lost the cron leader connection, re-electing")
+                self.release()
+
+        connection = self.engine.connect()
+        acquired = connection.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}
+        ).scalar()
+        connection.commit()
+
+        if not acquired:
+            connection.close()
+            return False
+
+        logger.info("Acquired the cron leader lock")
+        self._connection = connection
+        return True
+
+    def release(self) -> None:
+        if self._connection is None:
+            return
+        try:
+            self._connection.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": self.key}
+            )
+            self._connection.commit()
+        except DBAPIError:
+            pass
+        finally:
+            self._connection.close()
+            self._connection = None
+
+
+class CronScheduler:
+    """
+    Keeps next-run times in memory and sleeps until the earliest one.
+
+    `cron_state` is read once when this process becomes leader and written
+    only after a job actually runs.
+
+    Setting `wake` cuts the sleep short and makes the `wake_jobs` due at once.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        lock: LeaderLock,
+        crons: dict[Frequency, list[Callable[[], None]]],
+        wake: threading.Event | None = None,
+        wake_jobs: list[Callable[[], None]] | None = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.lock = lock
+        self.crons = crons
+        self.wake = wake
+        self.wake_jobs = wake_jobs or []
+        self.entries: list[CronEntry] = []
+
+    def load(self, now: datetime) -> None:
+        with self.session_factory() as session:
+            states = {state.job_name: state for state in session.query(CronState)}
+
+            self.entries = [
+                CronEntry(
+                    name=job.__name__,
+                    frequency=frequency,
+                    job=job,
+                    next_run=initial_next_run(frequency, states.get(job.__name__), now),
+                )
+                for frequency, jobs in self.crons.items()
+                for job in jobs
+            ]
+
+            for entry in self.entries:
+                state = states.get(entry.name)
+                if state and checkpoint_is_stale(entry.frequency, state, now):
+                    logger.info(
+                        f"Dropping {entry.name}'s checkpoint from the "
+                        f"{entry.next_run} window"
+                    )
+                    state.checkpoint = None
+            session.commit()
+
+        for entry in self.entries:
+            if entry.next_run <= now and entry.name in states:
+                logger.info(
+                    f"{entry.name} missed its window at {entry.next_run}, catching up"
+                )
+
+    def due(self, now: datetime) -> list[CronEntry]:
+        return sorted(
+            [entry for entry in self.entries if entry.next_run <= now],
+            key=lambda entry: entry.next_run,
+        )
+
+    def seconds_until_next(self, now: datetime) -> float:
+        if not self.entries:
+            return MAX_SLEEP_SECONDS
+        earliest = min(entry.next_run for entry in self.entries)
+        return min(max((earliest - now).total_seconds(), 0), MAX_SLEEP_SECONDS)
+
+    def sleep(self, seconds: float) -> None:
+        if self.wake is None:
+            time.sleep(seconds)
+            return
+        if not self.wake.wait(seconds):
+            return
+
+        self.wake.clear()
+        now = datetime.now(timezone.utc)
+        for entry in self.entries:
+            if entry.job in self.wake_jobs:
+                entry.next_run = min(entry.next_run, now)
+
+    def run(self, entry: CronEntry) -> None:
+        started_at = datetime.now(timezone.utc)
+        try:
+            entry.job()
+        except Exception as e:
+            logging.error(f"Error running {entry.name}: {e}")
+
+        # even a failed run moves on to the next window, otherwise a broken
+        # job would be retried in a tight loop; persist drops its checkpoint
+        # so the next window doesn't skip the users it never got to
+        entry.next_run = entry.frequency.next_run_after(datetime.now(timezone.utc))
+        self.persist(entry, started_at)
+
+    def persist(self, entry: CronEntry, last_run: datetime) -> None:
+        with self.session_factory() as session:
+            state = (
+                session.query(CronState)
+                .filter(CronState.job_name == entry.name)
+                .one_or_none()
+            )
+            if state is None:
+                state = CronState(job_name=entry.name)
+                session.add(state)
+            state.last_run = last_run
+            state.next_run = entry.next_run
+            state.checkpoint = None
+            session.commit()
+
+    def run_forever(self) -> None:
+        loaded = False
+        while True:
+            if not self.lock.ensure():
+                loaded = False
+                time.sleep(LEADER_RETRY_SECONDS)
+                continue
+
+            if not loaded:
+                # another leader may have advanced the schedule in the meantime
+                self.load(datetime.now(timezone.utc))
+                loaded = True
+
+            for entry in self.due(datetime.now(timezone.utc)):
+                self.run(entry)
+
+            self.sleep(self.seconds_until_next(datetime.now(timezone.utc)))
@@ -1,69 +1,127 @@
 from datetime import datetime, timezone
+from typing import Any
 
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 from app.models.upload_configuration import UploadConfiguration
 
-from app.models.worker_job import JobKind, JobStatus, WorkerJob
+from app.models.worker_job import (
+    JobKind,
+    JobStatus,
+    RecategorizeScope,
+    WorkerJob,
+    merge_scopes,
+)
+from app.worker.wakeup import notify_jobs_queued
+
+
+def _merge_into_pending_unit(
+    session: Session, config_id: int, scope: RecategorizeScope | None
+) -> bool:
+    pending = (
+        session.query(WorkerJob)
+        .filter(
+            WorkerJob.config_id == config_id,
+            WorkerJob.status == JobStatus.pending,
+            WorkerJob.pdf_id.is_(None),
+        )
+        .with_for_update()
+        .one_or_none()
+    )
+    if not pending:
+        return False
+
+    pending.scope = merge_scopes(pending.scope, scope)
+    session.commit()
+    return True
 
 
 def enqueue_recategorization(
     session: Session,
     user_id: int,
     transaction_source_id: int,
+    scope: RecategorizeScope | None = None,
 ) -> None:
-    query = (
-        session.query(WorkerJob)
+    """
+    Queue one recategorization of the source's transactions, limited to
+    what `scope` could affect; no scope means every transaction.
+
+    If a unit for the source is already pending the request merges into it,
+    so a burst of category edits results in a single LLM pass. A unit that
+    is already processing may have read stale categories, so it doesn't
+    absorb new requests.
+    """
+    config = (
+        session.query(UploadConfiguration)
         .filter(
-            WorkerJob.user_id == user_id,
-            WorkerJob.status == JobStatus.completed,
+            UploadConfiguration.transaction_source_id == transaction_source_id,
+            UploadConfiguration.user_id == user_id,
         )
-        .join(UploadConfiguration, UploadConfiguration.id == WorkerJob.config_id)
-        .filter(UploadConfiguration.transaction_source_id == transaction_source_id)
-    ).all()
-
-    if not query:
-        # things like plaid accounts dont have jobs already
-        existing_config = (
-            session.query(UploadConfiguration)
-            .filter(
-                UploadConfiguration.transaction_source_id == transaction_source_id,
-                UploadConfiguration.user_id == user_id,
-            )
-            .one_or_none()
+        .first()
+    )
+    if not config:
+        # things like plaid accounts dont have a config yet
+        config = UploadConfiguration(
+            transaction_source_id=transaction_source_id,
+            user_id=user_id,
+            filename_regex=".*",
+            start_keyword=None,
+            end_keyword=None,
         )
-        if not existing_config:
-            new_config = UploadConfiguration(
-                transaction_source_id=transaction_source_id,
-                user_id=user_id,
-                filename_regex=".*",
-                start_keyword=None,
-                end_keyword=None,
-            )
-            session.add(new_config)
-            session.commit()
-
-        new_job = WorkerJob(
+        session.add(config)
+        session.commit()
+
+    if _merge_into_pending_unit(session, config.id, scope):
+        return
+
+    result = session.execute(
+        insert(WorkerJob)
+        .values(
             created_at=datetime.now(timezone.utc),
             last_tried_at=None,
             status=JobStatus.pending,
             user_id=user_id,
-            config_id=existing_config.id if existing_config else new_config.id,
-            kind=JobKind.plaid_recategorize,
+            config_id=config.id,
+            kind=JobKind.source_recategorize,
             pdf_id=None,
             archived=False,
             attempt_count=0,
+            scope=scope,
         )
-        session.add(new_job)
-        session.commit()
-        return
+        .on_conflict_do_nothing(
+            index_elements=[WorkerJob.config_id],
+            index_where=text("status = 'pending' AND pdf_id IS NULL"),
+        )
+    )
+    notify_jobs_queued(session)
+    session.commit()
 
-    for job in query:
-        job.kind = JobKind.recategorize
-        job.attempt_count = 0
-        job.status = JobStatus.pending
-        session.add(job)
+    if result.rowcount == 0:
+        # another request queued the unit in between, fold into it
+        _merge_into_pending_unit(session, config.id, scope)
 
-    session.commit()
+
+def _reset_job(job: WorkerJob, job_kind: JobKind) -> None:
+    job.kind = job_kind if job.status == JobStatus.completed else JobKind.full_upload
+    job.status = JobStatus.pending
+    job.attempt_count = 0
+
+
+def _new_job_values(
+    user_id: int, pdf_id: int | None, job_kind: JobKind
+) -> dict[str, Any]:
+    return {
+        "created_at": datetime.now(timezone.utc),
+        "last_tried_at": None,
+        "status": JobStatus.pending,
+        "user_id": user_id,
+        "config_id": None,
+        "kind": job_kind,
+        "pdf_id": pdf_id,
+        "archived": False,
+        "attempt_count": 0,
+    }
 
 
 def enqueue_or_reset_job(
@@ -80,31 +138,17 @@ def enqueue_or_reset_job(
 
     job: WorkerJob
     if existing_job:
-        existing_job.kind = (
-            job_kind
-            if existing_job.status == JobStatus.completed
-            else JobKind.full_upload
-        )
-        existing_job.status = JobStatus.pending
-        existing_job.attempt_count = 0
+        _reset_job(existing_job, job_kind)
         session.add(existing_job)
+        notify_jobs_queued(session)
         session.commit()
         job = existing_job
 
     else:
-        new_job = WorkerJob(
-            created_at=datetime.now(timezone.utc),
-            last_tried_at=None,
-            status=JobStatus.pending,
-            user_id=user_id,
-            config_id=None,
-            kind=job_kind,
-            pdf_id=pdf_id,
-            archived=False,
-            attempt_count=0,
-        )
+        new_job = WorkerJob(**_new_job_values(user_id, pdf_id, job_kind))
 
         session.add(new_job)
+        notify_jobs_queued(session)
         session.commit()
         job = new_job
 
@@ -117,7 +161,27 @@ def enqueue_or_reset_jobs(
     pdf_ids: list[int],
     job_kind: JobKind,
 ) -> list[WorkerJob]:
-    out = []
-    for pdf_id in pdf_ids:
-        out.append(enqueue_or_reset_job(session, user_id, pdf_id, job_kind=job_kind))
-    return out
+    """
+    enqueue_or_reset_job for many files, with one query for their existing
+    jobs and one multi-row insert for the rest. Committed by the caller, which
+    also wakes the worker by doing so.
+    """
+    existing = {
+        job.pdf_id: job
+        for job in session.query(WorkerJob).filter(
+            WorkerJob.pdf_id.in_(pdf_ids), WorkerJob.user_id == user_id
+        )
+    }
+    for job in existing.values():
+        _reset_job(job, job_kind)
+
+    new_pdf_ids = [pdf_id for pdf_id in pdf_ids if pdf_id not in existing]
+    if new_pdf_ids:
+        created = session.scalars(
+            insert(WorkerJob).returning(WorkerJob),
+            [_new_job_values(user_id, pdf_id, job_kind) for pdf_id in new_pdf_ids],
+        )
+        existing.update({job.pdf_id: job for job in created})
+
+    notify_jobs_queued(session)
+    return [existing[pdf_id] for pdf_id in pdf_ids]
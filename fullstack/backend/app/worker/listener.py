@@ -0,0 +1,73 @@
+import logging
+import select
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+import psycopg2
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+# how long the listener blocks before checking the connection again
+LISTEN_POLL_SECONDS = 5
+RECONNECT_SECONDS = 5
+
+
+def drain_notifies(connection: Any) -> list[str]:
+    """The payloads of the notifications that arrived since the last poll."""
+    connection.poll()
+    payloads = [notify.payload for notify in connection.notifies]
+    connection.notifies.clear()
+    return payloads
+
+
+class PostgresListener:
+    """
+    A thread that LISTENs on one channel and hands every batch of
+    notifications' payloads to `on_notify`. It reconnects after any failure,
+    so whatever it wakes has to cope with the ones sent in between.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        channel: str,
+        on_notify: Callable[[list[str]], None],
+        name: str,
+    ) -> None:
+        self.dsn = dsn
+        self.channel = channel
+        self.on_notify = on_notify
+        self.name = name
+
+    def start(self) -> None:
+        threading.Thread(
+            target=self._listen_forever, name=self.name, daemon=True
+        ).start()
+
+    def _listen_forever(self) -> None:
+        while True:
+            try:
+                self._listen()
+            except Exception as e:
+                logger.error(f"{self.name} listener failed, reconnecting: {e}")
+                time.sleep(RECONNECT_SECONDS)
+
+    def _listen(self) -> None:
+        connection = psycopg2.connect(self.dsn)
+        connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {self.channel}")
+
+            while True:
+                ready, _, _ = select.select([connection], [], [], LISTEN_POLL_SECONDS)
+                if not ready:
+                    continue
+                payloads = drain_notifies(connection)
+                if payloads:
+                    self.on_notify(payloads)
+        finally:
+            connection.close()
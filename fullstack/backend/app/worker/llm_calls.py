@@ -0,0 +1,154 @@
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.async_pipelines.uploaded_file_pipeline.local_types import InProcessJob
+from app.db import get_db_for_user
+from app.models.llm_call_log import LLMCallLog, LLMStage
+from app.models.user import UserId
+from app.models.worker_job import JobKind, WorkerJobId
+
+logger = logging.getLogger(__name__)
+
+# records are small, so a handful of jobs' worth goes out in one insert
+FLUSH_AT_RECORDS = 50
+
+
+@dataclass(frozen=True)
+class LLMCallContext:
+    """Who an LLM call is made for, and which pipeline step is making it."""
+
+    user_id: UserId
+    stage: LLMStage
+    job_id: WorkerJobId | None = None
+    job_kind: JobKind | None = None
+    batch_id: str | None = None
+
+
+@dataclass(frozen=True)
+class LLMCall:
+    model: str
+    latency_ms: float
+    success: bool
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    retries: int = 0
+    cache_hit: bool = False
+
+
+_context: ContextVar[LLMCallContext | None] = ContextVar(
+    "llm_call_context", default=None
+)
+
+
+def current_llm_context() -> LLMCallContext | None:
+    return _context.get()
+
+
+@contextmanager
+def use_llm_context(context: LLMCallContext | None) -> Iterator[None]:
+    """Carry a context captured on one thread over to another, e.g. the LLM loop."""
+    token = _context.set(context)
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+@contextmanager
+def llm_stage(process: InProcessJob, stage: LLMStage) -> Iterator[None]:
+    context = LLMCallContext(
+        user_id=process.user.id,
+        stage=stage,
+        job_id=process.job.id if process.job else None,
+        job_kind=process.job.kind if process.job else None,
+        batch_id=process.batch_id,
+    )
+    with use_llm_context(context):
+        yield
+
+
+def _user_session(user_id: UserId) -> Session:
+    return next(get_db_for_user(user_id))
+
+
+class LLMCallWriter:
+    """Buffers call records and writes them with one insert per user."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[UserId], Session] = _user_session,
+        flush_at: int = FLUSH_AT_RECORDS,
+    ) -> None:
+        self.session_factory = session_factory
+        self.flush_at = flush_at
+        self._pending: list[tuple[LLMCallContext, LLMCall]] = []
+        self._lock = threading.Lock()
+
+    def record(self, call: LLMCall) -> None:
+        context = current_llm_context()
+        if context is None:
+            logger.debug(f"LLM call outside of a pipeline stage: {call}")
+            return
+
+        with self._lock:
+            self._pending.append((context, call))
+            full = len(self._pending) >= self.flush_at
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        by_user: dict[UserId, list[tuple[LLMCallContext, LLMCall]]] = defaultdict(list)
+        for context, call in pending:
+            by_user[context.user_id].append((context, call))
+
+        for user_id, records in by_user.items():
+            session = self.session_factory(user_id)
+            try:
+                session.execute(
+                    insert(LLMCallLog),
+                    [
+                        {
+                            "user_id": context.user_id,
+                            "job_id": context.job_id,
+                            "job_kind": context.job_kind,
+                            "batch_id": context.batch_id,
+                            "stage": context.stage,
+                            "model": call.model,
+                            "prompt_tokens": call.prompt_tokens,
+                            "completion_tokens": call.completion_tokens,
+                            "cached_tokens": call.cached_tokens,
+                            "latency_ms": call.latency_ms,
+                            "retries": call.retries,
+                            "cache_hit": call.cache_hit,
+                            "success": call.success,
+                        }
+                        for context, call in records
+                    ],
+                )
+                session.commit()
+            except Exception as e:
+                logger.error(f"Failed to write LLM call log for {user_id}: {e}")
+                session.rollback()
+            finally:
+                session.close()
+
+
+llm_call_writer = LLMCallWriter()
+atexit.register(llm_call_writer.flush)
+
+
+def record_llm_call(call: LLMCall) -> None:
+    llm_call_writer.record(call)
@@ -1,10 +1,9 @@
 import asyncio
-import enum
 import logging
-import time
 import uuid
 from collections import defaultdict
 from collections.abc import Callable, Coroutine
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
@@ -18,11 +17,13 @@ from app.async_pipelines.recategorize_plaid_pipeline.main import (
 from app.async_pipelines.uploaded_file_pipeline.local_types import InProcessJob
 from app.async_pipelines.uploaded_file_pipeline.main import uploaded_file_pipeline
 from app.db import get_db_for_user
+from app.func_utils import make_batches
 from app.get_db_string import get_worker_database_url
+from app.models.effect import Effect as EffectModel, EventType
 from app.models.plaid import PlaidSyncLog
 from app.models.uploaded_pdf import UploadedPdf
-from app.models.worker_job import JobKind, JobStatus, WorkerJob
-from app.models.user import User
+from app.models.worker_job import JobKind, JobStatus, WorkerJob, merge_scopes
+from app.models.user import User, UserId
 from app.models.worker_status import WorkerStatus
 from app.no_code.notifications.events import (
     DailyEvent,
@@ -33,6 +34,16 @@ from app.no_code.notifications.events import (
 from app.no_code.notifications.trigger import trigger_effects
 from app.scheduler import sync_all_plaid_accounts_job
 from app.telegram_utils import send_telegram_message
+from app.worker.cron import (
+    CronScheduler,
+    Frequency,
+    LeaderLock,
+    load_checkpoint,
+    save_checkpoint,
+)
+from app.worker.llm_calls import llm_call_writer
+from app.worker.status import status_writer
+from app.worker.wakeup import JobWakeup
 
 from ..async_pipelines.recategorize_pipeline.main import recategorize_file_pipeline
 import os
@@ -52,6 +63,9 @@ SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 POLL_INTERVAL = 10
 MAX_ATTEMPTS = 5
 
+TIMED_EVENT_CHUNK_SIZE = 50
+TIMED_EVENT_MAX_WORKERS = 4
+
 
 def reset_stuck_jobs(session: Session) -> None:
     timeout = timedelta(minutes=3)
@@ -73,7 +87,23 @@ def reset_stuck_jobs(session: Session) -> None:
         logger.info("No stuck jobs found.")
         return
 
+    pending_source_units = {
+        job.config_id: job
+        for job in session.query(WorkerJob).filter(
+            WorkerJob.status == JobStatus.pending,
+            WorkerJob.pdf_id.is_(None),
+        )
+    }
+
     for job in stuck_jobs:
+        if job.pdf_id is None:
+            pending = pending_source_units.get(job.config_id)
+            if pending:
+                # the pending unit re-reads the source, it just needs the scope too
+                pending.scope = merge_scopes(pending.scope, job.scope)
+                job.status = JobStatus.completed
+                continue
+            pending_source_units[job.config_id] = job
         job.status = JobStatus.pending
 
     session.commit()
@@ -150,8 +180,14 @@ def process_next_jobs(session: Session) -> None:
 
     logger.info(f"Processing jobs: {[job.id for job in all_user_jobs]}")
     success = try_jobs(user_session, all_user_jobs)
+    # make sure the batch's statuses are visible before the jobs flip state
+    status_writer.flush()
+    llm_call_writer.flush()
 
     for job in all_user_jobs:
+        # a file that couldn't be read fails its own job, not the batch
+        if job.status == JobStatus.failed:
+            continue
         job.status = JobStatus.completed if success else JobStatus.failed
         job.last_tried_at = datetime.now(timezone.utc)
         user_session.add(job)
@@ -165,8 +201,12 @@ def process_next_jobs(session: Session) -> None:
 def try_jobs(user_session: Session, jobs: list[WorkerJob]) -> bool:
     try:
         asyncio.run(run_jobs(user_session, jobs))
+        # the pipelines update the jobs on sessions of their own
+        user_session.expire_all()
 
         for job in jobs:
+            if job.status == JobStatus.failed:
+                continue
             job.error_messages = ""
             user_session.add(job)
         user_session.commit()
@@ -188,6 +228,7 @@ FUNC_LOOKUP: dict[
     JobKind.full_upload: uploaded_file_pipeline,
     JobKind.recategorize: recategorize_file_pipeline,
     JobKind.plaid_recategorize: recategorize_account_pipeline,
+    JobKind.source_recategorize: recategorize_account_pipeline,
 }
 
 
@@ -226,8 +267,8 @@ async def run_jobs(_user_session: Session, jobs: list[WorkerJob]) -> None:
             )
         )
 
-    callable = FUNC_LOOKUP[job.kind]
-    await callable(in_process_files[job.kind])
+    for kind, in_process in in_process_files.items():
+        await FUNC_LOOKUP[kind](in_process)
 
 
 def handle_plaid() -> None:
@@ -235,6 +276,8 @@ def handle_plaid() -> None:
         asyncio.run(sync_all_plaid_accounts_job())
     except Exception as e:
         send_telegram_message(f"Failed to sync Plaid accounts: {e}")
+    finally:
+        llm_call_writer.flush()
 
 
 def clean_worker_status() -> None:
@@ -257,72 +300,64 @@ def upload_file_worker() -> None:
         process_next_jobs(session)
 
 
-def fire_timed_event(event: Event) -> None:
-    with SessionLocal() as session:
-        users = session.query(User).all()
-        for user in users:
-            user_session = next(get_db_for_user(user.id))
+def users_with_active_effects(
+    session: Session, event_type: EventType, after: int | None
+) -> list[UserId]:
+    query = session.query(EffectModel.user_id).filter(
+        EffectModel.event_type == event_type,
+        EffectModel.active,
+    )
+    if after is not None:
+        query = query.filter(EffectModel.user_id > after)
+
+    return [row.user_id for row in query.distinct().order_by(EffectModel.user_id)]
+
+
+def trigger_timed_event_for_user(user_id: UserId, event: Event) -> None:
+    user_session = next(get_db_for_user(user_id))
+    try:
+        user = user_session.get(User, user_id)
+        if user:
             trigger_effects(user_session, user, event)
-            user_session.close()
+    except Exception as e:
+        logger.error(f"Failed to fire {event.type} for user {user_id}: {e}")
+    finally:
+        user_session.close()
+
+
+def fire_timed_event(event: Event, job_name: str) -> None:
+    with SessionLocal() as session:
+        checkpoint = load_checkpoint(session, job_name)
+        user_ids = users_with_active_effects(session, event.type, after=checkpoint)
+
+    if checkpoint is not None:
+        logger.info(f"Resuming {job_name} after user {checkpoint}")
+    logger.info(f"Firing {event.type} for {len(user_ids)} users")
+
+    with ThreadPoolExecutor(max_workers=TIMED_EVENT_MAX_WORKERS) as pool:
+        for chunk in make_batches(user_ids, TIMED_EVENT_CHUNK_SIZE):
+            list(
+                pool.map(
+                    lambda user_id: trigger_timed_event_for_user(user_id, event), chunk
+                )
+            )
+            with SessionLocal() as session:
+                save_checkpoint(session, job_name, chunk[-1])
+
+    with SessionLocal() as session:
+        save_checkpoint(session, job_name, None)
 
 
 def fire_weekly_event() -> None:
-    fire_timed_event(WeeklyEvent())
+    fire_timed_event(WeeklyEvent(), "fire_weekly_event")
 
 
 def fire_monthly_event() -> None:
-    fire_timed_event(MonthlyEvent())
+    fire_timed_event(MonthlyEvent(), "fire_monthly_event")
 
 
 def fire_daily_event() -> None:
-    fire_timed_event(DailyEvent())
-
-
-class Frequency(str, enum.Enum):
-    every_20_seconds = "every_20_seconds"
-    every_minute = "every_minute"
-    every_hour = "every_hour"
-    every_day_at_8am = "every_day_at_8am"
-    every_week_monday_at_8am = "every_week_monday_at_8am"
-    every_month_1st_at_8am = "every_month_1st_at_8am"
-
-    @property
-    def seconds(self) -> int:
-        minute = 60
-        hour = 60 * minute
-        day = 24 * hour
-        week = 7 * day
-        month = 30 * day  # YOLO
-
-        return {
-            self.every_20_seconds: 20,
-            self.every_minute: minute,
-            self.every_hour: hour,
-            self.every_day_at_8am: day,
-            self.every_week_monday_at_8am: week,
-            self.every_month_1st_at_8am: month,
-        }[self]
-
-    def should_run_at(self, now: datetime) -> bool:
-        """Check if this frequency should run at the given time"""
-        # Regular interval jobs can always run
-        if self in [self.every_20_seconds, self.every_minute, self.every_hour]:
-            return True
-
-        # All time-specific jobs run at 8am UTC
-        if now.hour != 8 or now.minute != 0:
-            return False
-
-        if self == self.every_day_at_8am:
-            return True
-
-        if self == self.every_week_monday_at_8am:
-            return now.weekday() == 0  # Monday
-
-        if self == self.every_month_1st_at_8am:
-            return now.day == 1
-
-        return False
+    fire_timed_event(DailyEvent(), "fire_daily_event")
 
 
 def heartbeat() -> None:
@@ -339,68 +374,17 @@ CRONS: dict[Frequency, list[Callable[[], None]]] = {
 }
 
 
-def should_run_job(session: Session, job_name: str, frequency: Frequency) -> bool:
-    from app.models.cron_state import CronState
-
-    now = datetime.now(timezone.utc)
-    state = session.query(CronState).filter(CronState.job_name == job_name).first()
-
-    if not state:
-        # First time this job has ever run
-        state = CronState(job_name=job_name, last_run=now)
-        session.add(state)
-        session.commit()
-        return frequency.should_run_at(now)
-
-    # For time-specific jobs, check if we're in the right time window
-    if not frequency.should_run_at(now):
-        return False
-
-    # Ensure last_run has timezone info
-    last_run = (
-        state.last_run
-        if state.last_run.tzinfo
-        else state.last_run.replace(tzinfo=timezone.utc)
-    )
-    time_since_last_run = now - last_run
-
-    # For time-specific jobs, ensure we haven't run today yet
-    if frequency in [
-        Frequency.every_day_at_8am,
-        Frequency.every_week_monday_at_8am,
-        Frequency.every_month_1st_at_8am,
-    ]:
-        return bool(
-            last_run.date() < now.date() and time_since_last_run.total_seconds() >= 60
-        )
-
-    # For regular interval jobs, use the seconds property
-    should_run = time_since_last_run.total_seconds() >= frequency.seconds
-
-    if should_run:
-        session.query(CronState).filter(CronState.job_name == job_name).update(
-            {CronState.last_run: now}
-        )
-        session.commit()
-
-    return bool(should_run)
-
-
 def worker() -> None:
-    while True:
-        with SessionLocal() as session:
-            for freq, jobs in CRONS.items():
-                if not jobs:
-                    continue
-
-                for job in jobs:
-                    try:
-                        if should_run_job(session, job.__name__, freq):
-                            job()
-                    except Exception as e:
-                        logging.error(f"Error running {job.__name__}: {e}")
-
-        time.sleep(5)
+    wakeup = JobWakeup(DATABASE_URL)
+    wakeup.start()
+    scheduler = CronScheduler(
+        session_factory=SessionLocal,
+        lock=LeaderLock(engine),
+        crons=CRONS,
+        wake=wakeup.event,
+        wake_jobs=[upload_file_worker],
+    )
+    scheduler.run_forever()
 
 
 if __name__ == "__main__":
@@ -1,10 +1,35 @@
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass, replace
 from datetime import datetime, timezone
 
+from sqlalchemy import insert, text
 from sqlalchemy.orm import Session
 
 from app.async_pipelines.uploaded_file_pipeline.local_types import InProcessJob
+from app.db import get_db_for_user
 from app.models.worker_status import ProcessingState, WorkerStatus
-from app.models.user import User
+from app.models.user import User, UserId
+
+logger = logging.getLogger(__name__)
+
+STATUS_FLUSH_INTERVAL_SECONDS = 1.0
+
+TERMINAL_STATES = {ProcessingState.completed, ProcessingState.failed}
+
+# the API listens on this channel to push progress to connected clients
+STATUS_CHANNEL = "worker_status"
+
+
+def notify_status_change(session: Session, user_id: UserId) -> None:
+    """Delivered to listeners when the surrounding transaction commits."""
+    session.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": STATUS_CHANNEL, "payload": str(user_id)},
+    )
 
 
 def get_latest_batch(session: Session, user: User) -> list[WorkerStatus]:
@@ -28,13 +53,14 @@ def get_batch_status(session: Session, user: User, batch_id: str) -> list[Worker
     )
 
 
-def update_worker_status(
+def add_worker_status(
     session: Session,
     user: User,
     status: ProcessingState,
     additional_info: str,
     batch_id: str,
 ) -> WorkerStatus:
+    """A status written with the rest of the caller's transaction."""
     new_status = WorkerStatus(
         user_id=user.id,
         batch_id=batch_id,
@@ -44,17 +70,170 @@ def update_worker_status(
         updated_at=datetime.now(timezone.utc),
     )
     session.add(new_status)
+    notify_status_change(session, user.id)
+    return new_status
+
+
+def update_worker_status(
+    session: Session,
+    user: User,
+    status: ProcessingState,
+    additional_info: str,
+    batch_id: str,
+) -> WorkerStatus:
+    new_status = add_worker_status(session, user, status, additional_info, batch_id)
     session.commit()
 
     return new_status
 
 
+@dataclass(frozen=True)
+class PendingStatus:
+    user_id: UserId
+    batch_id: str
+    status: ProcessingState
+    additional_info: str
+    created_at: datetime
+    updated_at: datetime
+
+
+def coalesce(updates: list[PendingStatus]) -> list[PendingStatus]:
+    """
+    Collapse consecutive updates of the same state into the latest one.
+
+    "Categorizing batch 1 of 9" .. "batch 9 of 9" becomes a single row that
+    keeps the first created_at (so the timeline order is unchanged) and the
+    latest message.
+    """
+    out: list[PendingStatus] = []
+    for update in updates:
+        previous = out[-1] if out else None
+        if (
+            previous
+            and previous.batch_id == update.batch_id
+            and previous.status == update.status
+        ):
+            out[-1] = replace(
+                update, created_at=previous.created_at, updated_at=update.updated_at
+            )
+        else:
+            out.append(update)
+    return out
+
+
+def _user_session(user_id: UserId) -> Session:
+    return next(get_db_for_user(user_id))
+
+
+class StatusWriter:
+    """
+    Buffers worker status updates off the pipeline's session.
+
+    Updates are flushed from a background thread every flush interval, or
+    straight away when a batch reaches a terminal state, with one multi-row
+    insert per user.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[UserId], Session] = _user_session,
+        flush_interval: float = STATUS_FLUSH_INTERVAL_SECONDS,
+    ) -> None:
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self._pending: dict[str, list[PendingStatus]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def enqueue(self, update: PendingStatus) -> None:
+        with self._lock:
+            self._pending[update.batch_id].append(update)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="worker-status-writer", daemon=True
+                )
+                self._thread.start()
+
+        if update.status in TERMINAL_STATES:
+            self._wake.set()
+
+    def drain(self) -> list[PendingStatus]:
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(list)
+
+        return [update for updates in pending.values() for update in coalesce(updates)]
+
+    def flush(self) -> None:
+        # the flush lock keeps rows of one batch from being written out of order
+        # by the background thread and an explicit flush racing each other
+        with self._flush_lock:
+            by_user: dict[UserId, list[PendingStatus]] = defaultdict(list)
+            for update in self.drain():
+                by_user[update.user_id].append(update)
+
+            for user_id, updates in by_user.items():
+                session = self.session_factory(user_id)
+                try:
+                    session.execute(
+                        insert(WorkerStatus),
+                        [
+                            {
+                                "user_id": update.user_id,
+                                "batch_id": update.batch_id,
+                                "status": update.status,
+                                "additional_info": update.additional_info,
+                                "created_at": update.created_at,
+                                "updated_at": update.updated_at,
+                            }
+                            for update in updates
+                        ],
+                    )
+                    notify_status_change(session, user_id)
+                    session.commit()
+                except Exception as e:
+                    logger.error(f"Failed to write worker status for {user_id}: {e}")
+                    session.rollback()
+                finally:
+                    session.close()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+status_writer = StatusWriter()
+atexit.register(status_writer.flush)
+
+
+def queue_worker_status(
+    user: User,
+    status: ProcessingState,
+    additional_info: str,
+    batch_id: str,
+) -> None:
+    """Buffered counterpart of update_worker_status for the worker's hot path."""
+    now = datetime.now(timezone.utc)
+    status_writer.enqueue(
+        PendingStatus(
+            user_id=user.id,
+            batch_id=batch_id,
+            status=status,
+            additional_info=additional_info,
+            created_at=now,
+            updated_at=now,
+        )
+    )
+
+
 def status_update_monad(
     in_process: InProcessJob, status: ProcessingState, additional_info: str
 ) -> InProcessJob:
     """is this actually a monad?"""
-    update_worker_status(
-        in_process.session,
+    queue_worker_status(
         in_process.user,
         status=status,
         additional_info=additional_info,
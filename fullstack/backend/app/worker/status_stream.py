@@ -0,0 +1,58 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from app.get_db_string import get_app_user_database_url
+from app.models.user import UserId
+from app.worker.listener import PostgresListener
+from app.worker.status import STATUS_CHANNEL
+
+
+class StatusHub:
+    """
+    Fans worker status notifications out to the API's open streams.
+
+    The worker runs in a different container, so updates arrive over
+    Postgres LISTEN/NOTIFY. One listener thread holds the connection and
+    wakes the asyncio queue of every stream subscribed for that user.
+    """
+
+    def __init__(self, dsn: str) -> None:
+        self._listener = PostgresListener(
+            dsn, STATUS_CHANNEL, self._on_notify, name="worker-status-hub"
+        )
+        self._subscribers: dict[
+            UserId, set[tuple[asyncio.AbstractEventLoop, asyncio.Queue[None]]]
+        ] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def subscribe(self, user_id: UserId) -> asyncio.Queue[None]:
+        queue: asyncio.Queue[None] = asyncio.Queue()
+        with self._lock:
+            self._subscribers[user_id].add((asyncio.get_running_loop(), queue))
+            if not self._listening:
+                self._listener.start()
+                self._listening = True
+        return queue
+
+    def unsubscribe(self, user_id: UserId, queue: asyncio.Queue[None]) -> None:
+        with self._lock:
+            self._subscribers[user_id] = {
+                (loop, q) for loop, q in self._subscribers[user_id] if q is not queue
+            }
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+    def publish(self, user_id: UserId) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    def _on_notify(self, payloads: list[str]) -> None:
+        for user_id in {UserId(int(payload)) for payload in payloads}:
+            self.publish(user_id)
+
+
+status_hub = StatusHub(get_app_user_database_url())
@@ -0,0 +1,31 @@
+import threading
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.worker.listener import PostgresListener
+
+# the API notifies on this channel when it queues jobs
+JOB_CHANNEL = "worker_jobs"
+
+
+def notify_jobs_queued(session: Session) -> None:
+    """Delivered to the worker when the surrounding transaction commits."""
+    session.execute(text(f"NOTIFY {JOB_CHANNEL}"))
+
+
+class JobWakeup:
+    """
+    Sets `event` whenever jobs are queued, so the scheduler starts on them
+    straight away instead of at its next poll. A missed notification only
+    costs that wait, the poll still runs.
+    """
+
+    def __init__(self, dsn: str) -> None:
+        self.event = threading.Event()
+        self.listener = PostgresListener(
+            dsn, JOB_CHANNEL, lambda _: self.event.set(), name="worker-job-wakeup"
+        )
+
+    def start(self) -> None:
+        self.listener.start()
@@ -32,6 +32,8 @@ import type {
   AdminReseedAllAccountPagesResponse,
   AdminReseedAllNotificationsData,
   AdminReseedAllNotificationsResponse,
+  AdminLlmUsageData,
+  AdminLlmUsageResponse,
   BudgetsGetBudgetEntriesData,
   BudgetsGetBudgetEntriesResponse,
   BudgetsCreateBudgetEntryData,
@@ -522,6 +524,29 @@ export class AdminService {
       },
     });
   }
+
+  /**
+   * Llm Usage
+   * Where LLM time and tokens go, by job kind, pipeline stage and user.
+   * @param data The data for the request.
+   * @param data.days
+   * @returns LLMUsageSummary Successful Response
+   * @throws ApiError
+   */
+  public static llmUsage(
+    data: AdminLlmUsageData = {},
+  ): CancelablePromise<AdminLlmUsageResponse> {
+    return __request(OpenAPI, {
+      method: "GET",
+      url: "/api/v1/admin/llm-usage",
+      query: {
+        days: data.days,
+      },
+      errors: {
+        422: "Validation Error",
+      },
+    });
+  }
 }
 
 export class BudgetsService {
@@ -307,6 +307,28 @@ export type KeyValuePair = {
   value: string | null;
 };
 
+export type LLMUsageRow = {
+  key: string;
+  calls: number;
+  cache_hits: number;
+  failures: number;
+  retries: number;
+  p50_latency_ms: number | null;
+  p95_latency_ms: number | null;
+  p50_tokens: number | null;
+  p95_tokens: number | null;
+  prompt_tokens: number;
+  completion_tokens: number;
+  cached_tokens: number;
+};
+
+export type LLMUsageSummary = {
+  since: string;
+  by_job_kind: Array<LLMUsageRow>;
+  by_stage: Array<LLMUsageRow>;
+  by_user: Array<LLMUsageRow>;
+};
+
 export type LandingStatus =
   | "has_transactions"
   | "no_transactions_not_processing"
@@ -850,7 +872,6 @@ export type Unit = "dollar" | "percent";
 export type UploadedPdfOut = {
   filename: string;
   nickname?: string | null;
-  raw_content: string;
   raw_content_hash: string;
   upload_time: string;
   user_id: number;
@@ -1075,6 +1096,12 @@ export type AdminReseedAllNotificationsResponse = {
   [key: string]: string;
 };
 
+export type AdminLlmUsageData = {
+  days?: number;
+};
+
+export type AdminLlmUsageResponse = LLMUsageSummary;
+
 export type BudgetsGetBudgetEntriesData = {
   budgetId: number;
 };
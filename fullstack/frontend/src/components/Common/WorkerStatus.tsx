@@ -1,4 +1,4 @@
-import { type WorkerStatusOut, WorkerStatusService } from "@/client";
+import { OpenAPI, type WorkerStatusOut, WorkerStatusService } from "@/client";
 import useAuth from "@/hooks/useAuth";
 import {
   Badge,
@@ -13,12 +13,35 @@ import {
   TimelineIndicator,
   useDisclosure,
 } from "@chakra-ui/react";
-import { useQuery } from "@tanstack/react-query";
+import { useQuery, useQueryClient } from "@tanstack/react-query";
 import { Link, useRouterState } from "@tanstack/react-router";
 import { format } from "date-fns";
-import { useEffect, useState } from "react";
+import { useEffect } from "react";
 import { LuCheck, LuX } from "react-icons/lu";
 
+// The backend pushes the latest batch over SSE whenever the worker writes a
+// status, so the query below only does the initial load.
+function useWorkerStatusStream(enabled: boolean) {
+  const queryClient = useQueryClient();
+
+  useEffect(() => {
+    if (!enabled) {
+      return;
+    }
+    const source = new EventSource(
+      `${OpenAPI.BASE}/api/v1/worker-status/stream`,
+      { withCredentials: true },
+    );
+    source.onmessage = (event) => {
+      queryClient.setQueryData<WorkerStatusOut[]>(
+        ["currentStatus"],
+        JSON.parse(event.data),
+      );
+    };
+    return () => source.close();
+  }, [enabled, queryClient]);
+}
+
 function determineColor(workerStatus: WorkerStatusOut, isLast: boolean) {
   let color =
     workerStatus.status === "failed" ? "red" : isLast ? "yellow" : "green";
@@ -92,20 +115,13 @@ function TimelineEntry({
 }
 
 export function WorkerStatus() {
-  const [isCompleted, setIsCompleted] = useState(false);
   const { user } = useAuth();
   const { data, isLoading } = useQuery<WorkerStatusOut[], Error>({
     queryKey: ["currentStatus"],
     queryFn: () => WorkerStatusService.getStatus(),
     enabled: !!user?.id,
-    refetchInterval: isCompleted ? undefined : 5000,
   });
-
-  useEffect(() => {
-    if (data?.some((status) => status.status === "completed")) {
-      setIsCompleted(true);
-    }
-  }, [data]);
+  useWorkerStatusStream(!!user?.id);
 
   if (isLoading) {
     return null;
@@ -138,11 +154,8 @@ export function CollapsibleWorkerStatus() {
     queryKey: ["currentStatus"],
     queryFn: () => WorkerStatusService.getStatus(),
     enabled: !!user?.id,
-    refetchInterval: (data) =>
-      data?.state.data?.some((status) => status.status === "completed")
-        ? undefined
-        : 5000,
   });
+  useWorkerStatusStream(!!user?.id);
   const { location } = useRouterState();
 
   useEffect(() => {